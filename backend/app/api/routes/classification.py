@@ -1,30 +1,21 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from typing import List, Optional
 from app.models.schemas import *
-from app.services.ai_service import ai_service
 from app.services.status_store import processing_status
+from app.services.job_queue import processing_queue, JobPending, QueueFull
+from app.services.view_checkpoints import view_checkpoints
+from app.services.classification_runner import now_ist
 from app.core.config import settings
 from app.core.database import get_database
+from ml_models.keypoint_store import keypoint_store
+from ml_models.cancellation import REASON_DELETED
 import aiofiles
 import os
-import threading
-import gc
 import logging
-from datetime import datetime, timezone, timedelta
 from bson import ObjectId
 
 logger = logging.getLogger(__name__)
 
-# Global lock for request serialization (512MB RAM - one classification at a time)
-_processing_lock = threading.Lock()
-
-# IST timezone (UTC+5:30)
-IST = timezone(timedelta(hours=5, minutes=30))
-
-def now_ist():
-    """Get current datetime in IST"""
-    return datetime.now(IST)
-
 router = APIRouter(prefix="/classification", tags=["Classification"])
 
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
@@ -126,9 +117,9 @@ async def upload_images(
         "data": uploaded_files
     }
 
-@router.post("/{classification_id}/process")
+@router.post("/{classification_id}/process", status_code=202)
 async def process_classification(classification_id: str):
-    """Step 3: Process with AI following official format"""
+    """Step 3: Queue AI processing; follow it with /status and read /results"""
     
     db = await get_database()
     
@@ -143,62 +134,41 @@ async def process_classification(classification_id: str):
     if not classification.get('images'):
         raise HTTPException(400, "No images uploaded")
     
-    # Serialize processing - only one classification at a time (512MB RAM limit)
-    with _processing_lock:
-        logger.info(f"Processing classification {classification_id} (LOCKED - sequential mode)")
-        
-        await db.classifications.update_one(
-            {"_id": ObjectId(classification_id)},
-            {"$set": {"status": "processing", "updatedAt": now_ist()}}
-        )
-        
-        try:
-            image_paths = [
-                os.path.join(settings.UPLOAD_DIR, img['filename'])
-                for img in classification['images']
-            ]
-            
-            # AI Classification with official format + status tracking
-            results = await ai_service.classify_animal(
-                image_paths=image_paths,
-                animal_info=classification['animalInfo'],
-                classification_id=classification_id  # Pass ID for status tracking
-            )
-            
-            await db.classifications.update_one(
-                {"_id": ObjectId(classification_id)},
-                {
-                    "$set": {
-                        "results": results,
-                        "status": "completed",
-                        "updatedAt": now_ist()
-                    }
-                }
-            )
-            
-            # Final cleanup after all 5 models processed
-            gc.collect()
-            logger.info(f"Classification {classification_id} completed, all models unloaded")
-            
-            return {
-                "success": True,
-                "message": "Classification completed using official Type Evaluation Format",
-                "data": {
-                    "id": classification_id,
-                    "status": "completed",
-                    "totalTraits": 20
-                }
-            }
-            
-        except Exception as e:
-            await db.classifications.update_one(
-                {"_id": ObjectId(classification_id)},
-                {"$set": {"status": "failed", "error": str(e), "updatedAt": now_ist()}}
-            )
-            # Mark processing as failed in status store
-            processing_status.complete(classification_id, success=False, error=str(e))
-            logger.exception(f"Classification {classification_id} failed: {str(e)}")
-            raise HTTPException(500, f"Processing failed: {str(e)}")
+    if await processing_queue.is_pending(classification_id):
+        raise HTTPException(409, f"Classification {classification_id} is already queued or processing")
+    
+    # Progress of an earlier run would otherwise be reported until this one starts
+    processing_status.remove(classification_id)
+    
+    try:
+        position = await processing_queue.submit(classification_id)
+    except JobPending as e:
+        # A concurrent request queued it first: its document is left as is
+        raise HTTPException(409, str(e))
+    except QueueFull as e:
+        raise HTTPException(503, f"Processing queue is full: {str(e)}", headers={"Retry-After": "30"})
+    
+    # Marked queued only once the job exists, and only if no worker (in any process)
+    # has claimed it and updated the document in the meantime
+    await db.classifications.update_one(
+        {"_id": ObjectId(classification_id), "status": classification['status'],
+         "updatedAt": classification.get('updatedAt')},
+        {"$set": {"status": "queued", "updatedAt": now_ist()}, "$unset": {"error": "", "progress": ""}}
+    )
+    
+    logger.info(f"Classification {classification_id} queued (position {position})")
+    
+    return {
+        "success": True,
+        "message": "Classification queued for processing",
+        "data": {
+            "id": classification_id,
+            "status": "queued",
+            "queuePosition": position,
+            "statusUrl": f"{settings.API_V1_STR}/classification/{classification_id}/status",
+            "resultsUrl": f"{settings.API_V1_STR}/classification/{classification_id}/results"
+        }
+    }
 
 @router.get("/{classification_id}/results")
 async def get_results(classification_id: str):
@@ -238,7 +208,7 @@ async def get_results(classification_id: str):
 async def get_status(classification_id: str):
     """Get real-time processing status with detailed progress"""
     
-    # First check if we have detailed processing status
+    # First check if we have detailed processing status (classification running in this process)
     detailed_status = processing_status.get(classification_id)
     
     if detailed_status:
@@ -259,13 +229,27 @@ async def get_status(classification_id: str):
     if not classification:
         raise HTTPException(404, "Classification not found")
     
+    if classification['status'] == 'processing' and classification.get('progress'):
+        # Detailed progress published by the worker processing it
+        return {
+            "success": True,
+            "data": classification['progress']
+        }
+    
+    data = {
+        "id": classification_id,
+        "status": classification['status'],
+        "updatedAt": classification['updatedAt']
+    }
+    position = await processing_queue.position(classification_id)
+    if position is not None:
+        data["queuePosition"] = position
+    if classification.get('error'):
+        data["error"] = classification['error']
+    
     return {
         "success": True,
-        "data": {
-            "id": classification_id,
-            "status": classification['status'],
-            "updatedAt": classification['updatedAt']
-        }
+        "data": data
     }
 
 @router.get("/list")
@@ -381,12 +365,26 @@ async def delete_classification(classification_id: str):
     if not classification:
         raise HTTPException(404, "Classification not found")
     
+    # Drop it from the queue, or stop its processing if running
+    # (the inference threads stop at their next checkpoint)
+    await processing_queue.discard(classification_id, REASON_DELETED)
+    
     # Delete the classification
     result = await db.classifications.delete_one({"_id": ObjectId(classification_id)})
     
     if result.deleted_count == 0:
         raise HTTPException(500, "Failed to delete classification")
     
+    try:
+        keypoint_store.remove(classification_id)
+    except Exception as e:
+        logger.warning(f"Keypoint store cleanup failed for {classification_id}: {e}")
+    
+    try:
+        await view_checkpoints.clear(classification_id)
+    except Exception as e:
+        logger.warning(f"Checkpoint cleanup failed for {classification_id}: {e}")
+    
     return {
         "success": True,
         "message": "Classification deleted successfully",
@@ -0,0 +1,149 @@
+from typing import Optional
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from ml_models.model_registry import model_registry
+from ml_models.inference import batching_stats
+from ml_models.result_cache import result_cache
+from ml_models.lazy_imports import import_profile
+from ml_models.prefork import memory_report
+from ml_models.scheduler import inference_scheduler
+from ml_models.cascade import resolution_cascade
+from ml_models.keypoint_store import keypoint_store
+from ml_models.model_downloader import verify_all_models
+from app.services.job_queue import processing_queue
+from app.services.view_checkpoints import view_checkpoints
+from app.services.pipeline_stages import stage_stats
+from app.core.config import settings
+from app.services.rescoring_service import export_job, rescore_job, start_export, start_rescore
+
+router = APIRouter(prefix="/system", tags=["System"])
+
+@router.get("/models")
+async def get_model_stats():
+    """Resident model registry statistics (hits, misses, evictions)"""
+    return {
+        "success": True,
+        "data": model_registry.stats()
+    }
+
+@router.get("/weights")
+def get_weights_status(rehash: bool = False):
+    """Weights files verified against the manifest (sync: hashing runs in the threadpool)"""
+    return {
+        "success": True,
+        "data": verify_all_models(rehash=rehash)
+    }
+
+@router.get("/batching")
+async def get_batching_stats():
+    """Micro-batching statistics per view model"""
+    return {
+        "success": True,
+        "data": batching_stats()
+    }
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Keypoint result cache statistics (hit rate, inference time saved)"""
+    return {
+        "success": True,
+        "data": result_cache.stats()
+    }
+
+@router.get("/imports")
+async def get_import_profile():
+    """Import-time profile of the app and the lazily imported ML libraries"""
+    return {
+        "success": True,
+        "data": import_profile()
+    }
+
+@router.get("/scheduler")
+async def get_scheduler_stats():
+    """Inference thread policy, per-concurrency decisions and measured throughput"""
+    return {
+        "success": True,
+        "data": inference_scheduler.stats()
+    }
+
+@router.get("/cascade")
+async def get_cascade_stats():
+    """Resolution cascade thresholds and per-view escalation rates"""
+    return {
+        "success": True,
+        "data": resolution_cascade.stats()
+    }
+
+@router.get("/queue")
+async def get_queue_stats():
+    """Processing jobs per state, expired leases and this process's workers (and the pipeline stages)"""
+    stats = await processing_queue.stats()
+    if settings.JOB_RUNNER == "pipeline":
+        stats["stages"] = await stage_stats()
+    return {
+        "success": True,
+        "data": stats
+    }
+
+@router.get("/checkpoints")
+async def get_checkpoint_stats():
+    """View checkpoints saved, restored by retried jobs, and found stale"""
+    return {
+        "success": True,
+        "data": view_checkpoints.stats()
+    }
+
+@router.get("/memory")
+async def get_memory_report():
+    """Memory per serving process (shared vs private pages, pre-fork workers included)"""
+    return {
+        "success": True,
+        "data": memory_report()
+    }
+
+@router.post("/rescore")
+async def rescore_archive(batch_size: Optional[int] = None):
+    """Re-score archived classifications from their stored keypoints (runs in the background)"""
+    if not start_rescore(batch_size):
+        return JSONResponse(
+            status_code=409,
+            content={"success": False, "message": "A re-score is already running", "data": rescore_job.snapshot()}
+        )
+    return JSONResponse(
+        status_code=202,
+        content={"success": True, "message": "Re-score started", "data": rescore_job.snapshot()}
+    )
+
+@router.get("/rescore")
+async def get_rescore_status():
+    """Progress of the current or last archive re-score"""
+    return {
+        "success": True,
+        "data": rescore_job.snapshot()
+    }
+
+@router.get("/keypoints")
+async def get_keypoint_store_stats():
+    """Columnar keypoint store statistics and the progress of the last export"""
+    return {
+        "success": True,
+        "data": {**keypoint_store.stats(), "export": export_job.snapshot()}
+    }
+
+@router.post("/keypoints/export")
+async def export_keypoint_store(batch_size: Optional[int] = None):
+    """Backfill the columnar keypoint store from the archive (runs in the background)"""
+    if not keypoint_store.enabled:
+        return JSONResponse(
+            status_code=409,
+            content={"success": False, "message": "Keypoint store is disabled (KEYPOINT_STORE_DIR)"}
+        )
+    if not start_export(batch_size):
+        return JSONResponse(
+            status_code=409,
+            content={"success": False, "message": "An export is already running", "data": export_job.snapshot()}
+        )
+    return JSONResponse(
+        status_code=202,
+        content={"success": True, "message": "Export started", "data": export_job.snapshot()}
+    )
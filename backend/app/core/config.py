@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import Dict, List
 import json
 
 class Settings(BaseSettings):
@@ -24,6 +24,91 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = 5242880  # 5MB
     ALLOWED_EXTENSIONS: set = {".jpg", ".jpeg", ".png"}
     
+    # ML model registry
+    # RAM budget for resident models in MB (-1 = auto from container memory, 0 = unload after every use)
+    MODEL_MEMORY_BUDGET_MB: int = -1
+    MODEL_MEMORY_RESERVED_MB: int = 448  # RAM kept free for the API when auto-detecting
+    
+    # Model weight downloads: mirror serving <MODEL_BASE_URL>/<model file> (empty = Hugging Face)
+    # and models fetched at once; interrupted downloads resume from their partial file
+    MODEL_BASE_URL: str = ""
+    MODEL_DOWNLOAD_WORKERS: int = 5
+    # Model sources tried in order: "bundle" (MODEL_BUNDLE_PATH), "local" (ml_models/weights),
+    # "remote" (download); offline deployments use "bundle,local"
+    MODEL_SOURCES: str = "bundle,local,remote"
+    MODEL_BUNDLE_PATH: str = ""  # python -m ml_models.model_downloader --bundle <file>
+    
+    # Inference concurrency (classifications running at once per process; 1 = sequential, 512MB safe)
+    MAX_CONCURRENT_CLASSIFICATIONS: int = 1  # also the number of processing queue workers
+    VIEW_PARALLELISM: int = 1  # views analyzed at once per classification (0 = one per CPU core)
+    
+    # Processing queue: where jobs run, "api" (workers inside the API process), "external"
+    # (the API only queues; standalone `python -m app.worker` processes run the jobs) or
+    # "pipeline" (one `python -m app.worker --stage <view>` pool per view model + a merge stage)
+    JOB_RUNNER: str = "api"
+    PIPELINE_MERGE_CONCURRENCY: int = 8  # classifications in flight per merge stage process
+    PROCESSING_QUEUE_MAX_DEPTH: int = 20  # classifications waiting for a worker (0 = unbounded)
+    # Processing jobs persist in MongoDB: a worker holds a job under a lease renewed by its heartbeat;
+    # an expired lease (dead worker) lets another worker reclaim it. Failures retry with backoff.
+    JOB_LEASE_SECONDS: float = 60
+    JOB_MAX_ATTEMPTS: int = 3  # crash reclaims included
+    JOB_RETRY_DELAY_SECONDS: float = 30  # doubles per attempt
+    # Save each finished view in MongoDB, so retried / recovered jobs only run the missing views
+    VIEW_CHECKPOINTS_ENABLED: bool = True
+    
+    # Micro-batching of same-view images across concurrent classifications
+    BATCH_MAX_SIZE: int = 1  # images per batched predict (1 = batching disabled)
+    BATCH_MAX_WAIT_MS: int = 10  # how long a batch waits to fill up
+    
+    # Inference runtime for the view models: "ultralytics" (PyTorch), "onnx" (ONNX Runtime CPU)
+    # or "onnx-int8" (quantized); VIEW_BACKENDS overrides per view, e.g. "rear=onnx-int8,udder=onnx"
+    INFERENCE_BACKEND: str = "ultralytics"
+    VIEW_BACKENDS: str = ""
+    
+    # Keypoint result cache keyed by image content (resubmitted photos skip inference)
+    RESULT_CACHE_MAX_MB: int = 64  # 0 = disabled
+    RESULT_CACHE_PATH: str = ""  # SQLite file (default: ml_models/cache/keypoints.sqlite3)
+    
+    # Startup warm-up in the background: "off" (load on first request), "download" (fetch weights),
+    # "preload" (also load WARMUP_VIEWS into RAM) or "full" (also run a dummy inference)
+    WARMUP_MODE: str = "off"
+    WARMUP_VIEWS: str = ""  # comma-separated views to preload, e.g. "rear,side" (empty = all)
+    
+    # Trait scoring tables (<profile>.json per breed / animal type; empty = ml_models/scoring_tables)
+    SCORING_TABLES_DIR: str = ""
+    RESCORE_BATCH_SIZE: int = 200  # classifications per bulk update when re-scoring the archive
+    
+    # Columnar memory-mapped keypoint store for analytics (empty = disabled; use an absolute
+    # path, shared by every process of the deployment)
+    KEYPOINT_STORE_DIR: str = ""
+    
+    # Import numpy/OpenCV/torch/ultralytics in a background thread right after startup
+    # (False = import on the first classification)
+    PRELOAD_IMPORTS: bool = True
+    
+    # Pre-fork mode (gunicorn -c gunicorn.conf.py): load the view models (WARMUP_VIEWS, empty = all)
+    # in the master so workers share them copy-on-write
+    PREFORK_PRELOAD_MODELS: bool = True
+    
+    # Intra-op threads per model invocation: "auto" (a lone job gets all cores, concurrent jobs
+    # split them), "latency" (all cores each) or "throughput" (one thread each)
+    INFERENCE_THREAD_POLICY: str = "auto"
+    INFERENCE_THREADS: int = 0  # fixed threads per invocation (0 = decided by the policy)
+    INFERENCE_PIN_CORES: bool = False  # pre-fork mode: pin each worker to its own cores
+    
+    # Resolution cascade: predict at CASCADE_LOW_IMGSZ first, re-run at full size (640, or
+    # CASCADE_HIGH_IMGSZ per view) when keypoint confidence is below the view's threshold
+    CASCADE_ENABLED: bool = False
+    CASCADE_LOW_IMGSZ: int = 320
+    CASCADE_THRESHOLDS: str = ""  # "view=confidence" pairs, e.g. "side=0.6,udder=0.7" (default 0.5)
+    CASCADE_HIGH_IMGSZ: str = "udder=960"  # escalated size per view, e.g. the udder close-up
+    
+    # Time budgets (0 = unlimited): a view over its budget is abandoned and its traits marked
+    # unavailable; a classification over its budget finishes with the views done so far
+    VIEW_TIMEOUT_SECONDS: float = 120
+    VIEW_TIMEOUTS: str = ""  # "view=seconds" overrides, e.g. "udder=180"
+    CLASSIFICATION_TIMEOUT_SECONDS: float = 300
+    
     # CORS - as string that we'll parse
     ALLOWED_ORIGINS: str = "http://localhost:5173"
     
@@ -39,4 +124,32 @@ class Settings(BaseSettings):
             return [origin.strip() for origin in self.ALLOWED_ORIGINS.split(',')]
         return [self.ALLOWED_ORIGINS]
 
+    def get_warmup_views(self) -> List[str]:
+        """Parse WARMUP_VIEWS into a list of view keys (empty = all views)"""
+        return [view.strip() for view in self.WARMUP_VIEWS.split(',') if view.strip()]
+    
+    def get_model_sources(self) -> List[str]:
+        """Parse MODEL_SOURCES into an ordered list of sources"""
+        return [source.strip() for source in self.MODEL_SOURCES.split(',') if source.strip()]
+    
+    def get_view_backends(self) -> Dict[str, str]:
+        """Parse VIEW_BACKENDS "view=backend" pairs into a dict"""
+        pairs = [item.split('=', 1) for item in self.VIEW_BACKENDS.split(',') if '=' in item]
+        return {view.strip(): backend.strip() for view, backend in pairs}
+    
+    def get_cascade_thresholds(self) -> Dict[str, float]:
+        """Parse CASCADE_THRESHOLDS "view=confidence" pairs into a dict"""
+        pairs = [item.split('=', 1) for item in self.CASCADE_THRESHOLDS.split(',') if '=' in item]
+        return {view.strip(): float(value) for view, value in pairs}
+    
+    def get_cascade_high_imgsz(self) -> Dict[str, int]:
+        """Parse CASCADE_HIGH_IMGSZ "view=size" pairs into a dict"""
+        pairs = [item.split('=', 1) for item in self.CASCADE_HIGH_IMGSZ.split(',') if '=' in item]
+        return {view.strip(): int(value) for view, value in pairs}
+
+    def get_view_timeouts(self) -> Dict[str, float]:
+        """Parse VIEW_TIMEOUTS "view=seconds" pairs into a dict (other views: VIEW_TIMEOUT_SECONDS)"""
+        pairs = [item.split('=', 1) for item in self.VIEW_TIMEOUTS.split(',') if '=' in item]
+        return {view.strip(): float(value) for view, value in pairs}
+
 settings = Settings()
@@ -1,12 +1,26 @@
+import time
+_import_start = time.perf_counter()
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
 from app.core.database import connect_to_mongo, close_mongo_connection
-from app.api.routes import classification
+from app.api.routes import classification, system
+from app.services.ai_service import ai_service
+from app.services.job_queue import processing_queue
+from app.services.classification_runner import start_processing
+from app.services.pipeline_stages import start_stages, stop_stages
+from ml_models.warmup import start_warmup, warmup_state
+from ml_models.inference import configured_backends
+from ml_models.lazy_imports import record, runtime_modules, start_preload
 import os
 import logging
 
+# Heavy ML libraries (numpy, OpenCV, torch) are not part of the app import
+record("app.main", time.perf_counter() - _import_start)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -38,16 +52,34 @@ app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads"
 # Events
 @app.on_event("startup")
 async def startup():
-    """Initialize database connection (models load on-demand per request)"""
+    """Initialize database connection, start the processing workers and the optional model warm-up"""
     await connect_to_mongo()
+    # With external workers or pipeline stages the API only queues jobs and never loads a model
+    runs_jobs = settings.JOB_RUNNER == "api"
+    await start_processing(workers=settings.MAX_CONCURRENT_CLASSIFICATIONS if runs_jobs else 0)
+    if settings.JOB_RUNNER == "pipeline":
+        await start_stages()
+    if settings.PRELOAD_IMPORTS and runs_jobs:
+        start_preload(runtime_modules(configured_backends()))
+    warming = runs_jobs and start_warmup(settings.WARMUP_MODE, settings.get_warmup_views() or None)
     logger.info("=" * 60)
     logger.info("Application Startup Complete")
-    logger.info("Models will load on-demand (512MB RAM safe)")
+    if settings.JOB_RUNNER == "pipeline":
+        logger.info("Classifications are processed by pipeline stages (python -m app.worker --stage ...)")
+    elif not runs_jobs:
+        logger.info("Classifications are processed by external workers (python -m app.worker)")
+    elif warming:
+        logger.info(f"Model warm-up running in the background (mode: {settings.WARMUP_MODE})")
+    else:
+        logger.info("Models will load on-demand and stay resident within the RAM budget")
     logger.info(f"API Docs: {settings.API_V1_STR}/docs")
     logger.info("=" * 60)
 
 @app.on_event("shutdown")
 async def shutdown():
+    await processing_queue.stop()
+    await stop_stages()
+    ai_service.shutdown()
     await close_mongo_connection()
 
 
@@ -58,8 +90,17 @@ async def health_check():
     return {"status": "healthy", "version": settings.VERSION}
 
 
+# Readiness endpoint: 503 until the startup warm-up has finished
+@app.get("/ready")
+async def readiness_check():
+    """Report whether the model warm-up is complete"""
+    state = warmup_state.snapshot()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
+
 # Routes
 app.include_router(classification.router, prefix=settings.API_V1_STR)
+app.include_router(system.router, prefix=settings.API_V1_STR)
 
 @app.get("/")
 async def root():
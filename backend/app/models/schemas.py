@@ -29,8 +29,9 @@ class ImageInfo(BaseModel):
 
 class TraitScore(BaseModel):
     trait: str
-    score: int = Field(ge=1, le=9)
+    score: Optional[int] = Field(ge=1, le=9)  # None: the trait's view was unavailable
     measurement: Optional[float] = None
+    source: Optional[str] = None  # "model", "unavailable" (None: baseline estimate)
 
 class OfficialFormatResponse(BaseModel):
     villageName: str
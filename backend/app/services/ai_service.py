@@ -5,10 +5,39 @@ Uses side view model for detailed side view analysis
 """
 from app.models.trait_definitions import TRAIT_DEFINITIONS, get_all_traits_flat
 from app.services.status_store import processing_status
-from typing import List, Dict
+from app.services.view_checkpoints import view_checkpoints, view_fingerprint
+from app.core.config import settings
+from ml_models.model_registry import model_registry
+from ml_models.inference import configure_backend, configure_batching
+from ml_models.model_downloader import VIEW_MODELS, configure_downloads, configure_sources
+from ml_models.result_cache import result_cache
+from ml_models.keypoint_store import keypoint_store
+from ml_models.scheduler import inference_scheduler
+from ml_models.cascade import resolution_cascade
+from ml_models.cancellation import (
+    REASON_TIMEOUT, CancellationToken, OperationCancelled, bind_token, cancellation_registry, checkpoint
+)
+from ml_models.scoring import DEFAULT_PROFILE, configure_scoring, resolve_profile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, List, Dict, Optional, Tuple
+import asyncio
+import os
 import random
 from datetime import datetime
 
+# Processing steps in upload order: (view key, label)
+VIEW_STEPS = [
+    ('rear', 'rear view'),
+    ('side', 'side view'),
+    ('top', 'top view'),
+    ('udder', 'udder view'),
+    ('side_udder', 'side-udder view')
+]
+
+# Runs one view outside this process:
+# (classification_id, step_index, token) -> (view output, restored from its checkpoint)
+ViewRunner = Callable[[str, int, CancellationToken], Awaitable[Tuple[Dict, bool]]]
+
 class AIService:
     """
     AI Service for cattle trait evaluation
@@ -17,95 +46,133 @@ class AIService:
     def __init__(self):
         """Initialize service"""
         self.traits = get_all_traits_flat()
-        print("✓ AI Service initialized for trait evaluation")
+        configure_downloads(settings.MODEL_BASE_URL or None, settings.MODEL_DOWNLOAD_WORKERS)
+        configure_sources(settings.get_model_sources(), settings.MODEL_BUNDLE_PATH or None)
+        model_registry.configure(settings.MODEL_MEMORY_BUDGET_MB, settings.MODEL_MEMORY_RESERVED_MB)
+        configure_batching(settings.BATCH_MAX_SIZE, settings.BATCH_MAX_WAIT_MS)
+        configure_backend(settings.INFERENCE_BACKEND, {
+            VIEW_MODELS[view]: backend
+            for view, backend in settings.get_view_backends().items()
+            if view in VIEW_MODELS
+        })
+        result_cache.configure(settings.RESULT_CACHE_PATH or None, settings.RESULT_CACHE_MAX_MB)
+        configure_scoring(settings.SCORING_TABLES_DIR or None)
+        resolution_cascade.configure(
+            settings.CASCADE_ENABLED, settings.CASCADE_LOW_IMGSZ,
+            settings.get_cascade_thresholds(), settings.get_cascade_high_imgsz()
+        )
+        keypoint_store.configure(settings.KEYPOINT_STORE_DIR or None, enabled=bool(settings.KEYPOINT_STORE_DIR))
+        self.view_parallelism = self._resolve_view_parallelism(settings.VIEW_PARALLELISM)
+        # Model invocations at once decide how the cores are split between them
+        inference_scheduler.configure(
+            settings.INFERENCE_THREAD_POLICY, settings.INFERENCE_THREADS,
+            max_jobs=max(1, settings.MAX_CONCURRENT_CLASSIFICATIONS) * self.view_parallelism
+        )
+        # Dedicated threads for blocking model inference, keeping the event loop free.
+        # Threads (not processes) so the model registry and status store stay shared;
+        # torch and OpenCV release the GIL during the heavy work.
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.MAX_CONCURRENT_CLASSIFICATIONS) * self.view_parallelism,
+            thread_name_prefix="inference"
+        )
+        print(f"✓ AI Service initialized for trait evaluation (view parallelism: {self.view_parallelism})")
+    
+    @staticmethod
+    def _resolve_view_parallelism(configured: int) -> int:
+        """Views analyzed at once per classification (0 = one per CPU core)"""
+        if configured <= 0:
+            configured = os.cpu_count() or 1
+        return max(1, min(configured, len(VIEW_STEPS)))
     
-    async def classify_animal(self, image_paths: List[str], animal_info: Dict, classification_id: str = None) -> Dict:
+    def shutdown(self):
+        """Stop the inference executor (called on application shutdown)"""
+        self._executor.shutdown(wait=False)
+    
+    async def classify_animal(self, image_paths: List[str], animal_info: Dict, classification_id: str = None,
+                              view_runner: Optional[ViewRunner] = None) -> Dict:
         """
-        Generate trait scores for cattle classification using ML models
+        Generate trait scores for cattle classification using ML models.
+        Views run in the dedicated inference executor, up to VIEW_PARALLELISM at once.
+        A view over its time budget is abandoned and its traits marked unavailable;
+        the classification stops early when cancelled (cancellation_registry.cancel).
+        Each finished view is checkpointed, so a retry of the classification only
+        runs the views without a valid checkpoint.
+        With a view_runner the views run elsewhere (the pipeline stages) and this
+        process only waits for their outputs and merges them.
         
         Args:
             image_paths: 5 image paths in order [rear, side, top, udder, side_udder]
             animal_info: Animal details dict
-            classification_id: Optional classification ID for status tracking
+            classification_id: Optional classification ID for status tracking and cancellation
+            view_runner: Optional coroutine view_runner(classification_id, step_index, token)
+                returning (view output, restored), instead of running the view in this process
         
         Returns:
-            Complete classification results with trait scores
+            Complete classification results with trait scores (the processing status
+            stays running: the caller completes it once the results are stored)
+        
+        Raises:
+            OperationCancelled: The classification was cancelled (deleted, client gone)
         """
         # Initialize status tracking if classification_id provided
         if classification_id:
             processing_status.initialize(classification_id)
+            job_token = cancellation_registry.register(classification_id, settings.CLASSIFICATION_TIMEOUT_SECONDS)
+        else:
+            job_token = CancellationToken(settings.CLASSIFICATION_TIMEOUT_SECONDS)
         
-        print(f"✓ Processing classification with {len(image_paths)} images")
-        print(f"  Using ML models for trait analysis")
-        
-        # Process all views with ML models
-        model_results = {}
-        
-        # 1. Rear view (index 0): BCS + Rump + Legs
-        if len(image_paths) >= 1:
-            rear_view_path = image_paths[0]
-            if classification_id:
-                processing_status.update_step(classification_id, 0, "processing", "Analyzing rear view...")
-            
-            print(f"\n[1/5] Processing rear view: {rear_view_path}")
-            model_results['bcs'] = self._process_bcs(rear_view_path)
-            model_results['rear'] = self._process_rear_view(rear_view_path)
-            
-            if classification_id:
-                traits_count = len(model_results['rear'].get('traits', [])) if model_results['rear'] else 0
-                processing_status.update_step(classification_id, 0, "completed", f"✓ {traits_count + 1} traits detected")
+        # Trait thresholds for this breed / animal type (falls back to the default tables)
+        scoring_profile = resolve_profile(animal_info.get('animalType'), animal_info.get('breed'))
         
-        # 2. Side view (index 1): Body measurements + Feet/Legs + Rump angle
-        if len(image_paths) >= 2:
-            side_view_path = image_paths[1]
-            if classification_id:
-                processing_status.update_step(classification_id, 1, "processing", "Analyzing side view...")
-            
-            print(f"\n[2/5] Processing side view: {side_view_path}")
-            model_results['side'] = self._process_side_view(side_view_path)
-            
-            if classification_id:
-                traits_count = len(model_results['side'].get('traits', [])) if model_results['side'] else 0
-                processing_status.update_step(classification_id, 1, "completed", f"✓ {traits_count} traits detected")
-        
-        # 3. Top view (index 2): Chest width
-        if len(image_paths) >= 3:
-            top_view_path = image_paths[2]
-            if classification_id:
-                processing_status.update_step(classification_id, 2, "processing", "Analyzing top view...")
-            
-            print(f"\n[3/5] Processing top view: {top_view_path}")
-            model_results['top'] = self._process_top_view(top_view_path)
-            
-            if classification_id:
-                traits_count = len(model_results['top'].get('traits', [])) if model_results['top'] else 0
-                processing_status.update_step(classification_id, 2, "completed", f"✓ {traits_count} traits detected")
+        print(f"✓ Processing classification with {len(image_paths)} images")
+        print(f"  Using ML models for trait analysis (scoring profile: {scoring_profile})")
+        
+        # Remote views only wait here, so all of them are dispatched at once
+        view_slots = asyncio.Semaphore(len(VIEW_STEPS) if view_runner else self.view_parallelism)
+        
+        # Views finished by an earlier attempt of this classification
+        saved_views = await view_checkpoints.load(classification_id) if classification_id and not view_runner else {}
+        restored_views = []
+        
+        async def run_step(step_index: int, image_path: str) -> Dict:
+            # Views are submitted in upload order, so parallelism 1 is today's sequential mode
+            async with view_slots:
+                view_key = VIEW_STEPS[step_index][0]
+                if view_runner is None:
+                    output, restored = await self.run_view(step_index, image_path, classification_id,
+                                                           scoring_profile, job_token, saved_views.get(view_key))
+                else:
+                    # The view's pipeline stage applies its budget and checkpoints it
+                    view_token = job_token.child()
+                    try:
+                        output, restored = await view_runner(classification_id, step_index, view_token)
+                    except OperationCancelled:
+                        return self._abandon_view(step_index, view_token.reason, classification_id)
+                if restored:
+                    restored_views.append(view_key)
+                return output
         
-        # 4. Udder view (index 3): Teat measurements + udder dimensions
-        if len(image_paths) >= 4:
-            udder_view_path = image_paths[3]
-            if classification_id:
-                processing_status.update_step(classification_id, 3, "processing", "Analyzing udder view...")
-            
-            print(f"\n[4/5] Processing udder view: {udder_view_path}")
-            model_results['udder'] = self._process_udder_view(udder_view_path)
-            
+        try:
+            # Views are independent until the merge, so they can finish in any order
+            step_outputs = await asyncio.gather(*[
+                run_step(step_index, image_path)
+                for step_index, image_path in enumerate(image_paths[:len(VIEW_STEPS)])
+            ])
+            
+            # An expired classification keeps its finished views; any other cancellation stops it
+            if job_token.cancelled and job_token.reason != REASON_TIMEOUT:
+                if classification_id:
+                    processing_status.complete(classification_id, success=False,
+                                               error=f"Cancelled: {job_token.reason}")
+                raise OperationCancelled(job_token.reason)
+        finally:
             if classification_id:
-                traits_count = len(model_results['udder'].get('traits', [])) if model_results['udder'] else 0
-                processing_status.update_step(classification_id, 3, "completed", f"✓ {traits_count} traits detected")
+                cancellation_registry.release(classification_id, job_token)
         
-        # 5. Side-udder view (index 4): Udder attachment + depth
-        if len(image_paths) >= 5:
-            side_udder_path = image_paths[4]
-            if classification_id:
-                processing_status.update_step(classification_id, 4, "processing", "Analyzing side-udder view...")
-            
-            print(f"\n[5/5] Processing side-udder view: {side_udder_path}")
-            model_results['side_udder'] = self._process_side_udder_view(side_udder_path)
-            
-            if classification_id:
-                traits_count = len(model_results['side_udder'].get('traits', [])) if model_results['side_udder'] else 0
-                processing_status.update_step(classification_id, 4, "completed", f"✓ {traits_count} traits detected")
+        # Process all views with ML models
+        model_results = {}
+        for output in step_outputs:
+            model_results.update(output)
         
         # Generate base results structure
         results = self._generate_mock_results(animal_info)
@@ -113,20 +180,173 @@ class AIService:
         # Merge all model results
         print(f"\n✓ Merging model results into official format...")
         results = self._merge_all_model_results(results, model_results)
+        results['scoringProfile'] = scoring_profile
+        results['mlModelsMeta']['restored_views'] = restored_views
         
-        # Mark as complete
-        if classification_id:
-            processing_status.complete(classification_id, success=True)
-        
+        # The caller marks the status complete once the results are stored
         print(f"✓ Classification complete with overall score: {results['overallScore']}")
         return results
     
-    def _process_side_view(self, image_path: str) -> Dict:
+    async def run_view(self, step_index: int, image_path: str, classification_id: Optional[str],
+                       scoring_profile: str, job_token: CancellationToken,
+                       saved: Optional[Dict] = None) -> Tuple[Dict, bool]:
+        """
+        Run one view in the inference executor under its time budget, or restore it
+        from its checkpoint; a finished view is checkpointed.
+        
+        Args:
+            step_index: Index into VIEW_STEPS
+            image_path: Path to the view image
+            classification_id: Optional classification ID for status tracking and checkpoints
+            scoring_profile: Scoring tables used for the view's traits
+            job_token: Token of the classification; the view's own budget is a child of it
+            saved: The view's checkpoint from an earlier attempt (None = none)
+        
+        Returns:
+            (partial model results, whether they were restored from the checkpoint)
+        """
+        loop = asyncio.get_running_loop()
+        view_key, label = VIEW_STEPS[step_index]
+        fingerprint = None
+        if saved is not None:
+            fingerprint = await loop.run_in_executor(self._executor, view_fingerprint, view_key, image_path)
+            output = view_checkpoints.restore(saved, fingerprint, scoring_profile)
+            if output is not None:
+                print(f"  ✓ {label.capitalize()} restored from its checkpoint")
+                if classification_id:
+                    processing_status.update_step(classification_id, step_index, "completed",
+                                                  "✓ Restored from checkpoint")
+                return output, True
+        
+        # The view's budget starts once it runs, and never outlasts the job's
+        view_timeouts = settings.get_view_timeouts()
+        view_token = job_token.child(view_timeouts.get(view_key, settings.VIEW_TIMEOUT_SECONDS))
+        if view_token.cancelled:
+            return self._abandon_view(step_index, view_token.reason, classification_id), False
+        
+        future = loop.run_in_executor(
+            self._executor, self._run_view_step, step_index, image_path,
+            classification_id, scoring_profile, view_token
+        )
+        # Wake up on cancellation too, not only on completion or the deadline
+        stopped = loop.create_future()
+        view_token.add_callback(lambda reason: loop.call_soon_threadsafe(
+            lambda: stopped.done() or stopped.set_result(reason)
+        ))
+        try:
+            await asyncio.wait({future, stopped}, timeout=view_token.remaining(),
+                               return_when=asyncio.FIRST_COMPLETED)
+            if future.done():
+                output = future.result()
+                if classification_id and view_checkpoints.enabled and output.get(view_key):
+                    # Only model results are kept: a failed model runs again next time
+                    if fingerprint is None:
+                        fingerprint = await loop.run_in_executor(
+                            self._executor, view_fingerprint, view_key, image_path
+                        )
+                    if fingerprint is not None:
+                        await view_checkpoints.save(classification_id, view_key, fingerprint,
+                                                    scoring_profile, output)
+                return output, False
+        except OperationCancelled:
+            pass
+        finally:
+            stopped.cancel()
+        
+        # The thread cannot be interrupted: it stops at its next checkpoint
+        future.cancel()
+        if not view_token.cancelled:
+            view_token.cancel(REASON_TIMEOUT)
+        return self._abandon_view(step_index, view_token.reason, classification_id), False
+    
+    def _abandon_view(self, step_index: int, reason: str, classification_id: str = None) -> Dict:
+        """
+        Results of a view that did not finish: its traits are marked unavailable
+        
+        Args:
+            step_index: Index into VIEW_STEPS
+            reason: Why the view was abandoned (timeout, deleted, ...)
+            classification_id: Optional classification ID for status tracking
+        
+        Returns:
+            Partial model results marking the view's models unavailable
+        """
+        view_key, label = VIEW_STEPS[step_index]
+        print(f"  ⚠ {label.capitalize()} abandoned ({reason}), its traits are unavailable")
+        if classification_id:
+            status = "timeout" if reason == REASON_TIMEOUT else "cancelled"
+            processing_status.update_step(classification_id, step_index, status, f"⚠ Abandoned: {reason}")
+        
+        output = {view_key: {'unavailable': reason}}
+        if view_key == 'rear':
+            output['bcs'] = {'unavailable': reason}
+        return output
+    
+    def _run_view_step(self, step_index: int, image_path: str, classification_id: str = None,
+                       scoring_profile: str = DEFAULT_PROFILE, token: Optional[CancellationToken] = None) -> Dict:
+        """
+        Run one view's analysis (blocking, runs in an inference thread)
+        
+        Args:
+            step_index: Index into VIEW_STEPS / processing status steps
+            image_path: Path to the view image
+            classification_id: Optional classification ID for status tracking
+            scoring_profile: Scoring tables used for the view's traits
+            token: Cancellation token checked between the models of the view
+        
+        Returns:
+            Partial model results keyed by model name
+        
+        Raises:
+            OperationCancelled: The token was cancelled or expired at a checkpoint
+        """
+        with bind_token(token):
+            checkpoint()
+            return self._analyze_view(step_index, image_path, classification_id, scoring_profile)
+    
+    def _analyze_view(self, step_index: int, image_path: str, classification_id: str = None,
+                      scoring_profile: str = DEFAULT_PROFILE) -> Dict:
+        """Body of _run_view_step, with the view's cancellation token bound"""
+        view_key, label = VIEW_STEPS[step_index]
+        if classification_id:
+            processing_status.update_step(classification_id, step_index, "processing", f"Analyzing {label}...")
+        
+        print(f"\n[{step_index + 1}/{len(VIEW_STEPS)}] Processing {label}: {image_path}")
+        output = {}
+        if view_key == 'rear':
+            # Rear view: BCS + Rump + Legs
+            output['bcs'] = self._process_bcs(image_path)
+            checkpoint()
+            output['rear'] = self._process_rear_view(image_path, scoring_profile)
+        elif view_key == 'side':
+            # Side view: Body measurements + Feet/Legs + Rump angle
+            output['side'] = self._process_side_view(image_path, scoring_profile)
+        elif view_key == 'top':
+            # Top view: Chest width
+            output['top'] = self._process_top_view(image_path, scoring_profile)
+        elif view_key == 'udder':
+            # Udder view: Teat measurements + udder dimensions
+            output['udder'] = self._process_udder_view(image_path, scoring_profile)
+        elif view_key == 'side_udder':
+            # Side-udder view: Udder attachment + depth
+            output['side_udder'] = self._process_side_udder_view(image_path, scoring_profile)
+        
+        if classification_id:
+            view_result = output.get(view_key)
+            traits_count = len(view_result.get('traits', [])) if view_result else 0
+            if view_key == 'rear':
+                traits_count += 1  # Body condition score
+            processing_status.update_step(classification_id, step_index, "completed", f"✓ {traits_count} traits detected")
+        
+        return output
+    
+    def _process_side_view(self, image_path: str, scoring_profile: str = DEFAULT_PROFILE) -> Dict:
         """
         Process side view image with the side view model
         
         Args:
             image_path: Path to side view image
+            scoring_profile: Scoring tables used for the traits
             
         Returns:
             Dictionary with processed traits or None if processing fails
@@ -135,7 +355,7 @@ class AIService:
             from ml_models.side_view_integration import process_side_view, extract_side_traits
             
             # Process with model
-            raw_data = process_side_view(image_path)
+            raw_data = process_side_view(image_path, scoring_profile)
             if not raw_data:
                 print("  ⚠ Side view model processing failed, using generated data")
                 return None
@@ -149,6 +369,7 @@ class AIService:
             
             return {
                 'traits': traits,
+                'pose': raw_data.get('pose'),
                 'meta': raw_data.get('meta', {})
             }
             
@@ -184,81 +405,81 @@ class AIService:
             print(f"  ⚠ BCS error: {e}")
             return None
     
-    def _process_rear_view(self, image_path: str) -> Dict:
+    def _process_rear_view(self, image_path: str, scoring_profile: str = DEFAULT_PROFILE) -> Dict:
         """
         Process rear view for rump and leg analysis
         """
         try:
             from ml_models.rear_view_integration import process_rear_view, extract_rear_traits
             
-            raw_data = process_rear_view(image_path)
+            raw_data = process_rear_view(image_path, scoring_profile)
             if not raw_data:
                 print("  ⚠ Rear view model failed")
                 return None
             
             traits = extract_rear_traits(raw_data)
             print(f"  ✓ Rear view: {len(traits)} traits")
-            return {'traits': traits, 'meta': raw_data.get('meta', {})}
+            return {'traits': traits, 'pose': raw_data.get('pose'), 'meta': raw_data.get('meta', {})}
             
         except Exception as e:
             print(f"  ⚠ Rear view error: {e}")
             return None
     
-    def _process_top_view(self, image_path: str) -> Dict:
+    def _process_top_view(self, image_path: str, scoring_profile: str = DEFAULT_PROFILE) -> Dict:
         """
         Process top view for chest width
         """
         try:
             from ml_models.top_view_integration import process_top_view, extract_top_traits
             
-            raw_data = process_top_view(image_path)
+            raw_data = process_top_view(image_path, scoring_profile)
             if not raw_data:
                 print("  ⚠ Top view model failed")
                 return None
             
             traits = extract_top_traits(raw_data)
             print(f"  ✓ Top view: {len(traits)} traits")
-            return {'traits': traits, 'meta': raw_data.get('meta', {})}
+            return {'traits': traits, 'pose': raw_data.get('pose'), 'meta': raw_data.get('meta', {})}
             
         except Exception as e:
             print(f"  ⚠ Top view error: {e}")
             return None
     
-    def _process_udder_view(self, image_path: str) -> Dict:
+    def _process_udder_view(self, image_path: str, scoring_profile: str = DEFAULT_PROFILE) -> Dict:
         """
         Process udder view for teat and udder measurements
         """
         try:
             from ml_models.udder_view_integration import process_udder_view, extract_udder_traits
             
-            raw_data = process_udder_view(image_path)
+            raw_data = process_udder_view(image_path, scoring_profile)
             if not raw_data:
                 print("  ⚠ Udder view model failed")
                 return None
             
             traits = extract_udder_traits(raw_data)
             print(f"  ✓ Udder view: {len(traits)} traits")
-            return {'traits': traits, 'meta': raw_data.get('meta', {})}
+            return {'traits': traits, 'pose': raw_data.get('pose'), 'meta': raw_data.get('meta', {})}
             
         except Exception as e:
             print(f"  ⚠ Udder view error: {e}")
             return None
     
-    def _process_side_udder_view(self, image_path: str) -> Dict:
+    def _process_side_udder_view(self, image_path: str, scoring_profile: str = DEFAULT_PROFILE) -> Dict:
         """
         Process side-udder view for udder attachment and depth
         """
         try:
             from ml_models.side_udder_integration import process_side_udder_view, extract_side_udder_traits
             
-            raw_data = process_side_udder_view(image_path)
+            raw_data = process_side_udder_view(image_path, scoring_profile)
             if not raw_data:
                 print("  ⚠ Side-udder view model failed")
                 return None
             
             traits = extract_side_udder_traits(raw_data)
             print(f"  ✓ Side-udder view: {len(traits)} traits")
-            return {'traits': traits, 'meta': raw_data.get('meta', {})}
+            return {'traits': traits, 'pose': raw_data.get('pose'), 'meta': raw_data.get('meta', {})}
             
         except Exception as e:
             print(f"  ⚠ Side-udder view error: {e}")
@@ -291,32 +512,8 @@ class AIService:
                     print(f"  ✓ Updated Body condition score: {bcs_data['score']} ({bcs_data['condition']})")
                     break
         
-        # Recalculate overall scores
-        all_scores = []
-        for section_traits in sections.values():
-            all_scores.extend([t['score'] for t in section_traits if t['score'] is not None])
-        
-        if all_scores:
-            overall = round(sum(all_scores) / len(all_scores), 1)
-            base_results['overallScore'] = overall
-            
-            # Update grade
-            if overall >= 7.5:
-                base_results['grade'] = "Excellent"
-            elif overall >= 6.0:
-                base_results['grade'] = "Good"
-            elif overall >= 4.0:
-                base_results['grade'] = "Fair"
-            else:
-                base_results['grade'] = "Poor"
-            
-            # Update category scores
-            base_results['categoryScores'] = {
-                cat: round(sum(t['score'] for t in traits if t['score'] is not None) / 
-                          len([t for t in traits if t['score'] is not None]), 1)
-                if [t for t in traits if t['score'] is not None] else 0
-                for cat, traits in sections.items()
-            }
+        # Recalculate overall scores, grade, category scores and milk yield
+        self._recalculate_summary(base_results)
         
         # Add BCS metadata
         base_results['bcsData'] = {
@@ -372,32 +569,8 @@ class AIService:
                             sections['Body Capacity'][i]['measurement'] = model_trait['measurement']
                         print(f"  ✓ Updated {official_name} from side view model: score={model_trait['score']}, measurement={model_trait['measurement']}")
         
-        # Recalculate overall scores after merging
-        all_scores = []
-        for section_traits in sections.values():
-            all_scores.extend([t['score'] for t in section_traits if t['score'] is not None])
-        
-        if all_scores:
-            overall = round(sum(all_scores) / len(all_scores), 1)
-            base_results['overallScore'] = overall
-            
-            # Update grade based on new overall score
-            if overall >= 7.5:
-                base_results['grade'] = "Excellent"
-            elif overall >= 6.0:
-                base_results['grade'] = "Good"
-            elif overall >= 4.0:
-                base_results['grade'] = "Fair"
-            else:
-                base_results['grade'] = "Poor"
-            
-            # Update category scores
-            base_results['categoryScores'] = {
-                cat: round(sum(t['score'] for t in traits if t['score'] is not None) / 
-                          len([t for t in traits if t['score'] is not None]), 1)
-                if [t for t in traits if t['score'] is not None] else 0
-                for cat, traits in sections.items()
-            }
+        # Recalculate overall scores, grade, category scores and milk yield
+        self._recalculate_summary(base_results)
         
         # Add metadata about model usage
         if 'meta' in side_view_data:
@@ -417,63 +590,68 @@ class AIService:
         Returns:
             Merged results with all available model data
         """
-        official_format = base_results.get('officialFormat', {})
-        sections = official_format.get('sections', {})
+        sections = base_results.get('officialFormat', {}).get('sections', {})
+        traits_updated = self._apply_model_traits(sections, model_results)
+        
+        print(f"  ✓ Updated {traits_updated} traits from ML models")
+        print(f"  ⚠ IMPORTANT: All measurements are in PIXELS, not centimeters!")
+        print(f"  ⚠ Scale conversion requires sticker detection (not yet implemented)")
+        
+        # Recalculate overall scores, grade, category scores and milk yield
+        self._recalculate_summary(base_results)
+        
+        # Keep each view's keypoints, so traits can be re-scored without re-running the models
+        base_results['modelKeypoints'] = {
+            view: model_results[view]['pose']
+            for view, _ in VIEW_STEPS
+            if model_results.get(view) and model_results[view].get('pose')
+        }
         
+        # Add model metadata
+        base_results['mlModelsMeta'] = {
+            'models_used': [k for k, v in model_results.items() if v is not None and not v.get('unavailable')],
+            'unavailable_models': {k: v['unavailable'] for k, v in model_results.items() if v and v.get('unavailable')},
+            'total_traits_from_models': traits_updated,
+            'model_versions': dict(VIEW_MODELS)
+        }
+        
+        return base_results
+    
+    def _apply_model_traits(self, sections: Dict, model_results: Dict) -> int:
+        """
+        Overwrite official format traits with model scores and measurements
+        
+        Args:
+            sections: Official format sections (updated in place)
+            model_results: Dictionary with model outputs keyed by 'bcs' and view
+        
+        Returns:
+            Number of traits whose score came from a model
+        """
         # Create a mapping from trait names to model data
         trait_updates = {}
         
+        # Traits of abandoned views get no score rather than a generated one
+        for key, result in model_results.items():
+            if result and result.get('unavailable'):
+                for name in self._view_trait_names(key):
+                    trait_updates[name] = {'unavailable': result['unavailable']}
+        
         # Process BCS
-        if model_results.get('bcs'):
+        if model_results.get('bcs') and not model_results['bcs'].get('unavailable'):
             trait_updates['Body condition score'] = {
                 'score': model_results['bcs']['score'],
                 'measurement': model_results['bcs']['score']
             }
         
-        # Process side view traits
-        if model_results.get('side') and model_results['side'].get('traits'):
-            for t in model_results['side']['traits']:
-                trait_name = t['trait']
-                trait_updates[trait_name] = {
-                    'score': t.get('score'),
-                    'measurement': t.get('measurement')
-                }
-        
-        # Process rear view traits
-        if model_results.get('rear') and model_results['rear'].get('traits'):
-            for t in model_results['rear']['traits']:
-                trait_name = t['trait']
-                trait_updates[trait_name] = {
-                    'score': t.get('score'),
-                    'measurement': t.get('measurement')
-                }
-        
-        # Process top view traits
-        if model_results.get('top') and model_results['top'].get('traits'):
-            for t in model_results['top']['traits']:
-                trait_name = t['trait']
-                trait_updates[trait_name] = {
-                    'score': t.get('score'),
-                    'measurement': t.get('measurement')
-                }
-        
-        # Process udder view traits
-        if model_results.get('udder') and model_results['udder'].get('traits'):
-            for t in model_results['udder']['traits']:
-                trait_name = t['trait']
-                trait_updates[trait_name] = {
-                    'score': t.get('score'),
-                    'measurement': t.get('measurement')
-                }
-        
-        # Process side-udder view traits
-        if model_results.get('side_udder') and model_results['side_udder'].get('traits'):
-            for t in model_results['side_udder']['traits']:
-                trait_name = t['trait']
-                trait_updates[trait_name] = {
-                    'score': t.get('score'),
-                    'measurement': t.get('measurement')
-                }
+        # Process view traits (side, rear, top, udder, side-udder)
+        for view in ('side', 'rear', 'top', 'udder', 'side_udder'):
+            if model_results.get(view) and model_results[view].get('traits'):
+                for t in model_results[view]['traits']:
+                    trait_updates[t['trait']] = {
+                        'score': t.get('score'),
+                        'measurement': t.get('measurement')
+                    }
         
         # Apply updates to official format
         traits_updated = 0
@@ -491,65 +669,105 @@ class AIService:
                             update_data = value
                             break
                 
-                if update_data:
+                if update_data and update_data.get('unavailable'):
+                    sections[section_name][i]['score'] = None
+                    sections[section_name][i]['measurement'] = None
+                    sections[section_name][i]['source'] = 'unavailable'
+                elif update_data:
                     if update_data.get('score') is not None:
                         sections[section_name][i]['score'] = update_data['score']
+                        sections[section_name][i]['source'] = 'model'
                         traits_updated += 1
                     if update_data.get('measurement') is not None:
                         sections[section_name][i]['measurement'] = update_data['measurement']
+                        sections[section_name][i]['source'] = 'model'
         
-        print(f"  ✓ Updated {traits_updated} traits from ML models")
-        print(f"  ⚠ IMPORTANT: All measurements are in PIXELS, not centimeters!")
-        print(f"  ⚠ Scale conversion requires sticker detection (not yet implemented)")
+        return traits_updated
+    
+    @staticmethod
+    def _view_trait_names(model_key: str) -> List[str]:
+        """Official trait names a model ('bcs' or a view) scores"""
+        if model_key == 'bcs':
+            return ['Body condition score']
+        from ml_models.view_analyzer import get_analyzer
+        return [spec.name for spec in get_analyzer(model_key).traits]
+    
+    def _recalculate_summary(self, results: Dict):
+        """
+        Recalculate overall score, grade, category scores and milk yield from the
+        official format sections (in place)
+        
+        Args:
+            results: Classification results with officialFormat.sections and animalInfo
+        """
+        sections = results.get('officialFormat', {}).get('sections', {})
         
-        # Recalculate overall scores
         all_scores = []
+        all_traits = []
         for section_traits in sections.values():
             all_scores.extend([t['score'] for t in section_traits if t['score'] is not None])
+            all_traits.extend(section_traits)
         
         if all_scores:
             overall = round(sum(all_scores) / len(all_scores), 1)
-            base_results['overallScore'] = overall
+            results['overallScore'] = overall
             
             # Update grade
             if overall >= 7.5:
-                base_results['grade'] = "Excellent"
+                results['grade'] = "Excellent"
             elif overall >= 6.0:
-                base_results['grade'] = "Good"
+                results['grade'] = "Good"
             elif overall >= 4.0:
-                base_results['grade'] = "Fair"
+                results['grade'] = "Fair"
             else:
-                base_results['grade'] = "Poor"
+                results['grade'] = "Poor"
             
             # Update category scores
-            base_results['categoryScores'] = {
+            results['categoryScores'] = {
                 cat: round(sum(t['score'] for t in traits if t['score'] is not None) / 
                           len([t for t in traits if t['score'] is not None]), 1)
                 if [t for t in traits if t['score'] is not None] else 0
                 for cat, traits in sections.items()
             }
         
-        # Add model metadata
-        base_results['mlModelsMeta'] = {
-            'models_used': [k for k, v in model_results.items() if v is not None],
-            'total_traits_from_models': traits_updated,
-            'model_versions': {
-                'side': 'side_view_model_v2.pt',
-                'rear': 'rear_view_model.pt',
-                'top': 'top_view_model.pt',
-                'udder': 'udder_view_model.pt',
-                'side_udder': 'cattle_side_udder.pt'
-            }
-        }
+        # Model measurements are in pixels, so only their scores feed the yield formula
+        yield_traits = [
+            {'trait': t['trait'], 'score': t['score']} if t.get('source') == 'model' else t
+            for t in all_traits
+        ]
+        results['milkYieldPrediction'] = self._calculate_milk_yield(yield_traits, results.get('animalInfo', {}))
+    
+    def rescore_results(self, results: Dict, scoring_profile: str = DEFAULT_PROFILE) -> Dict:
+        """
+        Re-score stored results from their persisted keypoints, without running any model.
+        Traits, category scores, grade and milk yield are recomputed in place.
         
-        return base_results
+        Args:
+            results: Stored classification results with modelKeypoints
+            scoring_profile: Scoring tables to apply
+        
+        Returns:
+            The updated results
+        """
+        from ml_models.view_analyzer import format_traits, get_analyzer
+        
+        model_results = {}
+        for view, record in (results.get('modelKeypoints') or {}).items():
+            traits = get_analyzer(view).traits_from_record(record, scoring_profile)
+            model_results[view] = {'traits': format_traits({'traits': traits})}
+        
+        sections = results.get('officialFormat', {}).get('sections', {})
+        self._apply_model_traits(sections, model_results)
+        self._recalculate_summary(results)
+        results['scoringProfile'] = scoring_profile
+        return results
 
     def _calculate_milk_yield(self, traits: List[Dict], animal_info: Dict) -> Dict:
         """
         Calculate daily milk yield prediction from body measurements
         """
-        measurements = {trait['trait']: trait.get('measurement', 0) for trait in traits}
-        scores = {trait['trait']: trait['score'] for trait in traits}
+        measurements = {trait['trait']: trait['measurement'] for trait in traits if trait.get('measurement') is not None}
+        scores = {trait['trait']: trait['score'] for trait in traits if trait.get('score') is not None}
         
         # Body measurements
         stature = measurements.get('Stature', 135)
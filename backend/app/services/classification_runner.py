@@ -0,0 +1,226 @@
+"""
+Classification Runner
+Runs queued classification jobs: loads the classification, runs the models
+through ai_service and writes the results back to MongoDB. Used by the
+processing queue workers, inside the API process, in standalone worker
+processes (python -m app.worker) or in the pipeline merge stage. Processing
+progress is mirrored into the classification document, so any API process can
+report it.
+"""
+from app.core.config import settings
+from app.core.database import get_database
+from app.services.ai_service import ViewRunner, ai_service
+from app.services.status_store import processing_status
+from app.services.view_checkpoints import view_checkpoints
+from app.services.job_queue import processing_queue
+from ml_models.keypoint_store import keypoint_store
+from ml_models.cancellation import REASON_DELETED, REASON_LEASE_LOST, REASON_SHUTDOWN, OperationCancelled
+from bson import ObjectId
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Set
+import asyncio
+import gc
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# IST timezone (UTC+5:30), as used for classification timestamps
+IST = timezone(timedelta(hours=5, minutes=30))
+
+def now_ist():
+    """Get current datetime in IST"""
+    return datetime.now(IST)
+
+
+async def run_classification(classification_id: str, attempt: int = 1, final: bool = True,
+                             view_runner: Optional[ViewRunner] = None):
+    """
+    Process a queued classification (run by the processing queue workers).
+    
+    Args:
+        classification_id: Classification to process
+        attempt: Attempt number of the job (1 = first run)
+        final: Whether a failure is final (otherwise the job is retried)
+        view_runner: Runs the views elsewhere (merge stage of the pipeline; None = in this process)
+    """
+    
+    db = await get_database()
+    
+    classification = await db.classifications.find_one({"_id": ObjectId(classification_id)})
+    if not classification:
+        logger.info(f"Classification {classification_id} was deleted while queued")
+        return
+    
+    logger.info(f"Processing classification {classification_id} (attempt {attempt})")
+    
+    await db.classifications.update_one(
+        {"_id": ObjectId(classification_id)},
+        {"$set": {"status": "processing", "attempt": attempt, "updatedAt": now_ist()}}
+    )
+    
+    try:
+        image_paths = [
+            os.path.join(settings.UPLOAD_DIR, img['filename'])
+            for img in classification['images']
+        ]
+        # Workers on other nodes need UPLOAD_DIR on shared storage; fail (and retry
+        # elsewhere) rather than score the views without their images
+        missing = [path for path in image_paths if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"Images not found on this worker: {', '.join(missing)}")
+        
+        # AI Classification with official format + status tracking
+        results = await ai_service.classify_animal(
+            image_paths=image_paths,
+            animal_info=classification['animalInfo'],
+            classification_id=classification_id,  # Pass ID for status tracking and cancellation
+            view_runner=view_runner
+        )
+        
+        await db.classifications.update_one(
+            {"_id": ObjectId(classification_id)},
+            {
+                "$set": {
+                    "results": results,
+                    "status": "completed",
+                    "updatedAt": now_ist()
+                }
+            }
+        )
+        # Only now: /status reporting "completed" sends clients to /results
+        processing_status.complete(classification_id, success=True)
+        
+        # Columnar copy of the keypoints for analytics (never fails the classification);
+        # off the event loop, as it may wait for another process's write
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, keypoint_store.put, classification_id, results.get('modelKeypoints') or {}
+            )
+        except Exception as e:
+            logger.warning(f"Keypoint store write failed for {classification_id}: {e}")
+        
+        # The stored results supersede the per-view checkpoints
+        try:
+            await view_checkpoints.clear(classification_id)
+        except Exception as e:
+            logger.warning(f"Checkpoint cleanup failed for {classification_id}: {e}")
+        
+        logger.info(f"Classification {classification_id} completed")
+        
+    except OperationCancelled as e:
+        if e.reason == REASON_SHUTDOWN:
+            # Back in the queue; the next start runs it again
+            status = "queued"
+        elif e.reason == REASON_LEASE_LOST:
+            # Another worker has taken the job over
+            raise
+        else:
+            status = "cancelled"
+        # A deleted classification has no document left to update
+        if e.reason != REASON_DELETED:
+            await db.classifications.update_one(
+                {"_id": ObjectId(classification_id)},
+                {"$set": {"status": status, "error": e.reason, "updatedAt": now_ist()}}
+            )
+        raise
+        
+    except Exception as e:
+        # A failed attempt goes back to the queue until the last one
+        await db.classifications.update_one(
+            {"_id": ObjectId(classification_id)},
+            {"$set": {"status": "failed" if final else "queued", "error": str(e), "updatedAt": now_ist()}}
+        )
+        if final:
+            # Mark processing as failed in status store
+            processing_status.complete(classification_id, success=False, error=str(e))
+        else:
+            # Report the queued retry from the database
+            processing_status.remove(classification_id)
+        raise
+    
+    finally:
+        # Final cleanup after all 5 models processed (resident models stay in the registry)
+        gc.collect()
+
+async def fail_classification(classification_id: str, error: str):
+    """Record a classification whose job ran out of attempts (its workers kept dying)"""
+    db = await get_database()
+    await db.classifications.update_one(
+        {"_id": ObjectId(classification_id)},
+        {"$set": {"status": "failed", "error": error, "updatedAt": now_ist()}}
+    )
+
+
+class ProgressPublisher:
+    """
+    Mirrors processing_status into the `progress` field of the classification
+    documents. Changes arrive from the inference threads and are written in
+    order, one write at a time per classification, keeping only the latest.
+    """
+    
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[str, Dict] = {}
+        self._flushing: Set[str] = set()
+    
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Publish processing status changes from now on (on startup, inside the event loop)"""
+        if self._loop is None:
+            processing_status.add_listener(self._changed)
+        self._loop = loop
+    
+    def _changed(self, classification_id: str, snapshot: Dict):
+        """Listener of processing_status (any thread)"""
+        try:
+            self._loop.call_soon_threadsafe(self._schedule, classification_id, snapshot)
+        except RuntimeError:
+            pass    # event loop closed (shutdown)
+    
+    def _schedule(self, classification_id: str, snapshot: Dict):
+        self._pending[classification_id] = snapshot
+        if classification_id not in self._flushing:
+            self._flushing.add(classification_id)
+            self._loop.create_task(self._flush(classification_id))
+    
+    async def _flush(self, classification_id: str):
+        try:
+            db = await get_database()
+            while classification_id in self._pending:
+                snapshot = self._pending.pop(classification_id)
+                await db.classifications.update_one(
+                    {"_id": ObjectId(classification_id)},
+                    {"$set": {"progress": snapshot}}
+                )
+        except Exception as e:
+            logger.warning(f"Progress of {classification_id} not published: {e}")
+        finally:
+            self._flushing.discard(classification_id)
+
+
+# Singleton instance
+progress_publisher = ProgressPublisher()
+
+
+async def start_processing(workers: int, handler: Optional[Callable[..., Awaitable[None]]] = None):
+    """
+    Connect the processing queue, checkpoints and progress publishing to MongoDB
+    and start the queue workers (API startup or standalone worker).
+
+    Args:
+        workers: Jobs run at once by this process (0 = only queue jobs)
+        handler: Job handler (default run_classification; the pipeline merge stage has its own)
+    """
+    db = await get_database()
+    progress_publisher.start(asyncio.get_running_loop())
+    await view_checkpoints.configure(db.view_checkpoints if settings.VIEW_CHECKPOINTS_ENABLED else None)
+    await processing_queue.start(
+        db.processing_jobs,
+        handler or run_classification,
+        fail_classification,
+        workers=workers,
+        max_depth=settings.PROCESSING_QUEUE_MAX_DEPTH,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        retry_delay=settings.JOB_RETRY_DELAY_SECONDS
+    )
@@ -0,0 +1,418 @@
+"""
+Processing Queue
+Durable queue of classification jobs, persisted in the MongoDB
+`processing_jobs` collection. POST /process only enqueues the job and returns
+202; a fixed pool of asyncio workers claims jobs in arrival order under a
+lease that a heartbeat keeps renewing. A job whose worker died (process
+restart, crash) is reclaimed once its lease expires, and failed jobs are
+retried with backoff up to JOB_MAX_ATTEMPTS.
+
+Job document:
+    _id             classification id (one job per classification)
+    status          queued | running | completed | failed | cancelled
+    attempts        claims so far (a reclaim after a crash counts as an attempt)
+    maxAttempts     attempts allowed
+    enqueuedAt      arrival time (FIFO order)
+    availableAt     not claimed before this time (retry backoff)
+    leaseOwner      worker holding the job ("<host>:<pid>:<worker>")
+    leaseExpiresAt  visibility timeout: other workers may reclaim the job after it
+    heartbeatAt     last lease renewal
+    cancelRequested reason, set when the job must stop on whichever worker runs it
+    lastError       error of the last failed attempt
+    result          what the handler returned, once completed (pipeline stages: the view output)
+    finishedAt      when the job completed, failed or was cancelled
+"""
+from typing import Awaitable, Callable, Dict, List, Optional
+from datetime import datetime, timezone, timedelta
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import asyncio
+import logging
+import os
+import socket
+
+from ml_models.cancellation import (
+    REASON_LEASE_LOST, REASON_SHUTDOWN, OperationCancelled, cancellation_registry
+)
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Seconds a stopping worker waits for its cancelled job to reach a checkpoint
+SHUTDOWN_GRACE_SECONDS = 10
+
+
+class QueueFull(Exception):
+    """The queue already holds its maximum number of waiting jobs"""
+
+
+class JobPending(Exception):
+    """The classification is already queued or running"""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ProcessingQueue:
+    """MongoDB-backed FIFO of classification ids served by a pool of worker tasks"""
+
+    def __init__(self, name: str = "Processing"):
+        self.name = name    # in logs and worker task names
+        self._collection = None
+        self._workers: List[asyncio.Task] = []
+        self._handler: Optional[Callable[..., Awaitable[None]]] = None
+        self._on_exhausted: Optional[Callable[[str, str], Awaitable[None]]] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._running: Dict[str, str] = {}    # id -> lease owner, jobs run by this process
+        self.max_depth = 0
+        self.lease_seconds = 60.0
+        self.max_attempts = 3
+        self.retry_delay = 30.0
+        self.poll_seconds = 1.0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.cancelled = 0
+        self.reclaimed = 0
+        self._owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def start(self, collection, handler: Callable[..., Awaitable[None]],
+                    on_exhausted: Callable[[str, str], Awaitable[None]],
+                    workers: int, max_depth: int, lease_seconds: float = 60,
+                    max_attempts: int = 3, retry_delay: float = 30, poll_seconds: float = 1):
+        """
+        Start the worker tasks (on application startup, inside the event loop).
+
+        Args:
+            collection: Motor collection holding the jobs (or an in-process fake with the same API)
+            handler: Coroutine handler(classification_id, attempt=, final=) processing one
+                classification; it records the outcome itself and re-raises failures
+                and OperationCancelled. Its return value is kept as the job's result
+            on_exhausted: Coroutine on_exhausted(classification_id, error) recording a job
+                whose last attempt was lost (its worker died)
+            workers: Jobs processed at once by this process (0 = only submit jobs, for an
+                API whose jobs run in standalone workers)
+            max_depth: Jobs allowed to wait for a worker (0 = unbounded)
+            lease_seconds: Visibility timeout of a claimed job; renewed every third of it
+            max_attempts: Attempts per job, crash reclaims included
+            retry_delay: Backoff before the first retry (doubles per attempt)
+            poll_seconds: How often idle workers look for jobs (submissions wake them at once)
+        """
+        self._collection = collection
+        self._handler = handler
+        self._on_exhausted = on_exhausted
+        self.max_depth = max(0, max_depth)
+        self.lease_seconds = max(3.0, lease_seconds)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = max(0.0, retry_delay)
+        self.poll_seconds = max(0.05, poll_seconds)
+        self._owner_prefix = f"{socket.gethostname()}:{os.getpid()}"    # pid after a fork
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+
+        await collection.create_index([("status", ASCENDING), ("enqueuedAt", ASCENDING)])
+        await collection.create_index([("status", ASCENDING), ("leaseExpiresAt", ASCENDING)])
+
+        self._workers = [
+            asyncio.create_task(self._worker(index), name=f"{self.name.lower()}-worker-{index}")
+            for index in range(max(0, workers))
+        ]
+        logger.info(f"{self.name} queue: {len(self._workers)} workers, "
+                    f"max depth {self.max_depth or 'unbounded'}, lease {self.lease_seconds:.0f}s, "
+                    f"{self.max_attempts} attempts")
+
+    async def stop(self):
+        """
+        Stop the workers. Running jobs are cancelled and handed back to the queue
+        (without using up an attempt), so the next start picks them up again.
+        """
+        self._stopping = True
+        for classification_id in list(self._running):
+            cancellation_registry.cancel(classification_id, REASON_SHUTDOWN)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._workers:
+            _, pending = await asyncio.wait(self._workers, timeout=SHUTDOWN_GRACE_SECONDS)
+            for worker in pending:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, classification_id: str) -> int:
+        """
+        Queue a classification for processing.
+
+        Returns:
+            Its position in the queue (1 = next to start)
+
+        Raises:
+            JobPending: the classification is already queued or running
+            QueueFull: max_depth jobs are already waiting
+            RuntimeError: the queue was not started
+        """
+        if self._collection is None:
+            raise RuntimeError(f"{self.name} queue is not running")
+        waiting = await self._collection.count_documents({"status": QUEUED})
+        if self.max_depth and waiting >= self.max_depth:
+            raise QueueFull(f"{waiting} classifications are already waiting")
+
+        now = _now()
+        job = {
+            "status": QUEUED,
+            "attempts": 0,
+            "maxAttempts": self.max_attempts,
+            "enqueuedAt": now,
+            "availableAt": now,
+            "leaseOwner": None,
+            "leaseExpiresAt": None,
+            "heartbeatAt": None,
+            "cancelRequested": None,
+            "lastError": None,
+            "result": None,
+            "finishedAt": None
+        }
+        try:
+            # Replaces a finished job; for a queued or running one the upsert tries
+            # to insert a second document with the same _id, which is rejected
+            await self._collection.update_one(
+                {"_id": classification_id, "status": {"$nin": [QUEUED, RUNNING]}},
+                {"$set": job},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            raise JobPending(f"Classification {classification_id} is already queued or processing")
+
+        self._wakeup.set()
+        return await self.position(classification_id) or 1
+
+    async def discard(self, classification_id: str, reason: str) -> bool:
+        """
+        Stop a job (e.g. its classification was deleted): a waiting job is
+        dropped, a running one is cancelled on whichever worker runs it.
+
+        Returns:
+            True if the job was waiting or running
+        """
+        if self._collection is None:
+            return False
+        result = await self._collection.update_one(
+            {"_id": classification_id, "status": QUEUED},
+            {"$set": {"status": CANCELLED, "lastError": reason, "finishedAt": _now()}}
+        )
+        if result.modified_count:
+            return True
+        result = await self._collection.update_one(
+            {"_id": classification_id, "status": RUNNING},
+            {"$set": {"cancelRequested": reason}}
+        )
+        # Stop it now if it runs here; other processes see the request at their next heartbeat
+        cancellation_registry.cancel(classification_id, reason)
+        return bool(result.modified_count)
+
+    async def job(self, classification_id: str) -> Optional[Dict]:
+        """The job document of a classification (None if it was never queued)"""
+        if self._collection is None:
+            return None
+        return await self._collection.find_one({"_id": classification_id})
+
+    async def remove(self, classification_id: str) -> bool:
+        """Delete a finished job, once its result has been collected"""
+        if self._collection is None:
+            return False
+        result = await self._collection.delete_one(
+            {"_id": classification_id, "status": {"$nin": [QUEUED, RUNNING]}}
+        )
+        return bool(result.deleted_count)
+
+    async def is_pending(self, classification_id: str) -> bool:
+        """Whether the classification is queued or running (in any process)"""
+        if self._collection is None:
+            return False
+        job = await self._collection.find_one({"_id": classification_id, "status": {"$in": [QUEUED, RUNNING]}})
+        return job is not None
+
+    async def position(self, classification_id: str) -> Optional[int]:
+        """Position of a waiting job (1 = next to start), None if it is not waiting"""
+        if self._collection is None:
+            return None
+        job = await self._collection.find_one({"_id": classification_id, "status": QUEUED})
+        if job is None:
+            return None
+        ahead = await self._collection.count_documents(
+            {"status": QUEUED, "enqueuedAt": {"$lt": job["enqueuedAt"]}}
+        )
+        return ahead + 1
+
+    async def stats(self) -> Dict:
+        """Jobs per state (all processes) and this process's workers, for monitoring"""
+        states = {state: 0 for state in (QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED)}
+        expired = 0
+        if self._collection is not None:
+            for state in states:
+                states[state] = await self._collection.count_documents({"status": state})
+            expired = await self._collection.count_documents(
+                {"status": RUNNING, "leaseExpiresAt": {"$lt": _now()}}
+            )
+        return {
+            "jobs": states,
+            "expired_leases": expired,
+            "max_depth": self.max_depth,
+            "lease_seconds": self.lease_seconds,
+            "max_attempts": self.max_attempts,
+            "workers": len(self._workers),
+            "busy_workers": len(self._running),
+            "running": list(self._running),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "cancelled": self.cancelled,
+            "reclaimed": self.reclaimed
+        }
+
+    async def _claim(self, owner: str) -> Optional[Dict]:
+        """
+        Take the oldest available job: a queued one past its backoff, or a
+        running one whose lease expired (its worker is gone).
+        """
+        now = _now()
+        return await self._collection.find_one_and_update(
+            {"$or": [
+                {"status": QUEUED, "availableAt": {"$lte": now}},
+                {"status": RUNNING, "leaseExpiresAt": {"$lt": now}}
+            ]},
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "leaseOwner": owner,
+                    "leaseExpiresAt": now + timedelta(seconds=self.lease_seconds),
+                    "heartbeatAt": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("enqueuedAt", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _finish(self, job: Dict, owner: str, fields: Dict, inc: Optional[Dict] = None) -> bool:
+        """Update a job this worker still holds and release its lease; False if the lease was lost"""
+        update = {"$set": dict(fields, leaseOwner=None, leaseExpiresAt=None)}
+        if inc:
+            update["$inc"] = inc
+        result = await self._collection.update_one({"_id": job["_id"], "leaseOwner": owner}, update)
+        return bool(result.modified_count)
+
+    async def _heartbeat(self, classification_id: str, owner: str):
+        """
+        Renew the lease while the job runs; cancel the job if the lease is lost or a
+        cancel was requested. A cancelled job keeps its lease until the handler has
+        stopped (at its next checkpoint), so no other worker reclaims it meanwhile.
+        """
+        cancel_passed = False
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            now = _now()
+            try:
+                job = await self._collection.find_one_and_update(
+                    {"_id": classification_id, "leaseOwner": owner, "status": RUNNING},
+                    {"$set": {"leaseExpiresAt": now + timedelta(seconds=self.lease_seconds),
+                              "heartbeatAt": now}},
+                    return_document=ReturnDocument.AFTER
+                )
+            except Exception as e:
+                # A missed renewal is retried; the lease outlives two of them
+                logger.warning(f"Heartbeat for {classification_id} failed: {e}")
+                continue
+            if job is None:
+                logger.warning(f"Lease on {classification_id} lost; stopping it here")
+                cancellation_registry.cancel(classification_id, REASON_LEASE_LOST)
+                return
+            if job.get("cancelRequested") and not cancel_passed:
+                cancel_passed = True
+                cancellation_registry.cancel(classification_id, job["cancelRequested"])
+
+    async def _run(self, job: Dict, owner: str, index: int):
+        """Run one claimed job and record its outcome"""
+        classification_id = job["_id"]
+        attempt, max_attempts = job["attempts"], job.get("maxAttempts", self.max_attempts)
+
+        if attempt > max_attempts:
+            # The last attempt was reclaimed: its worker died mid-run
+            error = f"Gave up after {max_attempts} attempts (worker lost)"
+            await self._finish(job, owner, {"status": FAILED, "lastError": error, "finishedAt": _now()})
+            self.failed += 1
+            logger.error(f"{self.name} worker {index}: {classification_id}: {error}")
+            await self._on_exhausted(classification_id, error)
+            return
+        if attempt > 1 and job.get("lastError") is None:
+            self.reclaimed += 1
+            logger.warning(f"{self.name} worker {index}: reclaimed {classification_id} "
+                           f"after an expired lease (attempt {attempt})")
+
+        self._running[classification_id] = owner
+        heartbeat = asyncio.create_task(self._heartbeat(classification_id, owner))
+        try:
+            result = await self._handler(classification_id, attempt=attempt, final=attempt >= max_attempts)
+            await self._finish(job, owner, {"status": COMPLETED, "lastError": None, "result": result,
+                                            "finishedAt": _now()})
+            self.completed += 1
+        except OperationCancelled as e:
+            if e.reason == REASON_SHUTDOWN:
+                # Not the job's fault: hand it back without using up the attempt
+                await self._finish(job, owner, {"status": QUEUED, "availableAt": _now()},
+                                   inc={"attempts": -1})
+            elif e.reason != REASON_LEASE_LOST:
+                await self._finish(job, owner, {"status": CANCELLED, "lastError": e.reason, "finishedAt": _now()})
+                self.cancelled += 1
+            logger.info(f"{self.name} worker {index}: {classification_id} cancelled: {e.reason}")
+        except Exception as e:
+            if attempt < max_attempts:
+                delay = self.retry_delay * 2 ** (attempt - 1)
+                await self._finish(job, owner, {
+                    "status": QUEUED, "lastError": str(e),
+                    "availableAt": _now() + timedelta(seconds=delay)
+                })
+                self.retried += 1
+                logger.warning(f"{self.name} worker {index}: {classification_id} attempt {attempt} "
+                               f"failed ({e}); retrying in {delay:.0f}s")
+            else:
+                await self._finish(job, owner, {"status": FAILED, "lastError": str(e), "finishedAt": _now()})
+                self.failed += 1
+                logger.exception(f"{self.name} worker {index}: {classification_id} failed: {e}")
+        finally:
+            heartbeat.cancel()
+            self._running.pop(classification_id, None)
+
+    async def _worker(self, index: int):
+        """Claim and run jobs one at a time, in arrival order"""
+        owner = f"{self._owner_prefix}:{index}"
+        while not self._stopping:
+            try:
+                job = await self._claim(owner)
+            except Exception as e:
+                logger.warning(f"{self.name} worker {index}: claiming a job failed: {e}")
+                job = None
+            if job is None:
+                # Idle: wait for a submission or the next poll (expired leases, backoffs)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job, owner, index)
+            except Exception as e:
+                # Recording the outcome failed; the lease expires and the job is reclaimed
+                logger.exception(f"{self.name} worker {index}: {job['_id']} left unrecorded: {e}")
+
+
+# Singleton instance
+processing_queue = ProcessingQueue()
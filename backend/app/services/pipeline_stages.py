@@ -0,0 +1,195 @@
+"""
+Pipeline Stages
+Pipeline-parallel processing (JOB_RUNNER=pipeline). Each view model runs in a
+stage of its own: worker processes started with `python -m app.worker --stage
+<view>` that load only that view's model and keep it resident. The merge stage
+(`--stage merge`) claims the classification jobs, queues each view on its
+stage, waits for the five partial results and merges them with
+_merge_all_model_results; it loads no model. Stages scale independently: run
+more processes of the stage that is the bottleneck.
+
+Every view stage has its own durable queue (`pipeline_<view>` collection, same
+jobs, leases and retries as the processing queue), keyed by classification id.
+A completed stage job holds {"output", "restored"} as its result until the
+merge stage has stored the classification, so a retried merge only waits for
+the views still missing.
+"""
+from app.core.config import settings
+from app.core.database import get_database
+from app.services.ai_service import VIEW_STEPS, ai_service
+from app.services.classification_runner import run_classification
+from app.services.job_queue import QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED, JobPending, ProcessingQueue
+from app.services.status_store import processing_status
+from app.services.view_checkpoints import view_checkpoints
+from ml_models.cancellation import (
+    REASON_LEASE_LOST, REASON_SHUTDOWN, REASON_TIMEOUT, CancellationToken, OperationCancelled,
+    cancellation_registry
+)
+from ml_models.scoring import resolve_profile
+from bson import ObjectId
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Stage names: one per view, plus the merge stage
+VIEW_STAGES = [view for view, _ in VIEW_STEPS]
+MERGE_STAGE = "merge"
+
+# How often the merge stage checks on the views it waits for
+POLL_SECONDS = 0.5
+
+# Queue of each view stage
+stage_queues: Dict[str, ProcessingQueue] = {
+    view: ProcessingQueue(name=f"{label.capitalize()} stage") for view, label in VIEW_STEPS
+}
+
+
+def view_stage_handler(view: str):
+    """Job handler of a view stage: runs that one view of a classification"""
+    step_index = VIEW_STAGES.index(view)
+
+    async def run_view_job(classification_id: str, attempt: int = 1, final: bool = True) -> Optional[Dict]:
+        db = await get_database()
+        classification = await db.classifications.find_one({"_id": ObjectId(classification_id)})
+        if not classification:
+            logger.info(f"Classification {classification_id} was deleted before its {view} view ran")
+            return None
+
+        image_path = os.path.join(settings.UPLOAD_DIR, classification['images'][step_index]['filename'])
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image not found on this worker: {image_path}")
+        animal_info = classification['animalInfo']
+        scoring_profile = resolve_profile(animal_info.get('animalType'), animal_info.get('breed'))
+        saved = (await view_checkpoints.load(classification_id)).get(view)
+
+        # Cancelled by the queue (heartbeat, shutdown); the view's own budget is applied by run_view
+        token = cancellation_registry.register(classification_id, settings.CLASSIFICATION_TIMEOUT_SECONDS)
+        try:
+            output, restored = await ai_service.run_view(step_index, image_path, classification_id,
+                                                         scoring_profile, token, saved)
+        finally:
+            cancellation_registry.release(classification_id, token)
+        if token.cancelled and token.reason != REASON_TIMEOUT:
+            raise OperationCancelled(token.reason)
+        return {"output": output, "restored": restored}
+
+    return run_view_job
+
+
+async def run_in_stage(classification_id: str, step_index: int, token: CancellationToken) -> Tuple[Dict, bool]:
+    """
+    ViewRunner of the merge stage: queue a view on its stage and wait for its result.
+
+    Raises:
+        OperationCancelled: The token was cancelled or expired while waiting
+        RuntimeError: The stage job failed on its last attempt
+    """
+    view, label = VIEW_STEPS[step_index]
+    queue = stage_queues[view]
+    # A view queued, running or finished for an earlier attempt is not queued again
+    job = await queue.job(classification_id)
+    if job is None or job["status"] not in (QUEUED, RUNNING, COMPLETED):
+        try:
+            await queue.submit(classification_id)
+        except JobPending:
+            pass
+    processing_status.update_step(classification_id, step_index, "pending", f"Queued for the {label} stage")
+
+    running = False
+    try:
+        while True:
+            job = await queue.job(classification_id)
+            status = job["status"] if job else None
+            if status == COMPLETED:
+                break
+            if status in (FAILED, CANCELLED, None):
+                error = job.get("lastError") if job else "job removed"
+                raise RuntimeError(f"{label.capitalize()} stage failed: {error}")
+            if status == RUNNING and not running:
+                running = True
+                processing_status.update_step(classification_id, step_index, "processing", f"Analyzing {label}...")
+            token.check()
+            remaining = token.remaining()
+            await asyncio.sleep(POLL_SECONDS if remaining is None else min(POLL_SECONDS, remaining))
+    except OperationCancelled as e:
+        # After a shutdown or a lost lease the next attempt collects the view instead
+        if e.reason not in (REASON_SHUTDOWN, REASON_LEASE_LOST):
+            await queue.discard(classification_id, e.reason)
+        raise
+
+    # No result: the classification was deleted before the stage ran the view
+    result = job.get("result") or {}
+    output = result.get("output") or {}
+    view_result = output.get(view)
+    traits_count = len(view_result.get('traits', [])) if view_result else 0
+    processing_status.update_step(classification_id, step_index, "completed", f"✓ {traits_count} traits detected")
+    return output, bool(result.get("restored"))
+
+
+async def remove_stage_jobs(classification_id: str):
+    """Drop a classification's finished stage jobs and their results"""
+    for queue in stage_queues.values():
+        try:
+            await queue.remove(classification_id)
+        except Exception as e:
+            logger.warning(f"{queue.name} job of {classification_id} not removed: {e}")
+
+
+async def run_pipeline_classification(classification_id: str, attempt: int = 1, final: bool = True):
+    """Job handler of the merge stage: run_classification with the views run by their stages"""
+    try:
+        await run_classification(classification_id, attempt, final, view_runner=run_in_stage)
+    except OperationCancelled as e:
+        if e.reason not in (REASON_SHUTDOWN, REASON_LEASE_LOST):
+            await remove_stage_jobs(classification_id)
+        raise
+    except Exception:
+        # A retry collects the views that did finish instead of running them again
+        if final:
+            await remove_stage_jobs(classification_id)
+        raise
+    await remove_stage_jobs(classification_id)
+
+
+async def _stage_job_exhausted(classification_id: str, error: str):
+    """A stage job whose workers kept dying: the merge stage sees it failed"""
+    logger.error(f"Stage job of {classification_id} failed: {error}")
+
+
+async def start_stages(stage: Optional[str] = None, workers: int = 0):
+    """
+    Connect the view stage queues to MongoDB (every process of a pipeline
+    deployment: the API for monitoring, the merge stage to queue views).
+
+    Args:
+        stage: View stage whose jobs this process runs (None = none)
+        workers: Jobs of that stage run at once
+    """
+    db = await get_database()
+    if stage is not None:
+        await view_checkpoints.configure(db.view_checkpoints if settings.VIEW_CHECKPOINTS_ENABLED else None)
+    for view, queue in stage_queues.items():
+        await queue.start(
+            db[f"pipeline_{view}"],
+            view_stage_handler(view),
+            _stage_job_exhausted,
+            workers=workers if view == stage else 0,
+            max_depth=0,    # the processing queue already bounds the classifications in flight
+            lease_seconds=settings.JOB_LEASE_SECONDS,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+            retry_delay=settings.JOB_RETRY_DELAY_SECONDS
+        )
+
+
+async def stop_stages():
+    """Stop the stage workers; their running jobs go back to the stage queues"""
+    for queue in stage_queues.values():
+        await queue.stop()
+
+
+async def stage_stats() -> Dict:
+    """Jobs per state of every view stage, for monitoring"""
+    return {view: (await queue.stats())["jobs"] for view, queue in stage_queues.items()}
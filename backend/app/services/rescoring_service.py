@@ -0,0 +1,276 @@
+"""
+Re-scoring Service
+Re-scores archived classifications from their stored keypoints after the
+scoring tables change, without running any model. Classifications are
+streamed from MongoDB and written back in batched bulk updates; the same
+stream backfills the columnar keypoint store.
+"""
+from app.core.database import get_database
+from app.core.config import settings
+from app.services.ai_service import ai_service
+from ml_models.keypoint_store import keypoint_store
+from ml_models.scoring import reload_tables, resolve_profile
+from pymongo import UpdateOne
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+import asyncio
+import copy
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# IST timezone (UTC+5:30), as used for classification timestamps
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Result fields recomputed by a re-score
+RESCORED_FIELDS = ('officialFormat', 'categoryScores', 'overallScore', 'grade',
+                   'milkYieldPrediction', 'scoringProfile')
+
+
+class ArchiveJob:
+    """Progress of the current (or last) archive re-score or export"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = "idle"    # idle | running | completed | failed
+        self.scanned = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self.status == "running"
+
+    def start(self):
+        with self._lock:
+            self.status = "running"
+            self.scanned = self.updated = self.unchanged = self.failed = 0
+            self.started_at = time.time()
+            self.finished_at = None
+            self.error = None
+
+    def record(self, scanned: int = 0, updated: int = 0, unchanged: int = 0, failed: int = 0):
+        with self._lock:
+            self.scanned += scanned
+            self.updated += updated
+            self.unchanged += unchanged
+            self.failed += failed
+
+    def finish(self, error: Optional[str] = None):
+        with self._lock:
+            self.status = "failed" if error else "completed"
+            self.error = error
+            self.finished_at = time.time()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "status": self.status,
+                "scanned": self.scanned,
+                "updated": self.updated,
+                "unchanged": self.unchanged,
+                "failed": self.failed,
+                "seconds": round(end - self.started_at, 2) if self.started_at else 0.0,
+                "error": self.error
+            }
+
+
+def rescore_document(doc: Dict) -> Optional[Dict]:
+    """
+    Re-score one stored classification from its keypoints.
+
+    Args:
+        doc: Classification document with results and animalInfo
+
+    Returns:
+        $set fields for the changed results, or None if nothing changed
+    """
+    results = doc['results']
+    animal_info = doc.get('animalInfo', {})
+    rescored = ai_service.rescore_results(
+        copy.deepcopy(results),
+        resolve_profile(animal_info.get('animalType'), animal_info.get('breed'))
+    )
+
+    changes = {
+        f"results.{field}": rescored[field]
+        for field in RESCORED_FIELDS
+        if field in rescored and rescored[field] != results.get(field)
+    }
+    return changes or None
+
+
+def _rescore_batch(docs: List[Dict]) -> Dict:
+    """Re-score a batch of documents (blocking, runs in a worker thread)"""
+    now = datetime.now(IST)
+    operations = []
+    unchanged = failed = 0
+    for doc in docs:
+        try:
+            changes = rescore_document(doc)
+        except Exception as e:
+            logger.warning(f"Re-scoring classification {doc['_id']} failed: {e}")
+            failed += 1
+            continue
+        if changes is None:
+            unchanged += 1
+            continue
+        changes['results.rescoredAt'] = now
+        changes['updatedAt'] = now
+        operations.append(UpdateOne({"_id": doc['_id']}, {"$set": changes}))
+    return {"operations": operations, "unchanged": unchanged, "failed": failed}
+
+
+async def rescore_archive(batch_size: Optional[int] = None) -> Dict:
+    """
+    Re-score every completed classification that has stored keypoints.
+
+    Args:
+        batch_size: Classifications per bulk update (defaults to RESCORE_BATCH_SIZE)
+
+    Returns:
+        Final job snapshot
+    """
+    batch_size = max(1, batch_size or settings.RESCORE_BATCH_SIZE)
+    db = await get_database()
+    loop = asyncio.get_running_loop()
+
+    # Pick up edited table files
+    reload_tables()
+    rescore_job.start()
+    logger.info(f"Re-scoring archived classifications (batch size {batch_size})")
+
+    async def flush(docs: List[Dict]):
+        batch = await loop.run_in_executor(None, _rescore_batch, docs)
+        if batch['operations']:
+            await db.classifications.bulk_write(batch['operations'], ordered=False)
+        rescore_job.record(
+            scanned=len(docs), updated=len(batch['operations']),
+            unchanged=batch['unchanged'], failed=batch['failed']
+        )
+
+    try:
+        cursor = db.classifications.find(
+            {"status": "completed", "results.modelKeypoints": {"$exists": True}},
+            projection={"results": 1, "animalInfo": 1}
+        ).batch_size(batch_size)
+
+        docs = []
+        async for doc in cursor:
+            docs.append(doc)
+            if len(docs) >= batch_size:
+                await flush(docs)
+                docs = []
+        if docs:
+            await flush(docs)
+    except Exception as e:
+        logger.exception(f"Re-scoring failed: {e}")
+        rescore_job.finish(error=str(e))
+        return rescore_job.snapshot()
+
+    rescore_job.finish()
+    snapshot = rescore_job.snapshot()
+    logger.info(
+        f"Re-scored {snapshot['scanned']} classifications in {snapshot['seconds']:.1f}s "
+        f"({snapshot['updated']} updated, {snapshot['unchanged']} unchanged, {snapshot['failed']} failed)"
+    )
+    return snapshot
+
+
+async def export_keypoints(batch_size: Optional[int] = None) -> Dict:
+    """
+    Copy the stored keypoints of every completed classification into the
+    columnar keypoint store (classifications already there are overwritten).
+
+    Args:
+        batch_size: Classifications read per cursor batch (defaults to RESCORE_BATCH_SIZE)
+
+    Returns:
+        Final job snapshot
+    """
+    batch_size = max(1, batch_size or settings.RESCORE_BATCH_SIZE)
+    db = await get_database()
+    loop = asyncio.get_running_loop()
+    export_job.start()
+    logger.info(f"Exporting keypoints to {keypoint_store.path}")
+
+    def store_batch(docs: List[Dict]) -> int:
+        failed = 0
+        for doc in docs:
+            try:
+                keypoint_store.put(str(doc['_id']), doc['results']['modelKeypoints'])
+            except Exception as e:
+                logger.warning(f"Exporting keypoints of {doc['_id']} failed: {e}")
+                failed += 1
+        return failed
+
+    try:
+        cursor = db.classifications.find(
+            {"status": "completed", "results.modelKeypoints": {"$exists": True}},
+            projection={"results.modelKeypoints": 1}
+        ).batch_size(batch_size)
+
+        docs = []
+        async for doc in cursor:
+            docs.append(doc)
+            if len(docs) >= batch_size:
+                failed = await loop.run_in_executor(None, store_batch, docs)
+                export_job.record(scanned=len(docs), updated=len(docs) - failed, failed=failed)
+                docs = []
+        if docs:
+            failed = await loop.run_in_executor(None, store_batch, docs)
+            export_job.record(scanned=len(docs), updated=len(docs) - failed, failed=failed)
+    except Exception as e:
+        logger.exception(f"Keypoint export failed: {e}")
+        export_job.finish(error=str(e))
+        return export_job.snapshot()
+
+    export_job.finish()
+    snapshot = export_job.snapshot()
+    logger.info(f"Exported keypoints of {snapshot['updated']} classifications in {snapshot['seconds']:.1f}s")
+    return snapshot
+
+
+def start_rescore(batch_size: Optional[int] = None) -> bool:
+    """
+    Start an archive re-score in the background.
+
+    Returns:
+        True if started (False if one is already running)
+    """
+    global _rescore_task
+    if rescore_job.running:
+        return False
+    # Mark running before the task starts, so a second request cannot start another one
+    rescore_job.start()
+    _rescore_task = asyncio.get_running_loop().create_task(rescore_archive(batch_size))
+    return True
+
+
+def start_export(batch_size: Optional[int] = None) -> bool:
+    """
+    Start a keypoint store export in the background.
+
+    Returns:
+        True if started (False if one is already running)
+    """
+    global _export_task
+    if export_job.running or not keypoint_store.enabled:
+        return False
+    export_job.start()
+    _export_task = asyncio.get_running_loop().create_task(export_keypoints(batch_size))
+    return True
+
+
+# Singleton instances
+rescore_job = ArchiveJob()
+export_job = ArchiveJob()
+_rescore_task: Optional[asyncio.Task] = None
+_export_task: Optional[asyncio.Task] = None
@@ -2,8 +2,9 @@
 Processing Status Store
 In-memory store to track classification processing status in real-time
 """
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
+import copy
 import threading
 
 class ProcessingStatus:
@@ -12,6 +13,20 @@ class ProcessingStatus:
     def __init__(self):
         self._store: Dict[str, Dict] = {}
         self._lock = threading.Lock()
+        self._listeners: List[Callable[[str, Dict], None]] = []
+    
+    def add_listener(self, listener: Callable[[str, Dict], None]):
+        """Call listener(classification_id, status copy) after every change (from the changing thread; must not block)"""
+        self._listeners.append(listener)
+    
+    def _notify(self, classification_id: str):
+        # Listeners are called under the lock, so they receive the copies in order
+        with self._lock:
+            status = copy.deepcopy(self._store.get(classification_id))
+            if status is None:
+                return
+            for listener in self._listeners:
+                listener(classification_id, status)
     
     def initialize(self, classification_id: str):
         """Initialize status tracking for a classification"""
@@ -31,6 +46,7 @@ class ProcessingStatus:
                 "completed_at": None,
                 "error": None
             }
+        self._notify(classification_id)
     
     def update_step(self, classification_id: str, step_index: int, status: str, message: str):
         """Update a specific processing step"""
@@ -38,12 +54,17 @@ class ProcessingStatus:
             if classification_id not in self._store:
                 return
             
-            if 0 <= step_index < len(self._store[classification_id]["steps"]):
-                self._store[classification_id]["steps"][step_index]["status"] = status
-                self._store[classification_id]["steps"][step_index]["message"] = message
+            steps = self._store[classification_id]["steps"]
+            if 0 <= step_index < len(steps):
+                steps[step_index]["status"] = status
+                steps[step_index]["message"] = message
                 
-                if status == "processing":
-                    self._store[classification_id]["current_step"] = step_index + 1
+                # Steps may run in parallel and finish out of order, so progress
+                # counts every step that has started rather than the latest index
+                self._store[classification_id]["current_step"] = sum(
+                    1 for step in steps if step["status"] != "pending"
+                )
+        self._notify(classification_id)
     
     def complete(self, classification_id: str, success: bool = True, error: Optional[str] = None):
         """Mark processing as complete"""
@@ -55,6 +76,7 @@ class ProcessingStatus:
             self._store[classification_id]["completed_at"] = datetime.now().isoformat()
             if error:
                 self._store[classification_id]["error"] = error
+        self._notify(classification_id)
     
     def get(self, classification_id: str) -> Optional[Dict]:
         """Get current status for a classification"""
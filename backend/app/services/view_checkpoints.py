@@ -0,0 +1,145 @@
+"""
+View Checkpoints
+Each view's result is saved in MongoDB (`view_checkpoints` collection) as
+soon as the view finishes, keyed by the image hash and model version. A retried
+or recovered classification restores the views whose image, model and scoring
+profile are unchanged and runs only the missing ones.
+
+Checkpoint document:
+    _id             "<classification id>:<view>"
+    classificationId
+    view
+    imageHash       SHA-256 of the view image
+    modelVersion    identity of the view model (file, backend, size, mtime)
+    scoringProfile  scoring tables the traits were scored with
+    output          the view's model results, as merged by AIService
+    createdAt
+"""
+from typing import Dict, Optional
+from datetime import datetime, timezone
+from pymongo import ASCENDING
+from ml_models.model_downloader import VIEW_MODELS, get_model_path
+from ml_models.inference import backend_for
+from ml_models.result_cache import image_digest, model_identity
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Checkpoints of classifications that never completed are dropped after this long
+CHECKPOINT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def view_fingerprint(view: str, image_path: str) -> Optional[Dict]:
+    """
+    Image hash and model version a view result depends on (blocking: reads the
+    image and resolves the model weights).
+
+    Returns:
+        {"imageHash", "modelVersion"}, or None if the image or the model is unavailable
+    """
+    try:
+        with open(image_path, "rb") as f:
+            image_hash = image_digest(f.read())
+    except OSError:
+        return None
+    model_filename = VIEW_MODELS[view]
+    model_path = get_model_path(model_filename)
+    if model_path is None:
+        return None
+    return {"imageHash": image_hash, "modelVersion": model_identity(model_path, backend_for(model_filename))}
+
+
+class ViewCheckpointStore:
+    """Per-view results of running classifications"""
+
+    def __init__(self):
+        self._collection = None
+        self.saved = 0
+        self.restored = 0
+        self.stale = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._collection is not None
+
+    async def configure(self, collection):
+        """
+        Use a collection for the checkpoints (on application startup).
+
+        Args:
+            collection: Motor collection (or an in-process fake with the same API); None disables checkpoints
+        """
+        self._collection = collection
+        if collection is not None:
+            await collection.create_index([("classificationId", ASCENDING)])
+            await collection.create_index([("createdAt", ASCENDING)], expireAfterSeconds=CHECKPOINT_TTL_SECONDS)
+
+    async def load(self, classification_id: str) -> Dict[str, Dict]:
+        """Checkpoints of a classification by view"""
+        if self._collection is None:
+            return {}
+        try:
+            cursor = self._collection.find({"classificationId": classification_id})
+            return {doc["view"]: doc async for doc in cursor}
+        except Exception as e:
+            # Without its checkpoints the classification runs every view
+            logger.warning(f"Checkpoints of {classification_id} not loaded: {e}")
+            return {}
+
+    def restore(self, saved: Optional[Dict], fingerprint: Optional[Dict], scoring_profile: str) -> Optional[Dict]:
+        """
+        Output of a checkpoint that is still valid for the view.
+
+        Args:
+            saved: The view's checkpoint (None = none saved)
+            fingerprint: Current view_fingerprint of the view
+            scoring_profile: Scoring profile of this run
+
+        Returns:
+            The saved view output, or None if it has to run again
+        """
+        if saved is None:
+            return None
+        if (fingerprint is None or saved.get("imageHash") != fingerprint["imageHash"]
+                or saved.get("modelVersion") != fingerprint["modelVersion"]
+                or saved.get("scoringProfile") != scoring_profile):
+            self.stale += 1
+            return None
+        self.restored += 1
+        return saved["output"]
+
+    async def save(self, classification_id: str, view: str, fingerprint: Dict,
+                   scoring_profile: str, output: Dict):
+        """Save a finished view (a failed write only costs a re-run later)"""
+        if self._collection is None:
+            return
+        try:
+            await self._collection.replace_one(
+                {"_id": f"{classification_id}:{view}"},
+                {
+                    "classificationId": classification_id,
+                    "view": view,
+                    "imageHash": fingerprint["imageHash"],
+                    "modelVersion": fingerprint["modelVersion"],
+                    "scoringProfile": scoring_profile,
+                    "output": output,
+                    "createdAt": datetime.now(timezone.utc)
+                },
+                upsert=True
+            )
+            self.saved += 1
+        except Exception as e:
+            logger.warning(f"Checkpoint of the {view} view of {classification_id} not saved: {e}")
+
+    async def clear(self, classification_id: str):
+        """Drop a classification's checkpoints (completed or deleted)"""
+        if self._collection is None:
+            return
+        await self._collection.delete_many({"classificationId": classification_id})
+
+    def stats(self) -> Dict:
+        return {"enabled": self.enabled, "saved": self.saved, "restored": self.restored, "stale": self.stale}
+
+
+# Singleton instance
+view_checkpoints = ViewCheckpointStore()
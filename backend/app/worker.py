@@ -0,0 +1,104 @@
+"""
+Standalone Inference Worker
+    python -m app.worker                  whole classifications (JOB_RUNNER=external)
+    python -m app.worker --stage <view>   one view model (JOB_RUNNER=pipeline)
+    python -m app.worker --stage merge    pipeline merge stage
+
+Consumes classification jobs from the shared MongoDB queue, runs the view
+models through ai_service and writes the results back. Start the API with
+JOB_RUNNER=external and run any number of workers, on any number of nodes;
+each one processes MAX_CONCURRENT_CLASSIFICATIONS jobs at once. A stopped
+worker hands its running jobs back to the queue; a crashed one loses its
+leases, and the jobs are reclaimed by the others.
+
+With --stage the worker is one stage of the pipeline (see
+app.services.pipeline_stages): a view stage loads and keeps only its own
+model, the merge stage loads none.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.database import connect_to_mongo, close_mongo_connection
+from app.services.ai_service import ai_service
+from app.services.classification_runner import start_processing
+from app.services.job_queue import processing_queue
+from app.services.pipeline_stages import (
+    MERGE_STAGE, VIEW_STAGES, run_pipeline_classification, start_stages, stop_stages
+)
+from ml_models.warmup import WARMUP_OFF, WARMUP_PRELOAD, start_warmup
+from ml_models.inference import configured_backends
+from ml_models.lazy_imports import runtime_modules, start_preload
+
+logger = logging.getLogger("app.worker")
+
+
+async def run_worker(concurrency: int, stage: Optional[str] = None):
+    """
+    Process queued classifications until SIGINT / SIGTERM
+
+    Args:
+        concurrency: Jobs run at once
+        stage: Pipeline stage run by this worker (a view or "merge"; None = whole classifications)
+    """
+    await connect_to_mongo()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:
+            pass    # Windows: KeyboardInterrupt ends the worker
+
+    if settings.PRELOAD_IMPORTS and stage != MERGE_STAGE:
+        start_preload(runtime_modules(configured_backends()))
+    if stage == MERGE_STAGE:
+        # Waits on the view stages and merges: no model in this process
+        await start_stages()
+        await start_processing(workers=concurrency, handler=run_pipeline_classification)
+    elif stage is not None:
+        # The stage's one model is loaded up front and stays resident
+        start_warmup(WARMUP_PRELOAD if settings.WARMUP_MODE == WARMUP_OFF else settings.WARMUP_MODE, [stage])
+        await start_stages(stage, workers=concurrency)
+    else:
+        start_warmup(settings.WARMUP_MODE, settings.get_warmup_views() or None)
+        await start_processing(workers=concurrency)
+    logger.info(f"Inference worker ready ({stage or 'all views'}): {concurrency} jobs at once")
+
+    try:
+        await stopping.wait()
+    finally:
+        logger.info("Stopping: running jobs go back to the queue")
+        await processing_queue.stop()
+        await stop_stages()
+        ai_service.shutdown()
+        await close_mongo_connection()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run queued classifications")
+    parser.add_argument("--stage", choices=VIEW_STAGES + [MERGE_STAGE],
+                        help="Run one pipeline stage (JOB_RUNNER=pipeline) instead of whole classifications")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Jobs run at once (default: MAX_CONCURRENT_CLASSIFICATIONS, "
+                             "PIPELINE_MERGE_CONCURRENCY for the merge stage)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    concurrency = args.concurrency
+    if concurrency is None:
+        # The inference executor is sized from the same setting
+        concurrency = (settings.PIPELINE_MERGE_CONCURRENCY if args.stage == MERGE_STAGE
+                       else settings.MAX_CONCURRENT_CLASSIFICATIONS)
+    asyncio.run(run_worker(max(1, concurrency), args.stage))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Worker Scaling Benchmark
+    python -m app.worker_benchmark --source <classification id> --jobs 20 --workers 1,2,4
+    python -m app.worker_benchmark --simulate 2 --jobs 12 --workers 1,2 --check
+
+Measures classification throughput against the number of standalone worker
+processes on this machine. The source classification (with its uploaded
+images) is cloned --jobs times; for each worker count the clones are queued,
+that many `python -m app.worker` processes drain the queue, and the
+throughput is taken between the first and the last completion, so model
+loading at worker startup is not counted. The clones are deleted afterwards.
+
+--simulate replaces the models with a stub classify_animal that keeps one
+core busy for the given seconds, so the queue, the workers and the result
+writes are exercised without a source classification, images or model
+files. --check exits with status 1 unless throughput grows with the worker
+count (up to the number of cores).
+
+The workers take any queued job, so run it against a database without
+other traffic.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.classification_runner import now_ist, start_processing
+from app.services.job_queue import COMPLETED, FAILED, CANCELLED, processing_queue
+
+# Workers of the benchmark must run every model: no result cache, no checkpoints
+WORKER_ENV = {
+    "JOB_RUNNER": "external",
+    "MAX_CONCURRENT_CLASSIFICATIONS": "1",
+    "RESULT_CACHE_MAX_MB": "0",
+    "VIEW_CHECKPOINTS_ENABLED": "false",
+    "WARMUP_MODE": "preload"
+}
+
+# Simulated workers load no model and must not archive keypoints of the stub results
+SIMULATED_WORKER_ENV = dict(WORKER_ENV, WARMUP_MODE="off", PRELOAD_IMPORTS="false", KEYPOINT_STORE_DIR="")
+
+# A round that scales must gain at least this much per doubling of the workers
+MIN_SCALING = 1.3
+
+SIMULATED_IMAGES = [f"bench-simulated-{view}.jpg" for view in ("rear", "side", "top", "udder", "side_udder")]
+
+
+def _burn(seconds: float):
+    """Keep one core busy (holding the GIL, as one process's inference would)"""
+    deadline = time.perf_counter() + seconds
+    count = 0
+    while time.perf_counter() < deadline:
+        count += 1
+
+
+def run_simulated_worker(seconds: float):
+    """A standalone worker whose classify_animal is a CPU-bound stub"""
+    from app import worker
+    from app.services.ai_service import ai_service
+
+    async def classify_animal(image_paths, animal_info, classification_id=None, view_runner=None):
+        await asyncio.get_running_loop().run_in_executor(None, _burn, seconds)
+        return {"overallScore": 0, "simulated": True}
+
+    ai_service.classify_animal = classify_animal
+    worker.main([])
+
+
+def simulated_source() -> Tuple[Dict, List[str]]:
+    """A classification document with placeholder images (and their files in UPLOAD_DIR)"""
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    paths = []
+    for filename in SIMULATED_IMAGES:
+        path = os.path.join(settings.UPLOAD_DIR, filename)
+        with open(path, "wb") as f:
+            f.write(b"simulated")
+        paths.append(path)
+    source = {
+        "animalInfo": {"animalType": "cattle", "breed": "simulated", "tagNumber": "BENCH"},
+        "images": [{"filename": filename} for filename in SIMULATED_IMAGES]
+    }
+    return source, paths
+
+
+async def clone_classifications(source: Dict, count: int) -> List[str]:
+    """Copies of a classification with uploaded images, ready to process"""
+    db = await get_database()
+
+    now = now_ist()
+    clones = [{
+        "animalInfo": dict(source["animalInfo"], tagNumber=f"BENCH-{index:04d}"),
+        "status": "images_uploaded",
+        "images": source["images"],
+        "results": None,
+        "createdAt": now,
+        "updatedAt": now
+    } for index in range(count)]
+    result = await db.classifications.insert_many(clones)
+    return [str(inserted) for inserted in result.inserted_ids]
+
+
+async def run_round(ids: List[str], workers: int, timeout: float, simulate: Optional[float] = None) -> Dict:
+    """Queue the clones, drain them with `workers` processes and time the completions"""
+    db = await get_database()
+    for classification_id in ids:
+        await processing_queue.submit(classification_id)
+
+    if simulate:
+        env = dict(os.environ, **SIMULATED_WORKER_ENV)
+        command = ["-m", "app.worker_benchmark", "--simulated-worker", str(simulate)]
+    else:
+        env = dict(os.environ, **WORKER_ENV)
+        command = ["-m", "app.worker"]
+    processes = [
+        await asyncio.create_subprocess_exec(sys.executable, *command, env=env,
+                                             stdout=asyncio.subprocess.DEVNULL)
+        for _ in range(workers)
+    ]
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < timeout:
+            finished = await db.processing_jobs.count_documents(
+                {"_id": {"$in": ids}, "status": {"$in": [COMPLETED, FAILED, CANCELLED]}}
+            )
+            if finished == len(ids):
+                break
+            await asyncio.sleep(1)
+    finally:
+        for process in processes:
+            process.terminate()
+        await asyncio.gather(*(process.wait() for process in processes))
+
+    jobs = await db.processing_jobs.find({"_id": {"$in": ids}}).to_list(length=len(ids))
+    done = sorted(job["finishedAt"] for job in jobs if job["status"] == COMPLETED and job.get("finishedAt"))
+    span = (done[-1] - done[0]).total_seconds() if len(done) > 1 else 0.0
+    return {
+        "workers": workers,
+        "completed": len(done),
+        "failed": sum(1 for job in jobs if job["status"] != COMPLETED),
+        "jobs_per_minute": round((len(done) - 1) / span * 60, 2) if span else None
+    }
+
+
+async def benchmark(source_id: Optional[str], jobs: int, worker_counts: List[int], timeout: float,
+                    simulate: Optional[float] = None) -> List[Dict]:
+    await connect_to_mongo()
+    # This process only queues: it runs no job itself, and every clone is queued at once
+    await start_processing(workers=0)
+    processing_queue.max_depth = 0
+    db = await get_database()
+    placeholders: List[str] = []
+    if simulate:
+        source, placeholders = simulated_source()
+    else:
+        source = await db.classifications.find_one({"_id": ObjectId(source_id)})
+        if not source or not source.get("images"):
+            raise SystemExit(f"Classification {source_id} not found or has no images")
+    rounds = []
+    try:
+        for workers in worker_counts:
+            ids = await clone_classifications(source, jobs)
+            try:
+                rounds.append(await run_round(ids, workers, timeout, simulate))
+            finally:
+                await db.classifications.delete_many({"_id": {"$in": [ObjectId(i) for i in ids]}})
+                await db.processing_jobs.delete_many({"_id": {"$in": ids}})
+            round_ = rounds[-1]
+            print(f"  {workers} worker(s): {round_['completed']}/{jobs} completed, "
+                  f"{round_['jobs_per_minute']} jobs/min")
+    finally:
+        await processing_queue.stop()
+        await close_mongo_connection()
+        for path in placeholders:
+            os.remove(path)
+    return rounds
+
+
+def check_scaling(rounds: List[Dict]) -> List[str]:
+    """Rounds whose throughput did not grow with the worker count (while workers fit the cores)"""
+    failures = []
+    cores = os.cpu_count() or 1
+    for previous, current in zip(rounds, rounds[1:]):
+        if current["workers"] > cores or current["workers"] <= previous["workers"]:
+            continue
+        if not previous["jobs_per_minute"] or not current["jobs_per_minute"]:
+            failures.append(f"{current['workers']} workers: no throughput measured")
+            continue
+        expected = min(MIN_SCALING, current["workers"] / previous["workers"] * 0.65)
+        gain = current["jobs_per_minute"] / previous["jobs_per_minute"]
+        if gain < expected:
+            failures.append(f"{previous['workers']} -> {current['workers']} workers: "
+                            f"{gain:.2f}x, expected at least {expected:.2f}x")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Measure classification throughput per worker process count")
+    parser.add_argument("--source", help="Classification id whose images are processed")
+    parser.add_argument("--simulate", type=float, default=None, metavar="SECONDS",
+                        help="Replace the models with a stub keeping one core busy this long per job")
+    parser.add_argument("--check", action="store_true",
+                        help="Exit with status 1 unless throughput grows with the worker count")
+    parser.add_argument("--simulated-worker", type=float, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--jobs", type=int, default=20, help="Classifications per round")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker process counts")
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds allowed per round")
+    args = parser.parse_args(argv)
+
+    if args.simulated_worker is not None:
+        run_simulated_worker(args.simulated_worker)
+        return
+    if not args.source and not args.simulate:
+        parser.error("--source or --simulate is required")
+
+    worker_counts = [int(count) for count in args.workers.split(",") if count.strip()]
+    rounds = asyncio.run(benchmark(args.source, max(2, args.jobs), worker_counts, args.timeout, args.simulate))
+
+    base = rounds[0]["jobs_per_minute"] if rounds else None
+    print("\nworkers  jobs/min  speedup")
+    for round_ in rounds:
+        rate = round_["jobs_per_minute"]
+        speedup = f"{rate / base:.2f}x" if rate and base else "-"
+        print(f"{round_['workers']:>7}  {rate if rate is not None else '-':>8}  {speedup:>7}")
+
+    if args.check:
+        if (os.cpu_count() or 1) < 2:
+            print("SKIP: one core, more workers cannot raise throughput here")
+            return
+        failures = check_scaling(rounds)
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if failures:
+            sys.exit(1)
+        print("OK: throughput grows with the worker count")
+
+
+if __name__ == "__main__":
+    main()
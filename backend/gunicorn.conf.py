@@ -0,0 +1,42 @@
+# Pre-fork serving mode (Linux): gunicorn -c gunicorn.conf.py app.main:app
+#
+# The master imports the app and loads the view models once, then forks the
+# workers, which share the weight pages copy-on-write. See "Pre-fork Workers"
+# in README.md for the memory measurements.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import app.main in the master, so everything it loads is inherited by the workers
+preload_app = True
+
+# Classifications run for a while on CPU
+timeout = 300
+graceful_timeout = 60
+
+
+def when_ready(server):
+    """Master, after the app import and before the first fork: load the models"""
+    from app.core.config import settings
+    from ml_models.prefork import preload_for_fork
+
+    if settings.PREFORK_PRELOAD_MODELS:
+        loaded = preload_for_fork(settings.get_warmup_views() or None)
+        server.log.info(f"Models shared with {workers} workers: {', '.join(loaded) or 'none'}")
+
+
+def pre_fork(server, worker):
+    """Master: give the new worker the first free core slot (replacements reuse their slot)"""
+    used = {getattr(w, "cpu_slot", None) for w in server.WORKERS.values()}
+    worker.cpu_slot = next(slot for slot in range(len(used) + 1) if slot not in used)
+
+
+def post_fork(server, worker):
+    """Worker, right after fork: split the CPU cores between the workers"""
+    from app.core.config import settings
+    from ml_models.prefork import after_fork
+
+    after_fork(worker.cpu_slot, workers, pin_cores=settings.INFERENCE_PIN_CORES)
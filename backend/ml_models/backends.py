@@ -0,0 +1,309 @@
+"""
+Inference Backends
+Pluggable runtimes for the view pose models:
+- ultralytics: full ultralytics/PyTorch stack (default)
+- onnx: ONNX Runtime on CPU, exported once and cached next to the weights
+- onnx-int8: INT8 post-training quantized ONNX model (see quantize.py)
+"""
+import ast
+import logging
+import shutil
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+from .lazy_imports import load
+from .scheduler import inference_scheduler
+from .model_bundle import BundledPath, local_weights, model_source
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+BACKEND_ULTRALYTICS = "ultralytics"
+BACKEND_ONNX = "onnx"
+BACKEND_ONNX_INT8 = "onnx-int8"
+BACKENDS = (BACKEND_ULTRALYTICS, BACKEND_ONNX, BACKEND_ONNX_INT8)
+
+# ONNX Runtime keeps roughly 1.5x the model file in RAM (weights plus arena)
+ONNX_MEMORY_FACTOR = 1.5
+
+# Same defaults as ultralytics predict()
+CONF_THRESHOLD = 0.25
+LETTERBOX_COLOR = 114
+# ultralytics zeroes keypoints whose visibility confidence is below 0.5
+KPT_VISIBLE_THRESHOLD = 0.5
+
+
+class PoseResult:
+    """Keypoints of the most confident detection in one image"""
+
+    __slots__ = ("xy", "conf", "box_conf")
+
+    def __init__(self, xy: "np.ndarray", conf: Optional["np.ndarray"] = None, box_conf: Optional[float] = None):
+        self.xy = xy              # [num_keypoints, 2] pixel coordinates in the original image
+        self.conf = conf          # [num_keypoints] visibility confidence (None if not predicted)
+        self.box_conf = box_conf  # detection confidence
+
+
+class UltralyticsBackend:
+    """Runs a .pt model through ultralytics YOLO"""
+
+    name = BACKEND_ULTRALYTICS
+
+    def __init__(self, model_path: Path):
+        self.model_path = model_path
+        with local_weights(model_path) as weights:
+            self.model = load("ultralytics").YOLO(str(weights))
+
+    def predict(self, images: Sequence["np.ndarray"], imgsz: int = 640) -> List[Optional[PoseResult]]:
+        source = list(images) if len(images) > 1 else images[0]
+        results = self.model.predict(source, imgsz=imgsz, verbose=False)
+        return [self._to_pose(r) for r in results]
+
+    @staticmethod
+    def _to_pose(r: Any) -> Optional[PoseResult]:
+        if not hasattr(r, 'keypoints') or r.keypoints is None or len(r.keypoints) == 0:
+            return None
+        xy = r.keypoints.xy[0].cpu().numpy()
+        conf = r.keypoints.conf[0].cpu().numpy() if r.keypoints.conf is not None else None
+        box_conf = float(r.boxes.conf[0]) if r.boxes is not None and len(r.boxes) else None
+        return PoseResult(xy, conf, box_conf)
+
+
+class OnnxBackend:
+    """Runs an exported pose model with ONNX Runtime on CPU"""
+
+    name = BACKEND_ONNX
+
+    def __init__(self, onnx_path: Path, name: str = BACKEND_ONNX):
+        ort = load("onnxruntime")
+        self.name = name
+        self.model_path = onnx_path
+        self.memory_bytes = int(onnx_path.stat().st_size * ONNX_MEMORY_FACTOR)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Threads are fixed per session: size them for the expected concurrency, and
+        # stop idle threads spinning when sessions share the cores
+        options.intra_op_num_threads = inference_scheduler.session_threads()
+        if inference_scheduler.max_jobs > 1:
+            options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+        # A file name, or the model bytes when it is served from a bundle
+        self.session = ort.InferenceSession(model_source(onnx_path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.kpt_shape = tuple(ast.literal_eval(metadata.get("kpt_shape", "[17, 3]")))
+        # A fixed-size export only accepts its own input size
+        input_shape = self.session.get_inputs()[0].shape
+        self.fixed_imgsz = input_shape[2] if isinstance(input_shape[2], int) else None
+
+    def predict(self, images: Sequence["np.ndarray"], imgsz: int = 640) -> List[Optional[PoseResult]]:
+        import numpy as np
+
+        imgsz = self.fixed_imgsz or imgsz
+        batch = []
+        transforms = []
+        for img in images:
+            tensor, gain, pad = letterbox(img, imgsz)
+            batch.append(tensor)
+            transforms.append((gain, pad, img.shape[:2]))
+
+        # [batch, 4 + num_classes + num_keypoints * dims, num_anchors]
+        output = self.session.run(None, {self.input_name: np.stack(batch)})[0]
+        return [
+            decode_pose(output[i], self.kpt_shape, gain, pad, shape)
+            for i, (gain, pad, shape) in enumerate(transforms)
+        ]
+
+
+def letterbox(img: "np.ndarray", imgsz: int) -> Tuple["np.ndarray", float, Tuple[int, int]]:
+    """
+    Resize and pad a BGR image to a square model input (ultralytics LetterBox).
+
+    Returns:
+        (CHW float32 RGB tensor in [0, 1], scale gain, (left, top) padding)
+    """
+    import numpy as np
+    cv2 = load("cv2")
+
+    h, w = img.shape[:2]
+    gain = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * gain)), int(round(h * gain))
+    dw, dh = (imgsz - new_w) / 2, (imgsz - new_h) / 2
+
+    if (w, h) != (new_w, new_h):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                             value=(LETTERBOX_COLOR,) * 3)
+
+    tensor = img[:, :, ::-1].transpose(2, 0, 1)  # BGR HWC -> RGB CHW
+    tensor = np.ascontiguousarray(tensor, dtype=np.float32) / 255.0
+    return tensor, gain, (left, top)
+
+
+def decode_pose(pred: "np.ndarray", kpt_shape: Tuple[int, int], gain: float,
+                pad: Tuple[int, int], orig_shape: Tuple[int, int]) -> Optional[PoseResult]:
+    """
+    Decode raw YOLOv8 pose output for one image into its most confident detection.
+
+    The first detection after ultralytics NMS is always the highest scoring box,
+    so taking the arg-max anchor reproduces results[0].keypoints.
+
+    Args:
+        pred: [4 + num_classes + num_keypoints * dims, num_anchors] raw output
+        kpt_shape: (num_keypoints, dims) from the export metadata
+        gain: Letterbox scale gain
+        pad: Letterbox (left, top) padding
+        orig_shape: Original image (height, width)
+    """
+    import numpy as np
+
+    num_kpts, dims = kpt_shape
+    num_classes = pred.shape[0] - 4 - num_kpts * dims
+    scores = pred[4:4 + num_classes].max(axis=0)
+
+    best = int(scores.argmax())
+    if scores[best] < CONF_THRESHOLD:
+        return None
+
+    kpts = pred[4 + num_classes:, best].reshape(num_kpts, dims)
+    xy = (kpts[:, :2] - np.array(pad, dtype=np.float32)) / gain
+    xy[:, 0] = xy[:, 0].clip(0, orig_shape[1])
+    xy[:, 1] = xy[:, 1].clip(0, orig_shape[0])
+
+    conf = None
+    if dims == 3:
+        conf = kpts[:, 2].copy()
+        xy[conf < KPT_VISIBLE_THRESHOLD] = 0
+    return PoseResult(xy.astype(np.float32), conf, float(scores[best]))
+
+
+def onnx_path_for(model_path: Path) -> Path:
+    """Location of the cached ONNX export for a .pt model (next to the weights)"""
+    return model_path.with_suffix(".onnx")
+
+
+def int8_path_for(model_path: Path) -> Path:
+    """
+    Location of the INT8 quantized ONNX model for a .pt model: next to the
+    weights, or for a bundled model its .int8.onnx member, else the weights
+    directory (where quantize writes it, as the read-only bundle cannot hold it).
+    """
+    int8_path = model_path.with_suffix(".int8.onnx")
+    if isinstance(model_path, BundledPath) and not int8_path.exists():
+        from .model_downloader import ML_MODELS_DIR
+        return ML_MODELS_DIR / int8_path.name
+    return int8_path
+
+
+def export_onnx(model_path: Path, imgsz: int = 640) -> Path:
+    """
+    Export a .pt model to ONNX once; later calls reuse the cached file.
+
+    The export uses dynamic axes so the same file serves any batch size and imgsz.
+    A bundled model without an .onnx member is exported to the weights
+    directory, as the read-only bundle cannot hold it.
+    """
+    onnx_path = onnx_path_for(model_path)
+    if onnx_path.exists() and onnx_path.stat().st_mtime >= model_path.stat().st_mtime:
+        return onnx_path
+    if isinstance(model_path, BundledPath):
+        from .model_downloader import ML_MODELS_DIR
+        onnx_path = ML_MODELS_DIR / onnx_path.name
+        if onnx_path.exists() and onnx_path.stat().st_mtime >= model_path.stat().st_mtime:
+            return onnx_path
+        onnx_path.parent.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"Exporting {model_path.name} to ONNX...")
+    export_start = time.time()
+    with local_weights(model_path) as weights:
+        exported = load("ultralytics").YOLO(str(weights)).export(format="onnx", imgsz=imgsz, dynamic=True, verbose=False)
+        exported = Path(exported)
+        # Moved out before a staged (bundled) model's staging directory is removed
+        if exported != onnx_path:
+            shutil.move(str(exported), str(onnx_path))
+    logger.info(f"Exported {onnx_path.name} in {time.time() - export_start:.1f}s")
+    return onnx_path
+
+
+def load_backend(model_path: Path, backend: str = BACKEND_ULTRALYTICS) -> Any:
+    """
+    Build an inference backend for a model.
+
+    Falls back to FP32 ONNX if no INT8 model was produced, and to ultralytics
+    if ONNX Runtime is not installed or the export fails.
+    """
+    if backend == BACKEND_ONNX_INT8:
+        int8_path = int8_path_for(model_path)
+        if int8_path.exists():
+            try:
+                return OnnxBackend(int8_path, BACKEND_ONNX_INT8)
+            except ImportError as e:
+                logger.warning(f"ONNX backend unavailable ({e}), using ultralytics")
+                return UltralyticsBackend(model_path)
+        logger.warning(f"{int8_path.name} not found (run python -m ml_models.quantize), using FP32 ONNX")
+        backend = BACKEND_ONNX
+
+    if backend == BACKEND_ONNX:
+        try:
+            return OnnxBackend(export_onnx(model_path))
+        except ImportError as e:
+            logger.warning(f"ONNX backend unavailable ({e}), using ultralytics")
+        except Exception as e:
+            logger.exception(f"ONNX backend failed for {model_path.name}, using ultralytics: {e}")
+    return UltralyticsBackend(model_path)
+
+
+def compare_backends(model_path: Path, image_paths: List[str], imgsz: int = 640,
+                     backend: str = BACKEND_ONNX) -> Dict:
+    """
+    Compare keypoints from a backend against the ultralytics reference.
+
+    Returns:
+        Per-image and worst-case keypoint drift in pixels
+    """
+    import cv2
+    import numpy as np
+
+    reference = UltralyticsBackend(model_path)
+    candidate = load_backend(model_path, backend)
+    report = {"model": model_path.name, "backend": candidate.name, "images": []}
+    worst = 0.0
+
+    for image_path in image_paths:
+        img = cv2.imread(image_path)
+        if img is None:
+            continue
+        ref = reference.predict([img], imgsz)[0]
+        cand = candidate.predict([img], imgsz)[0]
+        if ref is None or cand is None:
+            report["images"].append({"image": image_path, "detected": [ref is not None, cand is not None]})
+            continue
+        drift = np.linalg.norm(ref.xy - cand.xy, axis=1)
+        worst = max(worst, float(drift.max()))
+        report["images"].append({
+            "image": image_path,
+            "mean_drift_px": round(float(drift.mean()), 3),
+            "max_drift_px": round(float(drift.max()), 3)
+        })
+
+    report["max_drift_px"] = round(worst, 3)
+    return report
+
+
+if __name__ == "__main__":
+    # Compare ONNX keypoints against ultralytics for one model
+    import json
+    import sys
+    from .model_downloader import get_model_path
+
+    if len(sys.argv) > 2:
+        path = get_model_path(sys.argv[1])
+        if path:
+            print(json.dumps(compare_backends(path, sys.argv[2:]), indent=2))
+    else:
+        print("Usage: python -m ml_models.backends <model_filename> <image_path> [...]")
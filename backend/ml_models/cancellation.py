@@ -0,0 +1,176 @@
+"""
+Cooperative Cancellation
+Deadlines and cancellation for classification jobs. Inference threads
+cannot be interrupted, so a job that is abandoned (timed out, deleted, or
+stopped by a shutdown or a lost job lease) sets its token and the thread stops at the next checkpoint
+instead of running every remaining model
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cancellation reasons
+REASON_TIMEOUT = "timeout"
+REASON_DELETED = "deleted"
+REASON_SHUTDOWN = "server shutdown"
+REASON_LEASE_LOST = "lease lost"
+
+
+class OperationCancelled(BaseException):
+    """
+    Raised at a checkpoint of a cancelled or expired job.
+
+    A BaseException (like asyncio.CancelledError) so the broad
+    `except Exception` fallbacks of the view pipelines do not swallow it.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    Cancellation flag with an optional deadline, shared by a job and its threads.
+
+    A child token (one per view) is cancelled with its parent and can have a
+    shorter deadline of its own.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, parent: Optional["CancellationToken"] = None):
+        """
+        Args:
+            timeout: Seconds from now until the token expires (None or <= 0 = no deadline)
+            parent: Token whose cancellation also cancels this one
+        """
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[str], None]] = []
+        self.reason: Optional[str] = None
+        self.parent = parent
+        self.deadline = time.monotonic() + timeout if timeout and timeout > 0 else None
+
+    def child(self, timeout: Optional[float] = None) -> "CancellationToken":
+        """Token cancelled with this one, expiring after timeout or at this token's deadline"""
+        token = CancellationToken(timeout, parent=self)
+        if self.deadline is not None and (token.deadline is None or self.deadline < token.deadline):
+            token.deadline = self.deadline
+        self.add_callback(token.cancel)
+        return token
+
+    def cancel(self, reason: str):
+        """Cancel the token (first reason wins); runs the registered callbacks"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(reason)
+            except Exception as e:
+                logger.warning(f"Cancellation callback failed: {e}")
+
+    def add_callback(self, callback: Callable[[str], None]):
+        """Call callback(reason) on cancellation (immediately if already cancelled)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self.reason)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the deadline (None = no deadline)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the token, or its parent, was cancelled or has expired"""
+        if self._event.is_set():
+            return True
+        if self.parent is not None and self.parent.cancelled:
+            self.cancel(self.parent.reason)
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(REASON_TIMEOUT)
+            return True
+        return False
+
+    def check(self):
+        """Raise OperationCancelled if the token was cancelled or has expired"""
+        if self.cancelled:
+            raise OperationCancelled(self.reason)
+
+
+_local = threading.local()
+
+
+@contextmanager
+def bind_token(token: Optional[CancellationToken]) -> Iterator[Optional[CancellationToken]]:
+    """Make token the one checked by checkpoint() in the calling thread"""
+    previous = getattr(_local, "token", None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def checkpoint():
+    """Stop here if the job running in this thread was cancelled (no-op without a token)"""
+    token = getattr(_local, "token", None)
+    if token is not None:
+        token.check()
+
+
+class CancellationRegistry:
+    """Tokens of the running classifications, so other requests can cancel them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, CancellationToken] = {}
+
+    def register(self, job_id: str, timeout: Optional[float] = None) -> CancellationToken:
+        """Create the token of a job (replaces a stale one)"""
+        token = CancellationToken(timeout)
+        with self._lock:
+            self._tokens[job_id] = token
+        return token
+
+    def cancel(self, job_id: str, reason: str) -> bool:
+        """
+        Cancel a running job.
+
+        Returns:
+            True if the job was running
+        """
+        with self._lock:
+            token = self._tokens.get(job_id)
+        if token is None:
+            return False
+        logger.info(f"Cancelling {job_id}: {reason}")
+        token.cancel(reason)
+        return True
+
+    def release(self, job_id: str, token: CancellationToken):
+        """Forget a finished job's token (unless a newer run replaced it)"""
+        with self._lock:
+            if self._tokens.get(job_id) is token:
+                del self._tokens[job_id]
+
+    def running(self) -> List[str]:
+        """Ids of the jobs holding a token"""
+        with self._lock:
+            return list(self._tokens)
+
+
+# Singleton instance
+cancellation_registry = CancellationRegistry()
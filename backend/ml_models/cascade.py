@@ -0,0 +1,97 @@
+"""
+Resolution Cascade
+Runs each view at a low inference size first and re-runs it at full size
+only when the keypoint confidence is below the view's threshold, so most
+clean photos finish on the cheap path
+"""
+import logging
+import threading
+from typing import Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOW_IMGSZ = 320
+DEFAULT_THRESHOLD = 0.5
+
+
+def pose_confidence(pose) -> float:
+    """Confidence of a pose: mean keypoint confidence, else the detection confidence (0 = nothing)"""
+    if pose is None:
+        return 0.0
+    if pose.conf is not None and len(pose.conf):
+        return float(sum(float(c) for c in pose.conf) / len(pose.conf))
+    return float(pose.box_conf or 0.0)
+
+
+class ResolutionCascade:
+    """Cascade settings plus per-view escalation statistics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.low_imgsz = DEFAULT_LOW_IMGSZ
+        self.thresholds: Dict[str, float] = {}
+        self.high_sizes: Dict[str, int] = {}
+        self._stats: Dict[str, Dict] = {}
+
+    def configure(self, enabled: bool = False, low_imgsz: int = DEFAULT_LOW_IMGSZ,
+                  thresholds: Optional[Dict[str, float]] = None,
+                  high_imgsz: Optional[Dict[str, int]] = None):
+        """
+        Configure the cascade.
+
+        Args:
+            enabled: Run the low-resolution pass first
+            low_imgsz: Inference size of the cheap pass
+            thresholds: Minimum confidence per view to accept the cheap pass (default 0.5)
+            high_imgsz: Inference size of the escalated pass per view (default: the view's imgsz)
+        """
+        with self._lock:
+            self.enabled = enabled
+            self.low_imgsz = max(32, low_imgsz)
+            self.thresholds = dict(thresholds or {})
+            self.high_sizes = dict(high_imgsz or {})
+            self._stats = {}
+        if enabled:
+            logger.info(f"Resolution cascade: {self.low_imgsz}px first, "
+                        f"thresholds {self.thresholds or DEFAULT_THRESHOLD}, escalation sizes {self.high_sizes}")
+
+    def threshold(self, view: str) -> float:
+        return self.thresholds.get(view, DEFAULT_THRESHOLD)
+
+    def high_imgsz(self, view: str, default: int) -> int:
+        return self.high_sizes.get(view, default)
+
+    def record(self, view: str, escalated: bool, confidence: float, seconds: float):
+        """Record one cascaded view analysis"""
+        with self._lock:
+            stats = self._stats.setdefault(view, {"requests": 0, "escalated": 0, "confidence": 0.0, "seconds": 0.0})
+            stats["requests"] += 1
+            stats["escalated"] += int(escalated)
+            stats["confidence"] += confidence
+            stats["seconds"] += seconds
+
+    def stats(self) -> Dict:
+        """Settings and per-view escalation rates for monitoring"""
+        from .model_downloader import VIEW_MODELS
+
+        with self._lock:
+            views = {}
+            for view in VIEW_MODELS:
+                stats = self._stats.get(view, {"requests": 0, "escalated": 0, "confidence": 0.0, "seconds": 0.0})
+                requests = stats["requests"]
+                views[view] = {
+                    "threshold": self.threshold(view),
+                    "high_imgsz": self.high_sizes.get(view),   # None = the view's imgsz
+                    "requests": requests,
+                    "escalated": stats["escalated"],
+                    "escalation_rate": round(stats["escalated"] / requests, 3) if requests else 0.0,
+                    "avg_confidence": round(stats["confidence"] / requests, 3) if requests else 0.0,
+                    "avg_inference_seconds": round(stats["seconds"] / requests, 3) if requests else 0.0
+                }
+            return {"enabled": self.enabled, "low_imgsz": self.low_imgsz, "views": views}
+
+
+# Singleton instance
+resolution_cascade = ResolutionCascade()
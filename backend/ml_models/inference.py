@@ -0,0 +1,221 @@
+"""
+Shared Pose Inference
+Runs view models on the resident registry, micro-batching same-view images
+from concurrent classifications into a single predict call
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .model_registry import model_registry
+from .backends import BACKEND_ULTRALYTICS, BACKENDS, PoseResult, load_backend
+from .scheduler import inference_scheduler
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Batching limits (1 = batching disabled, every image is predicted on its own)
+_max_batch_size = 1
+_max_wait_seconds = 0.010
+
+# Runtime used for the view models, with optional per-model overrides
+_backend = BACKEND_ULTRALYTICS
+_model_backends: Dict[str, str] = {}
+
+_batchers: Dict[Tuple[str, int], "MicroBatcher"] = {}
+_predict_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def configure_batching(max_batch_size: int = 1, max_wait_ms: int = 10):
+    """
+    Configure micro-batching of same-view images.
+
+    Args:
+        max_batch_size: Most images combined into one predict call (1 disables batching)
+        max_wait_ms: Longest time the first image in a batch waits for company
+    """
+    global _max_batch_size, _max_wait_seconds
+    _max_batch_size = max(1, max_batch_size)
+    _max_wait_seconds = max(0, max_wait_ms) / 1000.0
+    with _registry_lock:
+        for batcher in _batchers.values():
+            batcher.max_batch_size = _max_batch_size
+            batcher.max_wait_seconds = _max_wait_seconds
+    logger.info(f"Micro-batching: max batch {_max_batch_size}, max wait {max_wait_ms} ms")
+
+
+def configure_backend(backend: str = BACKEND_ULTRALYTICS, model_backends: Optional[Dict[str, str]] = None):
+    """
+    Select the inference runtime for the view models.
+
+    Args:
+        backend: Default runtime: "ultralytics" (PyTorch), "onnx" (ONNX Runtime CPU)
+                 or "onnx-int8" (quantized ONNX)
+        model_backends: Per-model overrides keyed by model filename
+    """
+    global _backend, _model_backends
+    _backend = _valid_backend(backend)
+    _model_backends = {
+        model: _valid_backend(name) for model, name in (model_backends or {}).items()
+    }
+    overrides = ", ".join(f"{m}={b}" for m, b in _model_backends.items())
+    logger.info(f"Inference backend: {_backend}" + (f" ({overrides})" if overrides else ""))
+
+
+def backend_for(model_filename: str) -> str:
+    """Runtime configured for a model"""
+    return _model_backends.get(model_filename, _backend)
+
+
+def configured_backends() -> List[str]:
+    """Every runtime in use (default plus per-model overrides)"""
+    return list(dict.fromkeys([_backend, *_model_backends.values()]))
+
+
+def _valid_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown inference backend '{backend}', using {BACKEND_ULTRALYTICS}")
+        return BACKEND_ULTRALYTICS
+    return backend
+
+
+@contextmanager
+def use_backend(model_path: Path) -> Iterator[Any]:
+    """Borrow the resident backend for a model from the registry"""
+    backend = backend_for(model_path.name)
+    with model_registry.use(
+        model_path,
+        loader=lambda path: load_backend(path, backend),
+        key=f"{model_path.name}:{backend}"
+    ) as model:
+        yield model
+
+
+def predict_pose(model_path: Path, img: Any, imgsz: int = 640) -> Optional[PoseResult]:
+    """
+    Run pose inference for one image on the resident model.
+
+    Args:
+        model_path: Local path to the model weights
+        img: BGR image array (as returned by cv2.imread)
+        imgsz: Inference image size
+
+    Returns:
+        Keypoints of the most confident detection, or None if nothing was detected
+    """
+    if _max_batch_size <= 1:
+        # Predictors are not thread-safe, so one predict per model at a time
+        with _predict_lock(model_path.name):
+            with use_backend(model_path) as model, inference_scheduler.slot():
+                return model.predict([img], imgsz=imgsz)[0]
+
+    return _get_batcher(model_path, imgsz).submit(img).result()
+
+
+def batching_stats() -> Dict:
+    """Micro-batching statistics per model for monitoring"""
+    with _registry_lock:
+        batchers = list(_batchers.values())
+    return {
+        "max_batch_size": _max_batch_size,
+        "max_wait_ms": round(_max_wait_seconds * 1000),
+        "models": [b.stats() for b in batchers]
+    }
+
+
+def _predict_lock(model_filename: str) -> threading.Lock:
+    with _registry_lock:
+        return _predict_locks.setdefault(model_filename, threading.Lock())
+
+
+def _get_batcher(model_path: Path, imgsz: int) -> "MicroBatcher":
+    key = (model_path.name, imgsz)
+    with _registry_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            batcher = MicroBatcher(model_path, imgsz, _max_batch_size, _max_wait_seconds)
+            _batchers[key] = batcher
+        return batcher
+
+
+class MicroBatcher:
+    """
+    Collects images for one model and runs them as one batched predict.
+
+    One batcher per model and image size (the cascade uses two sizes); the
+    batchers of a model share its predict lock, as the (non thread-safe)
+    ultralytics predictor must not run two predicts at once.
+    """
+
+    def __init__(self, model_path: Path, imgsz: int, max_batch_size: int, max_wait_seconds: float):
+        self.model_path = model_path
+        self.imgsz = imgsz
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._queue: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        self._batches = 0
+        self._images = 0
+        self._largest_batch = 0
+        self._worker = threading.Thread(
+            target=self._run,
+            name=f"batcher-{model_path.stem}-{imgsz}",
+            daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, img: Any) -> Future:
+        """Queue an image; the future resolves to its PoseResult (or None)"""
+        future: Future = Future()
+        self._queue.put((img, future))
+        return future
+
+    def stats(self) -> Dict:
+        return {
+            "model": self.model_path.name,
+            "imgsz": self.imgsz,
+            "batches": self._batches,
+            "images": self._images,
+            "avg_batch_size": round(self._images / self._batches, 2) if self._batches else 0.0,
+            "largest_batch": self._largest_batch,
+            "queued": self._queue.qsize()
+        }
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_seconds
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._predict_batch(batch)
+
+    def _predict_batch(self, batch: List[Tuple[Any, Future]]):
+        images = [img for img, _ in batch]
+        try:
+            with _predict_lock(self.model_path.name), use_backend(self.model_path) as model, \
+                    inference_scheduler.slot(len(images)):
+                infer_start = time.time()
+                results = model.predict(images, imgsz=self.imgsz)
+                infer_time = time.time() - infer_start
+            logger.info(f"{self.model_path.name}: batch of {len(images)} in {infer_time:.2f}s")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self._batches += 1
+        self._images += len(images)
+        self._largest_batch = max(self._largest_batch, len(images))
+        # Fan results back out: one result per input image, in order
+        for i, (_, future) in enumerate(batch):
+            future.set_result(results[i] if i < len(results) else None)
@@ -0,0 +1,309 @@
+"""
+Columnar Keypoint Store
+Keypoints of every classification in fixed-shape float32 files, one set of
+columns per view model, memory-mapped for zero-copy reads. Reading the
+keypoints of the whole archive is one mmap per column instead of a document
+fetch per classification.
+
+Layout of the store directory (row i of every file is the same classification):
+    layout.json        view -> keypoint names the files were written with
+    ids.s24            classification ids, 24 ASCII bytes per row
+    <view>.xy.f32      float32 [rows, num_points, 2] (NaN = view or point missing)
+    <view>.conf.f32    float32 [rows, num_points]
+    <view>.shape.i32   int32   [rows, 2] source image height and width (0 = missing)
+    .lock              flock()ed by the process writing a row
+"""
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:     # Windows: one writer process only
+    fcntl = None
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = Path("keypoint_store")
+
+# Views in upload order; their keypoint names come from the integration modules
+STORE_VIEWS = ("rear", "side", "top", "udder", "side_udder")
+
+ID_BYTES = 24   # hex ObjectId
+
+
+class KeypointStoreError(RuntimeError):
+    """The store on disk does not match the declared keypoints"""
+
+
+def _view_layout() -> Dict[str, List[str]]:
+    """Keypoint names per view (REAR_KP_NAMES, SIDE_KP_NAMES, ...)"""
+    from .view_analyzer import get_analyzer
+    return {view: list(get_analyzer(view).keypoint_names) for view in STORE_VIEWS}
+
+
+class ViewColumns:
+    """Zero-copy columns of one view over all stored classifications"""
+
+    def __init__(self, view: str, keypoint_names: List[str], ids: "np.ndarray",
+                 xy: "np.ndarray", conf: "np.ndarray", image_shape: "np.ndarray"):
+        self.view = view
+        self.keypoint_names = keypoint_names
+        self.ids = ids                  # [rows] S24
+        self.xy = xy                    # [rows, num_points, 2]
+        self.conf = conf                # [rows, num_points]
+        self.image_shape = image_shape  # [rows, 2]
+
+    def __len__(self) -> int:
+        return self.xy.shape[0]
+
+    def point(self, name: str) -> "np.ndarray":
+        """Coordinates of one named keypoint over all rows [rows, 2] (a view, no copy)"""
+        return self.xy[:, self.keypoint_names.index(name)]
+
+    @property
+    def present(self) -> "np.ndarray":
+        """Rows where this view was analyzed"""
+        return self.image_shape[:, 0] > 0
+
+
+class KeypointStore:
+    """
+    Append-only columnar store of view keypoints, keyed by classification id.
+
+    Rows are appended (or overwritten in place for a re-processed
+    classification) under a thread lock and an flock() on the store's lock
+    file, so API processes, pre-fork and standalone workers can all write;
+    readers map the files read-only and re-map when the row count grows.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self._lock = threading.Lock()
+        self._layout: Optional[Dict[str, List[str]]] = None
+        self._index: Dict[str, int] = {}
+        self._rows = 0
+        self._maps: Dict[str, ViewColumns] = {}
+        self._mapped_rows = -1
+        self.path = Path(path) if path else DEFAULT_STORE_DIR
+        self.enabled = True
+
+    def configure(self, path: Optional[Path] = None, enabled: bool = True):
+        """
+        Set the store directory.
+
+        Args:
+            path: Directory of the column files (defaults to ./keypoint_store)
+            enabled: False to skip writing keypoints
+        """
+        with self._lock:
+            self.path = Path(path) if path else DEFAULT_STORE_DIR
+            self.enabled = enabled
+            self._layout = None
+            self._index = {}
+            self._rows = 0
+            self._maps = {}
+            self._mapped_rows = -1
+        if enabled:
+            logger.info(f"Keypoint store: {self.path}")
+            if not self.path.is_absolute():
+                logger.warning(f"Keypoint store path {self.path} is relative: processes started "
+                               f"from other directories write to other stores")
+
+    def put(self, classification_id: str, records: Dict[str, Dict]):
+        """
+        Store the keypoints of one classification.
+
+        Args:
+            classification_id: Classification ObjectId (hex)
+            records: Pose records by view (ViewAnalyzer.pose_record / results.modelKeypoints)
+        """
+        if not self.enabled:
+            return
+        import numpy as np
+
+        key = classification_id.encode("ascii")
+        if len(key) != ID_BYTES:
+            raise ValueError(f"Classification id must be {ID_BYTES} characters: {classification_id}")
+
+        with self._lock, self._write_lock():
+            # Rows appended by other processes are picked up under the file lock
+            layout = self._open()
+            row = self._index.get(classification_id)
+
+            for view, names in layout.items():
+                xy = np.full((len(names), 2), np.nan, dtype=np.float32)
+                conf = np.full(len(names), np.nan, dtype=np.float32)
+                shape = np.zeros(2, dtype=np.int32)
+                record = records.get(view)
+                if record:
+                    points = np.asarray(record["xy"], dtype=np.float32).reshape(-1, 2)[:len(names)]
+                    xy[:len(points)] = points
+                    if record.get("conf") is not None:
+                        values = np.asarray(record["conf"], dtype=np.float32)[:len(names)]
+                        conf[:len(values)] = values
+                    shape[:] = record["imageShape"][:2]
+                for suffix, column in (("xy.f32", xy), ("conf.f32", conf), ("shape.i32", shape)):
+                    self._write_row(f"{view}.{suffix}", row, column.tobytes())
+
+            # The id goes last, so a reader that sees it also sees the columns
+            if row is None:
+                self._write_row("ids.s24", None, key)
+                self._index[classification_id] = self._rows
+                self._rows += 1
+
+    def remove(self, classification_id: str):
+        """Blank the keypoints of a deleted classification (its row stays, marked missing)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._open()
+            stored = classification_id in self._index
+        if stored:
+            self.put(classification_id, {})
+
+    def get(self, classification_id: str) -> Optional[Dict[str, Dict]]:
+        """
+        Keypoints of one classification.
+
+        Returns:
+            {view: {"xy": [num_points, 2], "conf": [num_points], "imageShape": (h, w)}}
+            for the views that were analyzed, or None if the classification is not stored
+        """
+        with self._lock:
+            self._open()
+            row = self._index.get(classification_id)
+        if row is None:
+            return None
+        views = {}
+        for view in STORE_VIEWS:
+            columns = self.columns(view)
+            if row < len(columns) and columns.image_shape[row, 0] > 0:
+                views[view] = {
+                    "xy": columns.xy[row].copy(),
+                    "conf": columns.conf[row].copy(),
+                    "imageShape": tuple(int(v) for v in columns.image_shape[row])
+                }
+        return views
+
+    def columns(self, view: str) -> ViewColumns:
+        """
+        Memory-mapped columns of a view over every stored classification.
+
+        Args:
+            view: "rear", "side", "top", "udder" or "side_udder"
+        """
+        with self._lock:
+            layout = self._open()
+            if view not in layout:
+                raise ValueError(f"Unknown view: {view}")
+            if self._mapped_rows != self._rows:
+                self._maps = {}
+                self._mapped_rows = self._rows
+            if view not in self._maps:
+                self._maps[view] = self._map_view(view, layout[view], self._rows)
+            return self._maps[view]
+
+    def stats(self) -> Dict:
+        """Store statistics for monitoring"""
+        with self._lock:
+            if not self.enabled:
+                return {"enabled": False, "path": str(self.path)}
+            self._open()
+            size_bytes = sum(f.stat().st_size for f in self.path.glob("*") if f.is_file())
+            return {
+                "enabled": True,
+                "path": str(self.path),
+                "classifications": self._rows,
+                "size_mb": round(size_bytes / (1024*1024), 2),
+                "bytes_per_classification": round(size_bytes / self._rows) if self._rows else 0,
+                "views": {view: len(names) for view, names in self._layout.items()}
+            }
+
+    def _open(self) -> Dict[str, List[str]]:
+        """Create or validate the store and load the id index (caller holds the lock)"""
+        if self._layout is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            declared = _view_layout()
+            layout_file = self.path / "layout.json"
+            if layout_file.exists():
+                stored = json.loads(layout_file.read_text())
+                if stored != declared:
+                    raise KeypointStoreError(
+                        f"Keypoint store {self.path} was written with different keypoint names; "
+                        f"move it away to start a new store"
+                    )
+            else:
+                # Atomic, so a concurrent first write by another process is never seen half-written
+                temp_file = layout_file.with_name(f"layout.json.{os.getpid()}.tmp")
+                temp_file.write_text(json.dumps(declared, indent=2))
+                temp_file.replace(layout_file)
+            self._layout = declared
+            self._index = {}
+            self._rows = 0
+
+        # Pick up rows appended by another process
+        ids_file = self.path / "ids.s24"
+        rows = ids_file.stat().st_size // ID_BYTES if ids_file.exists() else 0
+        if rows != self._rows:
+            with open(ids_file, "rb") as f:
+                f.seek(self._rows * ID_BYTES)
+                data = f.read((rows - self._rows) * ID_BYTES)
+            for i in range(rows - self._rows):
+                self._index[data[i * ID_BYTES:(i + 1) * ID_BYTES].decode("ascii")] = self._rows + i
+            self._rows = rows
+        return self._layout
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Exclusive lock on the store across processes (caller holds the thread lock)"""
+        if fcntl is None:
+            yield
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / ".lock", "a+b") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write_row(self, filename: str, row: Optional[int], data: bytes):
+        """Append a row (row None) or overwrite row `row` of a column file"""
+        path = self.path / filename
+        offset = (self._rows if row is None else row) * len(data)
+        with open(path, "r+b" if path.exists() else "w+b") as f:
+            if row is None:
+                # Drop a partial row left by an interrupted write; a short file
+                # (a view column added later) is zero-padded by the seek
+                f.truncate(offset)
+            f.seek(offset)
+            f.write(data)
+
+    def _map_view(self, view: str, names: List[str], rows: int) -> ViewColumns:
+        """Map the column files of a view read-only (caller holds the lock)"""
+        import numpy as np
+
+        def mapped(filename: str, dtype, shape: Tuple[int, ...]):
+            if rows == 0:
+                return np.empty((0,) + shape[1:], dtype=dtype)
+            return np.memmap(self.path / filename, dtype=dtype, mode="r", shape=shape)
+
+        return ViewColumns(
+            view, names,
+            mapped("ids.s24", f"S{ID_BYTES}", (rows,)),
+            mapped(f"{view}.xy.f32", np.float32, (rows, len(names), 2)),
+            mapped(f"{view}.conf.f32", np.float32, (rows, len(names))),
+            mapped(f"{view}.shape.i32", np.int32, (rows, 2))
+        )
+
+
+# Singleton instance
+keypoint_store = KeypointStore()
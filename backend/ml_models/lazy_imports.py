@@ -0,0 +1,113 @@
+"""
+Lazy Heavy Imports
+numpy, OpenCV, torch/ultralytics and ONNX Runtime are imported on first use
+(or by a background pre-import after startup) instead of at module import,
+and the time each import took is recorded for the import-time profile
+"""
+import importlib
+import logging
+import threading
+import time
+from types import ModuleType
+from typing import Dict, Iterable, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Libraries every view analysis needs
+BASE_MODULES = ("numpy", "cv2")
+
+# Libraries each inference backend needs (keyed by backend name)
+BACKEND_MODULES = {
+    "ultralytics": ("torch", "ultralytics"),
+    "onnx": ("onnxruntime",),
+    "onnx-int8": ("onnxruntime",),
+}
+
+# View integration modules, imported by ai_service on the first classification
+VIEW_MODULES = (
+    "ml_models.view_analyzer",
+    "ml_models.rear_view_integration",
+    "ml_models.side_view_integration",
+    "ml_models.top_view_integration",
+    "ml_models.udder_view_integration",
+    "ml_models.side_udder_integration",
+)
+
+_lock = threading.Lock()
+_profile: Dict[str, Dict] = {}
+_preload_state = {"status": "off", "seconds": 0.0}
+
+
+def load(name: str) -> ModuleType:
+    """
+    Import a module, recording how long its first import took.
+
+    Args:
+        name: Dotted module name (e.g. "cv2", "ultralytics")
+
+    Returns:
+        The imported module
+    """
+    if name in _profile:
+        return importlib.import_module(name)
+
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    record(name, time.perf_counter() - start, threading.current_thread().name)
+    return module
+
+
+def record(name: str, seconds: float, thread: str = "main", error: Optional[str] = None):
+    """Record the import time of a module (first record wins)"""
+    with _lock:
+        if name not in _profile:
+            _profile[name] = {"seconds": round(seconds, 3), "thread": thread}
+            if error:
+                _profile[name]["error"] = error
+
+
+def runtime_modules(backends: Iterable[str]) -> List[str]:
+    """Heavy modules needed to serve requests with the given backends, in import order"""
+    modules = list(BASE_MODULES)
+    for backend in backends:
+        for name in BACKEND_MODULES.get(backend, ()):
+            if name not in modules:
+                modules.append(name)
+    return modules + list(VIEW_MODULES)
+
+
+def start_preload(modules: List[str]) -> threading.Thread:
+    """
+    Import modules in a background thread, so the first request finds them loaded.
+
+    Failures are logged and skipped (e.g. onnxruntime not installed).
+    """
+    def run():
+        start = time.perf_counter()
+        for name in modules:
+            module_start = time.perf_counter()
+            try:
+                load(name)
+            except Exception as e:
+                logger.warning(f"Pre-import of {name} failed: {e}")
+                record(name, time.perf_counter() - module_start, threading.current_thread().name, str(e))
+        with _lock:
+            _preload_state["status"] = "done"
+            _preload_state["seconds"] = round(time.perf_counter() - start, 3)
+        logger.info(f"Pre-imported {len(modules)} modules in {_preload_state['seconds']:.2f}s")
+
+    with _lock:
+        _preload_state["status"] = "running"
+    thread = threading.Thread(target=run, name="preload-imports", daemon=True)
+    thread.start()
+    return thread
+
+
+def import_profile() -> Dict:
+    """Import-time profile for monitoring"""
+    with _lock:
+        return {
+            "preload": dict(_preload_state),
+            "modules": {name: dict(entry) for name, entry in _profile.items()}
+        }
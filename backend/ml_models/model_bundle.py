@@ -0,0 +1,272 @@
+"""
+Model Bundle
+One versioned archive holding every view model and its exported variants
+(ONNX, INT8), for deployments that cannot reach Hugging Face. The bundle is
+memory-mapped and its members are read in place by offset instead of being
+extracted; only ultralytics checkpoints, which load from a path, are staged in
+RAM (/dev/shm) while they load.
+
+Layout of a bundle file:
+    8 bytes    magic b"ATCMODL1"
+    8 bytes    index length (little-endian uint64)
+    index      JSON {"format", "version", "created", "members": {name: {"offset", "size", "sha256"}}}
+    members    stored uncompressed, each starting on a 4096-byte boundary
+"""
+import errno
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ATCMODL1"
+FORMAT_VERSION = 1
+ALIGNMENT = 4096
+HEADER = struct.Struct("<8sQ")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# RAM-backed directory for loaders that only accept a file path
+STAGING_DIR = Path("/dev/shm")
+
+_staging_warned = False
+
+
+class BundleError(RuntimeError):
+    """The file is not a readable model bundle"""
+
+
+class ModelBundle:
+    """Read-only, memory-mapped model bundle"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            magic, index_length = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC:
+                raise BundleError(f"{self.path} is not a model bundle")
+            index = json.loads(self._file.read(index_length))
+            if index.get("format") != FORMAT_VERSION:
+                raise BundleError(f"{self.path} has bundle format {index.get('format')}, "
+                                  f"expected {FORMAT_VERSION}")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (struct.error, ValueError) as e:
+            self._file.close()
+            raise BundleError(f"{self.path} has a corrupt index: {e}")
+        except BaseException:
+            self._file.close()
+            raise
+
+        self.version: str = index.get("version", "")
+        self.created: str = index.get("created", "")
+        self.members: Dict[str, Dict] = index["members"]
+        self._stat = os.stat(self._file.fileno())
+        for name, member in self.members.items():
+            if member["offset"] + member["size"] > len(self._map):
+                raise BundleError(f"{self.path} is truncated ({name} ends past the end of the file)")
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.members
+
+    def view(self, name: str) -> memoryview:
+        """Bytes of a member, zero-copy over the mapping"""
+        member = self.members[name]
+        return memoryview(self._map)[member["offset"]:member["offset"] + member["size"]]
+
+    def read(self, name: str) -> bytes:
+        """Copy of a member's bytes"""
+        return bytes(self.view(name))
+
+    def digest(self, name: str) -> str:
+        """SHA-256 of a member, hashed from the mapping"""
+        digest = hashlib.sha256()
+        view = self.view(name)
+        for start in range(0, len(view), HASH_CHUNK_SIZE):
+            digest.update(view[start:start + HASH_CHUNK_SIZE])
+        return digest.hexdigest()
+
+    def member_stat(self, name: str) -> os.stat_result:
+        """stat() of a member: its own size, the bundle's timestamps"""
+        st = self._stat
+        return os.stat_result(
+            (st.st_mode, st.st_ino, st.st_dev, 1, st.st_uid, st.st_gid, self.members[name]["size"],
+             int(st.st_atime), int(st.st_mtime), int(st.st_ctime)),
+            {"st_atime": st.st_atime, "st_mtime": st.st_mtime, "st_ctime": st.st_ctime,
+             "st_atime_ns": st.st_atime_ns, "st_mtime_ns": st.st_mtime_ns, "st_ctime_ns": st.st_ctime_ns}
+        )
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Path]:
+        """
+        A real file with a member's bytes, for loaders that only accept a path
+        (ultralytics). The file lives in RAM (/dev/shm) and is removed on exit.
+        Without a writable /dev/shm (macOS, locked-down containers) it is staged
+        in the temp directory, which is usually on disk; a warning says so.
+        """
+        global _staging_warned
+        base = STAGING_DIR if STAGING_DIR.is_dir() and os.access(STAGING_DIR, os.W_OK) else None
+        if base is None and not _staging_warned:
+            _staging_warned = True
+            logger.warning(f"{STAGING_DIR} is not available: bundle members are staged in "
+                           f"{tempfile.gettempdir()} while they load, which may be on disk")
+        staging = Path(tempfile.mkdtemp(prefix="model-bundle-", dir=base))
+        try:
+            staged = staging / name
+            member = self.members[name]
+            with open(staged, "wb") as out:
+                offset, remaining = member["offset"], member["size"]
+                try:
+                    # Kernel-side copy from the bundle file
+                    while remaining:
+                        sent = os.sendfile(out.fileno(), self._file.fileno(), offset, remaining)
+                        if not sent:
+                            raise BundleError(f"{self.path} ended inside {name}")
+                        offset += sent
+                        remaining -= sent
+                except (AttributeError, OSError):
+                    out.seek(0)
+                    out.truncate()
+                    out.write(self.view(name))
+            yield staged
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class BundledPath(type(Path())):
+    """
+    Path of a bundle member, written as if the bundle were a directory:
+    <bundle file>/<member name>. stat() and exists() answer from the bundle
+    index, so code keyed on model paths (registry, result cache, ONNX variant
+    lookup) works unchanged; loaders go through local_weights / model_source.
+    """
+
+    def bundle(self) -> Optional[ModelBundle]:
+        """Open bundle holding this member"""
+        return _open_bundles.get(str(self.parent))
+
+    def stat(self, *args, **kwargs) -> os.stat_result:
+        bundle = self.bundle()
+        if bundle is None:
+            return super().stat(*args, **kwargs)
+        if self.name not in bundle:
+            raise FileNotFoundError(errno.ENOENT, f"Not in bundle {bundle.path.name}", str(self))
+        return bundle.member_stat(self.name)
+
+
+_open_bundles: Dict[str, ModelBundle] = {}
+_open_lock = threading.Lock()
+
+
+def open_bundle(path: Union[str, Path]) -> ModelBundle:
+    """Open (once per process) and map a bundle file"""
+    key = str(Path(path).absolute())
+    with _open_lock:
+        bundle = _open_bundles.get(key)
+        if bundle is None:
+            bundle = ModelBundle(Path(key))
+            _open_bundles[key] = bundle
+            logger.info(f"Model bundle {bundle.path.name} (version {bundle.version}): "
+                        f"{', '.join(bundle.members)}")
+        return bundle
+
+
+def member_path(bundle: ModelBundle, name: str) -> BundledPath:
+    """Path of a member of an open bundle"""
+    return BundledPath(bundle.path, name)
+
+
+@contextmanager
+def local_weights(model_path: Path) -> Iterator[Path]:
+    """A filesystem path with the weights: the path itself, or a bundle member staged in RAM"""
+    bundle = model_path.bundle() if isinstance(model_path, BundledPath) else None
+    if bundle is None:
+        yield model_path
+        return
+    with bundle.stage(model_path.name) as staged:
+        yield staged
+
+
+def model_source(model_path: Path) -> Union[str, bytes]:
+    """What ONNX Runtime loads: the file name, or a bundle member's bytes read from the mapping"""
+    bundle = model_path.bundle() if isinstance(model_path, BundledPath) else None
+    if bundle is None:
+        return str(model_path)
+    return bundle.read(model_path.name)
+
+
+def write_bundle(output: Path, files: List[Path], version: Optional[str] = None) -> Dict:
+    """
+    Pack weights files into a bundle.
+
+    Args:
+        output: Bundle file to write (replaced atomically)
+        files: Files to pack, stored under their file names (bundle members are read through local_weights)
+        version: Version label (default: UTC timestamp)
+
+    Returns:
+        The bundle index
+    """
+    output = Path(output)
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+
+    # Offsets are fixed before hashing: digests have a fixed length, so the final
+    # index is exactly as long as this draft with placeholder digests
+    index = {
+        "format": FORMAT_VERSION,
+        "version": version,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "members": {}
+    }
+    sizes = {path.name: path.stat().st_size for path in files}
+    for name in sizes:
+        index["members"][name] = {"offset": 0, "size": sizes[name], "sha256": "0" * 64}
+    draft = json.dumps(index, indent=2).encode()
+    # Offset digits can grow the draft: leave room for them
+    index_length = len(draft) + 24 * len(sizes)
+    offset = _align(HEADER.size + index_length)
+    for name in sizes:
+        index["members"][name]["offset"] = offset
+        offset = _align(offset + sizes[name])
+
+    temp_path = output.with_name(output.name + ".tmp")
+    with open(temp_path, "wb") as out:
+        for path in files:
+            member = index["members"][path.name]
+            out.seek(member["offset"])
+            digest = hashlib.sha256()
+            with local_weights(path) as local, open(local, "rb") as src:
+                for chunk in iter(lambda: src.read(HASH_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+            member["sha256"] = digest.hexdigest()
+        out.truncate(out.tell())
+
+        encoded = json.dumps(index, indent=2).encode()
+        if len(encoded) > index_length:
+            raise BundleError("Bundle index outgrew its reserved space")
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, index_length))
+        out.write(encoded.ljust(index_length))
+    temp_path.replace(output)
+    logger.info(f"Wrote bundle {output} (version {version}, {len(files)} members, "
+                f"{output.stat().st_size / (1024*1024):.1f} MB)")
+    return index
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
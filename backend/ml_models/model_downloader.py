@@ -1,20 +1,27 @@
 """
 Model Downloader Utility
-Downloads and caches ML models from Hugging Face
+Resolves the ML model files from their sources in order - an offline model
+bundle, the local weights directory, Hugging Face - verified against the
+SHA-256 digests of model_manifest.json
 """
+import argparse
 import os
+import json
 import time
 import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Iterable, List, Optional
 import threading
+from .model_bundle import BundleError, ModelBundle, member_path, open_bundle, write_bundle
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Thread lock for safe concurrent downloads
-_download_lock = threading.Lock()
+# One lock per model file: different models download in parallel, the same model once
+_download_locks: Dict[str, threading.Lock] = {}
+_download_locks_guard = threading.Lock()
 
 # Directory where models are stored - use weights directory
 ML_MODELS_DIR = Path(__file__).parent / "weights"
@@ -28,48 +35,341 @@ MODEL_URLS = {
     "udder_view_model.pt": "https://huggingface.co/Kunalv/animal-type-classifier-models/resolve/main/udder_view_model.pt"
 }
 
+# Model file serving each view
+VIEW_MODELS = {
+    "rear": "rear_view_model.pt",
+    "side": "side_view_model_v2.pt",
+    "top": "top_view_model.pt",
+    "udder": "udder_view_model.pt",
+    "side_udder": "cattle_side_udder.pt"
+}
+
 # Minimum expected file sizes (in bytes) to validate downloads
 # YOLOv8 pose models are typically ~40MB
 MIN_MODEL_SIZE = 10 * 1024 * 1024  # 10 MB
 
+# Read sizes adapt to the link: doubled while a read is fast, halved while it is slow
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+CHUNK_TARGET_SECONDS = 0.5
+PROGRESS_STEP = 5 * 1024 * 1024  # log progress every 5MB
+
+DEFAULT_DOWNLOAD_WORKERS = 5
+
+# Expected size and SHA-256 per model file (null = not pinned: only the minimum size is
+# checked, and a warning is logged); pin with: python -m ml_models.model_downloader --write-manifest
+MANIFEST_PATH = Path(__file__).parent / "model_manifest.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Where model files come from, tried in the configured order
+SOURCE_BUNDLE = "bundle"    # members of the model bundle, read in place
+SOURCE_LOCAL = "local"      # files in the weights directory
+SOURCE_REMOTE = "remote"    # downloads from Hugging Face (or the configured mirror)
+MODEL_SOURCES = (SOURCE_BUNDLE, SOURCE_LOCAL, SOURCE_REMOTE)
+
+_sources: List[str] = list(MODEL_SOURCES)
+_bundle: Optional[ModelBundle] = None
+
+# Model files verified by this process: later calls skip every filesystem check
+_resolved: Dict[str, Path] = {}
+_manifest: Optional[Dict[str, Dict]] = None
+_unpinned_warned: set = set()
+
+# Mirror serving the model files instead of Hugging Face (None = MODEL_URLS)
+_base_url: Optional[str] = None
+_download_workers = DEFAULT_DOWNLOAD_WORKERS
+
+
+def configure_downloads(base_url: Optional[str] = None, workers: int = DEFAULT_DOWNLOAD_WORKERS):
+    """
+    Configure where and how model files are downloaded.
+    
+    Args:
+        base_url: URL prefix serving <base_url>/<model file> (None = Hugging Face)
+        workers: Models downloaded at once by download_models
+    """
+    global _base_url, _download_workers
+    _base_url = base_url.rstrip('/') if base_url else None
+    _download_workers = max(1, workers)
+    if _base_url:
+        logger.info(f"Model downloads from {_base_url}")
+
+
+def configure_sources(sources: Optional[List[str]] = None, bundle_path: Optional[str] = None):
+    """
+    Configure where model files come from.
+    
+    Args:
+        sources: SOURCE_BUNDLE, SOURCE_LOCAL and SOURCE_REMOTE in the order they are tried
+                 (None = all, in that order); leave out SOURCE_REMOTE for offline deployments
+        bundle_path: Model bundle file (python -m ml_models.model_downloader --bundle)
+    """
+    global _sources, _bundle
+    sources = list(sources or MODEL_SOURCES)
+    for source in sources:
+        if source not in MODEL_SOURCES:
+            logger.warning(f"Unknown model source '{source}' ignored")
+    _sources = [source for source in sources if source in MODEL_SOURCES]
+    
+    _bundle = None
+    if bundle_path and SOURCE_BUNDLE in _sources:
+        try:
+            _bundle = open_bundle(bundle_path)
+        except (OSError, BundleError) as e:
+            logger.error(f"Model bundle unavailable: {e}")
+    _resolved.clear()
+    logger.info(f"Model sources: {', '.join(_sources)}")
+
+
+def model_url(model_filename: str) -> str:
+    """Download URL of a model file"""
+    if _base_url:
+        return f"{_base_url}/{model_filename}"
+    return MODEL_URLS[model_filename]
+
+
+def _model_lock(model_filename: str) -> threading.Lock:
+    """Download lock of one model file"""
+    with _download_locks_guard:
+        return _download_locks.setdefault(model_filename, threading.Lock())
+
+
+def load_manifest() -> Dict[str, Dict]:
+    """Expected {"size", "sha256"} per model file (read once)"""
+    global _manifest
+    if _manifest is None:
+        try:
+            _manifest = json.loads(MANIFEST_PATH.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Model manifest unavailable ({e}), digests are not pinned")
+            _manifest = {}
+    return _manifest
+
+
+def _expected(model_filename: str) -> Dict:
+    """Manifest entry of a model file; warns (once per file) when its digest is not pinned"""
+    expected = load_manifest().get(model_filename) or {}
+    if not expected.get("sha256") and model_filename not in _unpinned_warned:
+        _unpinned_warned.add(model_filename)
+        logger.warning(f"⚠ {model_filename} has no pinned SHA-256 in {MANIFEST_PATH.name}: "
+                       f"its content is NOT verified (pin it with --write-manifest)")
+    return expected
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file, read in 1MB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sidecar_path(model_path: Path) -> Path:
+    """Record of the last verification of a weights file"""
+    return model_path.with_name(f"{model_path.name}.verified.json")
+
+
+def _write_sidecar(model_path: Path, digest: str):
+    """Record the verified digest with the size and mtime it was computed for"""
+    stat = model_path.stat()
+    record = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+    try:
+        _sidecar_path(model_path).write_text(json.dumps(record))
+    except OSError as e:
+        logger.warning(f"Could not write verification record for {model_path.name}: {e}")
+
+
+def _verify(model_path: Path, rehash: bool = False) -> Dict:
+    """
+    Check a weights file against the manifest.
+    
+    The file is hashed only when its sidecar record does not match its current
+    size and mtime (or rehash is set); otherwise the recorded digest is used.
+    
+    Args:
+        model_path: Weights file (must exist)
+        rehash: Ignore the sidecar record and hash the file
+    
+    Returns:
+        {"valid", "sha256", "verified_by": "sidecar" | "hash", "error"}
+    """
+    expected = _expected(model_path.name)
+    stat = model_path.stat()
+    
+    if stat.st_size < MIN_MODEL_SIZE:
+        return {"valid": False, "sha256": None, "verified_by": None,
+                "error": f"too small ({stat.st_size} bytes)"}
+    if expected.get("size") and stat.st_size != expected["size"]:
+        return {"valid": False, "sha256": None, "verified_by": None,
+                "error": f"size {stat.st_size} != {expected['size']}"}
+    
+    record = None
+    if not rehash:
+        try:
+            record = json.loads(_sidecar_path(model_path).read_text())
+        except (OSError, ValueError):
+            record = None
+    if record and record.get("size") == stat.st_size and record.get("mtime_ns") == stat.st_mtime_ns:
+        digest, verified_by = record["sha256"], "sidecar"
+    else:
+        digest, verified_by = file_digest(model_path), "hash"
+        _write_sidecar(model_path, digest)
+    
+    if expected.get("sha256") and digest != expected["sha256"]:
+        return {"valid": False, "sha256": digest, "verified_by": verified_by,
+                "error": "SHA-256 does not match the manifest"}
+    return {"valid": True, "sha256": digest, "verified_by": verified_by, "error": None}
+
+
+def _bundle_sidecar_path(bundle: ModelBundle) -> Path:
+    """Record of the verified members of a bundle"""
+    return bundle.path.with_name(f"{bundle.path.name}.verified.json")
+
+
+def _verify_bundled(bundle: ModelBundle, model_filename: str, rehash: bool = False) -> Dict:
+    """
+    Check a bundle member against the bundle index and the manifest.
+    
+    Members are hashed from the mapping once per bundle file; the digests are
+    recorded in a sidecar next to the bundle, keyed by its size and mtime.
+    
+    Returns:
+        {"valid", "sha256", "verified_by": "sidecar" | "hash", "error"}
+    """
+    expected = _expected(model_filename)
+    member = bundle.members[model_filename]
+    sidecar = _bundle_sidecar_path(bundle)
+    stat = bundle.path.stat()
+    
+    with _model_lock(sidecar.name):
+        record = None
+        if not rehash:
+            try:
+                record = json.loads(sidecar.read_text())
+            except (OSError, ValueError):
+                record = None
+        if not record or record.get("size") != stat.st_size or record.get("mtime_ns") != stat.st_mtime_ns:
+            record = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "members": {}}
+        
+        digest = None if rehash else record["members"].get(model_filename)
+        verified_by = "sidecar"
+        if digest is None:
+            digest, verified_by = bundle.digest(model_filename), "hash"
+            record["members"][model_filename] = digest
+            try:
+                sidecar.write_text(json.dumps(record))
+            except OSError as e:
+                logger.warning(f"Could not write verification record for {bundle.path.name}: {e}")
+    
+    if digest != member["sha256"]:
+        return {"valid": False, "sha256": digest, "verified_by": verified_by,
+                "error": "SHA-256 does not match the bundle index (corrupt bundle)"}
+    if expected.get("sha256") and digest != expected["sha256"]:
+        return {"valid": False, "sha256": digest, "verified_by": verified_by,
+                "error": "SHA-256 does not match the manifest"}
+    return {"valid": True, "sha256": digest, "verified_by": verified_by, "error": None}
+
 
 def get_model_path(model_filename: str) -> Optional[Path]:
     """
     Get the local path to a model, downloading it if necessary.
     
+    A file is verified once per process (by its sidecar record, or by hashing it
+    when the record is stale); the resolved path is memoized afterwards.
+    
     Args:
         model_filename: Name of the model file (e.g., "rear_view_model.pt")
         
     Returns:
         Path object pointing to the local model file, or None if download fails
     """
+    resolved = _resolved.get(model_filename)
+    if resolved is not None:
+        return resolved
+    
     if model_filename not in MODEL_URLS:
         logger.error(f"Unknown model: {model_filename}")
         logger.error(f"Available models: {', '.join(MODEL_URLS.keys())}")
         return None
     
-    # Ensure weights directory exists
-    ML_MODELS_DIR.mkdir(exist_ok=True)
-    
+    # Only requests for the same model wait here
+    with _model_lock(model_filename):
+        # Another thread may have resolved it meanwhile
+        if model_filename in _resolved:
+            return _resolved[model_filename]
+        
+        for source in _sources:
+            if source == SOURCE_BUNDLE:
+                model_path = _from_bundle(model_filename)
+            elif source == SOURCE_LOCAL:
+                model_path = _from_local(model_filename)
+            else:
+                # Model doesn't exist or is invalid - download it
+                ML_MODELS_DIR.mkdir(exist_ok=True)
+                model_path = _download_model(model_filename)
+            if model_path is not None:
+                _resolved[model_filename] = model_path
+                return model_path
+        
+        logger.error(f"{model_filename} is not available from any model source ({', '.join(_sources)})")
+        return None
+
+
+def _from_bundle(model_filename: str) -> Optional[Path]:
+    """Bundle member path of a model file, if the bundle holds a valid copy"""
+    if _bundle is None or model_filename not in _bundle:
+        return None
+    check = _verify_bundled(_bundle, model_filename)
+    if not check["valid"]:
+        logger.error(f"Bundled model {model_filename} is invalid ({check['error']})")
+        return None
+    logger.info(f"Using bundled model: {model_filename} (bundle {_bundle.version}, verified by {check['verified_by']})")
+    return member_path(_bundle, model_filename)
+
+
+def _from_local(model_filename: str) -> Optional[Path]:
+    """Path of a model file in the weights directory, if it is there and valid"""
     model_path = ML_MODELS_DIR / model_filename
     
     # Check if model already exists and is valid
-    if model_path.exists():
-        file_size = model_path.stat().st_size
-        if file_size >= MIN_MODEL_SIZE:
-            logger.info(f"Using cached model: {model_filename} ({file_size / (1024*1024):.1f} MB)")
-            return model_path
-        else:
-            logger.warning(f"Cached model too small ({file_size} bytes), re-downloading...")
-            model_path.unlink()  # Delete corrupted/incomplete file
+    if not model_path.exists():
+        return None
+    check = _verify(model_path)
+    if check["valid"]:
+        logger.info(f"Using cached model: {model_filename} "
+                    f"({model_path.stat().st_size / (1024*1024):.1f} MB, verified by {check['verified_by']})")
+        return model_path
     
-    # Model doesn't exist or is invalid - download it
-    return _download_model(model_filename)
+    logger.warning(f"Cached model {model_filename} is invalid ({check['error']}), removing it...")
+    model_path.unlink()  # Delete corrupted/incomplete file
+    _sidecar_path(model_path).unlink(missing_ok=True)
+    return None
+
+
+def download_models(model_filenames: Optional[Iterable[str]] = None) -> Dict[str, Optional[Path]]:
+    """
+    Resolve several model files at once, downloading the missing ones in parallel.
+    
+    Args:
+        model_filenames: Model files to resolve (None = all)
+    
+    Returns:
+        Local path per model file, None where the download failed
+    """
+    filenames = list(model_filenames or MODEL_URLS)
+    with ThreadPoolExecutor(max_workers=min(_download_workers, max(1, len(filenames))),
+                            thread_name_prefix="download") as pool:
+        return dict(zip(filenames, pool.map(get_model_path, filenames)))
 
 
 def _download_model(model_filename: str, max_retries: int = 3) -> Optional[Path]:
     """
-    Download a model from Hugging Face with retry logic.
+    Download a model with retry logic (the caller holds the model's lock).
+    
+    A failed attempt keeps its partial .tmp file, and the next attempt (or the
+    next process) resumes from it with an HTTP Range request. The file is hashed
+    while it streams in and must match the manifest digest, if pinned.
     
     Args:
         model_filename: Name of the model file
@@ -78,145 +378,309 @@ def _download_model(model_filename: str, max_retries: int = 3) -> Optional[Path]
     Returns:
         Path to the downloaded model, or None if all attempts fail
     """
-    url = MODEL_URLS[model_filename]
+    url = model_url(model_filename)
     model_path = ML_MODELS_DIR / model_filename
     temp_path = ML_MODELS_DIR / f"{model_filename}.tmp"
+    expected = _expected(model_filename)
+    
+    logger.info(f"Downloading model: {model_filename}")
+    logger.info(f"Source: {url}")
+    logger.info(f"Target: {model_path}")
     
-    # Use thread lock to prevent concurrent downloads of the same model
-    with _download_lock:
-        # Double-check if another thread already downloaded it
-        if model_path.exists() and model_path.stat().st_size >= MIN_MODEL_SIZE:
-            logger.info(f"Model already downloaded by another process: {model_filename}")
+    for attempt in range(1, max_retries + 1):
+        try:
+            digest = _fetch(url, temp_path)
+            
+            # Validate download; a complete but wrong file cannot be resumed
+            file_size = temp_path.stat().st_size
+            if file_size < MIN_MODEL_SIZE:
+                temp_path.unlink()
+                raise RuntimeError(f"Downloaded file too small: {file_size} bytes (expected > {MIN_MODEL_SIZE})")
+            if expected.get("sha256") and digest != expected["sha256"]:
+                temp_path.unlink()
+                raise RuntimeError(f"SHA-256 mismatch: got {digest}, manifest has {expected['sha256']}")
+            
+            # Move to final location (keeps the mtime the sidecar records)
+            temp_path.replace(model_path)
+            _write_sidecar(model_path, digest)
+            
+            logger.info(f"Successfully downloaded: {model_filename} ({file_size / (1024*1024):.1f} MB, "
+                        f"sha256 {digest[:12]})")
             return model_path
+            
+        except Exception as e:
+            logger.error(f"Download attempt {attempt}/{max_retries} failed: {str(e)}")
+            if temp_path.exists():
+                logger.info(f"Keeping {temp_path.stat().st_size / (1024*1024):.1f} MB to resume from")
+            
+            # Retry with exponential backoff
+            if attempt < max_retries:
+                wait_time = 2 ** attempt  # 2, 4, 8 seconds
+                logger.info(f"Retrying in {wait_time} seconds...")
+                time.sleep(wait_time)
+            else:
+                logger.error(f"Failed to download {model_filename} after {max_retries} attempts")
+                return None
+    
+    return None
+
+
+def _fetch(url: str, temp_path: Path) -> str:
+    """
+    Download url into temp_path, resuming after the bytes already in it.
+    
+    Returns:
+        SHA-256 of the complete file
+    
+    Raises:
+        Exception: Network errors, or a connection closed before the end
+                   (the bytes received so far stay in temp_path)
+    """
+    offset = temp_path.stat().st_size if temp_path.exists() else 0
+    # Identity encoding: Range offsets must count bytes of the file itself
+    headers = {"Accept-Encoding": "identity"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        logger.info(f"Resuming from {offset / (1024*1024):.1f} MB")
+    
+    try:
+        # Try using requests library first (more robust)
+        import requests
+        with requests.get(url, headers=headers, stream=True, timeout=60) as response:
+            if response.status_code != 416:
+                response.raise_for_status()
+            return _write_response(
+                lambda size: response.raw.read(size, decode_content=True), temp_path, offset,
+                response.status_code, response.headers
+            )
+    
+    except ImportError:
+        # Fallback to urllib if requests is not available
+        import urllib.error
+        import urllib.request
         
-        logger.info(f"Downloading model: {model_filename}")
-        logger.info(f"Source: {url}")
-        logger.info(f"Target: {model_path}")
-        
-        for attempt in range(1, max_retries + 1):
-            try:
-                # Try using requests library first (more robust)
-                try:
-                    import requests
-                    response = requests.get(url, stream=True, timeout=60)
-                    response.raise_for_status()
-                    
-                    total_size = int(response.headers.get('content-length', 0))
-                    downloaded = 0
-                    
-                    with open(temp_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                                downloaded += len(chunk)
-                                
-                                # Log progress every 5MB
-                                if downloaded % (5 * 1024 * 1024) < 8192:
-                                    if total_size > 0:
-                                        percent = (downloaded / total_size) * 100
-                                        logger.debug(f"Progress: {downloaded / (1024*1024):.1f} MB / {total_size / (1024*1024):.1f} MB ({percent:.1f}%)")
-                                    else:
-                                        logger.debug(f"Downloaded: {downloaded / (1024*1024):.1f} MB")
-                
-                except ImportError:
-                    # Fallback to urllib if requests is not available
-                    print("   Using urllib (requests not available)")
-                    import urllib.request
-                    
-                    with urllib.request.urlopen(url, timeout=60) as response:
-                        total_size = int(response.headers.get('Content-Length', 0))
-                        downloaded = 0
-                        
-                        with open(temp_path, 'wb') as f:
-                            while True:
-                                chunk = response.read(8192)
-                                if not chunk:
-                                    break
-                                f.write(chunk)
-                                downloaded += len(chunk)
-                                
-                                # Log progress every 5MB
-                                if downloaded % (5 * 1024 * 1024) < 8192:
-                                    if total_size > 0:
-                                        percent = (downloaded / total_size) * 100
-                                        print(f"   Progress: {downloaded / (1024*1024):.1f} MB / {total_size / (1024*1024):.1f} MB ({percent:.1f}%)")
-                                    else:
-                                        print(f"   Downloaded: {downloaded / (1024*1024):.1f} MB")
-                
-                # Validate download
-                if not temp_path.exists():
-                    raise RuntimeError("Download completed but file not found")
-                
-                file_size = temp_path.stat().st_size
-                if file_size < MIN_MODEL_SIZE:
-                    raise RuntimeError(f"Downloaded file too small: {file_size} bytes (expected > {MIN_MODEL_SIZE})")
-                
-                # Move to final location
-                temp_path.rename(model_path)
-                
-                logger.info(f"Successfully downloaded: {model_filename} ({file_size / (1024*1024):.1f} MB)")
-                return model_path
-                
-            except Exception as e:
-                logger.error(f"Download attempt {attempt}/{max_retries} failed: {str(e)}")
-                logger.exception("Full traceback:")
-                
-                # Clean up temp file
-                if temp_path.exists():
-                    temp_path.unlink()
-                
-                # Retry with exponential backoff
-                if attempt < max_retries:
-                    wait_time = 2 ** attempt  # 2, 4, 8 seconds
-                    logger.info(f"Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=60) as response:
+                return _write_response(response.read, temp_path, offset, response.status, response.headers)
+        except urllib.error.HTTPError as e:
+            if e.code != 416:
+                raise
+            return _write_response(e.read, temp_path, offset, e.code, e.headers)
+
+
+def _write_response(read: Callable[[int], bytes], temp_path: Path, offset: int, status: int, headers) -> str:
+    """
+    Stream a (possibly partial) response into temp_path with adaptive read sizes,
+    hashing the file as it is written.
+    
+    Args:
+        read: Reads up to n bytes of the body
+        offset: Bytes already in temp_path (requested with Range)
+        status: HTTP status (206 = resumed, 200 = whole file, 416 = nothing left)
+        headers: Response headers
+    
+    Returns:
+        SHA-256 of the complete file
+    """
+    total = _content_range_total(headers.get('Content-Range'))
+    if status == 416:
+        # Nothing after offset: the partial file is complete, unless it is longer than the file
+        if total is not None and total == offset:
+            return file_digest(temp_path)
+        temp_path.unlink()
+        raise RuntimeError("Partial download does not match the remote file, restarting")
+    
+    digest = hashlib.sha256()
+    if status == 206:
+        if not headers.get('Content-Range', '').startswith(f"bytes {offset}-"):
+            # Some other part of the file: appending it would corrupt the download
+            temp_path.unlink(missing_ok=True)
+            raise RuntimeError(f"Server resumed at {headers.get('Content-Range')!r} instead of "
+                               f"byte {offset}, restarting")
+        mode = 'ab'
+        # The resumed file's digest starts with the bytes already on disk
+        with open(temp_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    elif status == 200:
+        # The whole file (first request, or the server ignored the Range header): start over
+        offset, mode = 0, 'wb'
+        total = None
+    else:
+        raise RuntimeError(f"Unexpected HTTP status {status} for a model download")
+    
+    length = int(headers.get('Content-Length') or 0)
+    if total is None:
+        total = offset + length if length else 0
+    
+    downloaded = offset
+    chunk_size = MIN_CHUNK_SIZE
+    with open(temp_path, mode) as f:
+        while True:
+            read_start = time.perf_counter()
+            chunk = read(chunk_size)
+            if not chunk:
+                break
+            f.write(chunk)
+            digest.update(chunk)
+            downloaded += len(chunk)
+            
+            elapsed = time.perf_counter() - read_start
+            if elapsed < CHUNK_TARGET_SECONDS / 2:
+                chunk_size = min(MAX_CHUNK_SIZE, chunk_size * 2)
+            elif elapsed > CHUNK_TARGET_SECONDS * 2:
+                chunk_size = max(MIN_CHUNK_SIZE, chunk_size // 2)
+            
+            # Log progress every 5MB
+            if downloaded // PROGRESS_STEP != (downloaded - len(chunk)) // PROGRESS_STEP:
+                if total > 0:
+                    percent = (downloaded / total) * 100
+                    logger.info(f"Progress: {downloaded / (1024*1024):.1f} MB / {total / (1024*1024):.1f} MB ({percent:.1f}%)")
                 else:
-                    logger.error(f"Failed to download {model_filename} after {max_retries} attempts")
-                    return None
-        
+                    logger.info(f"Downloaded: {downloaded / (1024*1024):.1f} MB")
+    
+    if total and downloaded < total:
+        raise RuntimeError(f"Connection closed at {downloaded} of {total} bytes")
+    return digest.hexdigest()
+
+
+def _content_range_total(content_range: Optional[str]) -> Optional[int]:
+    """Full size from a Content-Range header ("bytes 0-99/1234" or "bytes */1234")"""
+    if not content_range or '/' not in content_range:
         return None
+    total = content_range.rsplit('/', 1)[1].strip()
+    return int(total) if total.isdigit() else None
 
 
-def verify_all_models() -> dict:
+def verify_all_models(rehash: bool = False) -> dict:
     """
-    Check status of all models (for debugging/monitoring).
+    Check status of all models (for debugging/monitoring), verifying the files in parallel.
+    
+    Args:
+        rehash: Hash every file even if its sidecar record is current
     
     Returns:
         Dictionary with model status information
     """
-    status = {}
-    
-    for model_filename in MODEL_URLS.keys():
-        model_path = ML_MODELS_DIR / model_filename
+    def check(model_filename: str) -> Dict:
+        expected = load_manifest().get(model_filename) or {}
         
-        if model_path.exists():
-            file_size = model_path.stat().st_size
-            status[model_filename] = {
-                'exists': True,
-                'size_mb': round(file_size / (1024*1024), 2),
-                'valid': file_size >= MIN_MODEL_SIZE
-            }
-        else:
-            status[model_filename] = {
-                'exists': False,
-                'size_mb': 0,
-                'valid': False
+        with _model_lock(model_filename):
+            # The copy get_model_path would use: the bundle's if it holds one, else the local file
+            if SOURCE_BUNDLE in _sources and _bundle is not None and model_filename in _bundle:
+                source, model_path = SOURCE_BUNDLE, member_path(_bundle, model_filename)
+                result = _verify_bundled(_bundle, model_filename, rehash=rehash)
+            else:
+                source, model_path = SOURCE_LOCAL, ML_MODELS_DIR / model_filename
+                if not model_path.exists():
+                    _resolved.pop(model_filename, None)
+                    return {
+                        'exists': False,
+                        'size_mb': 0,
+                        'valid': False
+                    }
+                result = _verify(model_path, rehash=rehash)
+            if result['valid']:
+                _resolved[model_filename] = model_path
+            else:
+                _resolved.pop(model_filename, None)
+        
+        return {
+            'exists': True,
+            'source': source,
+            'size_mb': round(model_path.stat().st_size / (1024*1024), 2),
+            'valid': result['valid'],
+            'sha256': result['sha256'],
+            'pinned': bool(expected.get('sha256')),
+            'verified_by': result['verified_by'],
+            **({'error': result['error']} if result['error'] else {})
+        }
+    
+    filenames = list(MODEL_URLS)
+    with ThreadPoolExecutor(max_workers=len(filenames), thread_name_prefix="verify") as pool:
+        return dict(zip(filenames, pool.map(check, filenames)))
+
+
+def write_manifest() -> Dict[str, Dict]:
+    """
+    Pin the size and SHA-256 of every valid local model file in model_manifest.json
+    (files not present locally keep their previous entry).
+    
+    Returns:
+        The written manifest
+    """
+    global _manifest
+    manifest = dict(load_manifest())
+    for model_filename, info in verify_all_models(rehash=True).items():
+        if info['valid']:
+            manifest[model_filename] = {
+                'size': _resolved[model_filename].stat().st_size,
+                'sha256': info['sha256']
             }
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2) + "\n")
+    _manifest = manifest
+    return manifest
+
+
+def build_bundle(output: Path, version: Optional[str] = None) -> Dict:
+    """
+    Pack every model file, plus the ONNX / INT8 variants present next to it,
+    into one bundle for offline deployments.
+    
+    Args:
+        output: Bundle file to write
+        version: Version label (default: UTC timestamp)
+    
+    Returns:
+        The bundle index
+    """
+    from .backends import int8_path_for, onnx_path_for
+    
+    paths = download_models()
+    missing = [model_filename for model_filename, path in paths.items() if path is None]
+    if missing:
+        raise RuntimeError(f"Cannot bundle, models unavailable: {', '.join(missing)}")
     
-    return status
+    files = []
+    for path in paths.values():
+        files.append(path)
+        files.extend(variant for variant in (onnx_path_for(path), int8_path_for(path)) if variant.exists())
+    return write_bundle(output, files, version)
 
 
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Check, pin and bundle the view model weights")
+    parser.add_argument("--rehash", action="store_true", help="Hash every file even if its sidecar record is current")
+    parser.add_argument("--write-manifest", action="store_true", help="Pin the digests of the valid local files")
+    parser.add_argument("--bundle", type=Path, metavar="OUTPUT", help="Pack all models into an offline bundle file")
+    parser.add_argument("--bundle-version", help="Version label of the bundle (default: UTC timestamp)")
+    args = parser.parse_args(argv)
+    
+    if args.write_manifest:
+        for model_name, entry in write_manifest().items():
+            print(f"  {model_name}: {entry['sha256'] or 'not pinned'}")
+        return
+    
+    if args.bundle:
+        index = build_bundle(args.bundle, args.bundle_version)
+        print(f"✓ Bundle {args.bundle} (version {index['version']}):")
+        for name, member in index['members'].items():
+            print(f"  {name}: {member['size'] / (1024*1024):.1f} MB, sha256 {member['sha256']}")
+        return
+    
     # Test the downloader
     print("=" * 60)
     print("Model Downloader Test")
     print("=" * 60)
     
     print("\nChecking model status...")
-    status = verify_all_models()
+    status = verify_all_models(rehash=args.rehash)
     for model_name, info in status.items():
         if info['exists']:
-            print(f"  ✓ {model_name}: {info['size_mb']} MB")
+            state = "✓" if info['valid'] else "✗"
+            print(f"  {state} {model_name} ({info['source']}): {info['size_mb']} MB, sha256 {info['sha256']} "
+                  f"({'pinned' if info['pinned'] else 'not pinned'}, {info['verified_by']})"
+                  + (f" - {info['error']}" if info.get('error') else ""))
         else:
             print(f"  ✗ {model_name}: Not downloaded")
     
@@ -227,3 +691,8 @@ if __name__ == "__main__":
         print(f"\n✓ Test successful! Model at: {model_path}")
     else:
         print("\n❌ Test failed!")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,285 @@
+"""
+Model Registry
+Keeps loaded view models resident in RAM with memory-budgeted LRU eviction
+"""
+import gc
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+from .lazy_imports import load
+from .model_bundle import local_weights
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# A loaded YOLOv8 pose model takes roughly 3x its checkpoint size in RAM
+# (fp16 checkpoint expanded to fp32 weights, fused layers and buffers)
+MODEL_MEMORY_FACTOR = 3.0
+
+# RAM kept free for the API process, images and inference activations
+# when the budget is derived from the container memory limit.
+# On a 512MB instance this leaves no room for resident models, so every
+# model is loaded, used once and unloaded again (sequential low-RAM mode).
+DEFAULT_RESERVED_MB = 448
+
+# Sentinel meaning "derive the budget from the available memory"
+AUTO_BUDGET = -1
+
+
+def detect_memory_limit_bytes() -> Optional[int]:
+    """
+    Detect the memory available to this process.
+    Prefers the cgroup limit (containers on Render/Docker), falls back to physical RAM.
+
+    Returns:
+        Memory limit in bytes, or None if it cannot be determined
+    """
+    cgroup_files = [
+        "/sys/fs/cgroup/memory.max",                      # cgroup v2
+        "/sys/fs/cgroup/memory/memory.limit_in_bytes",    # cgroup v1
+    ]
+    for cgroup_file in cgroup_files:
+        try:
+            with open(cgroup_file) as f:
+                value = f.read().strip()
+            if value.isdigit() and int(value) < (1 << 60):
+                return int(value)
+        except OSError:
+            continue
+
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def estimate_model_bytes(model_path: Path) -> int:
+    """Estimate resident RAM of a loaded model from its checkpoint size"""
+    try:
+        return int(model_path.stat().st_size * MODEL_MEMORY_FACTOR)
+    except OSError:
+        return 0
+
+
+def _load_yolo(model_path: Path) -> Any:
+    """Default loader: build an ultralytics YOLO model from a .pt checkpoint"""
+    with local_weights(model_path) as weights:
+        return load("ultralytics").YOLO(str(weights))
+
+
+class _Entry:
+    """A loaded model plus its bookkeeping"""
+
+    __slots__ = ("model", "size_bytes", "in_use", "resident", "loaded_at", "last_used")
+
+    def __init__(self, model: Any, size_bytes: int, resident: bool):
+        self.model = model
+        self.size_bytes = size_bytes
+        self.in_use = 0
+        self.resident = resident
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+
+
+class ModelRegistry:
+    """
+    Shared registry of loaded models.
+
+    Models are loaded on first use and kept resident while they fit in the
+    memory budget. When a new model would exceed the budget, the least
+    recently used idle models are evicted. Models larger than the whole budget
+    are loaded for a single use and released immediately afterwards.
+    """
+
+    def __init__(self, budget_mb: int = AUTO_BUDGET, reserved_mb: int = DEFAULT_RESERVED_MB):
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._load_seconds = 0.0
+        self.budget_bytes = 0
+        self.configure(budget_mb, reserved_mb)
+
+    def configure(self, budget_mb: int = AUTO_BUDGET, reserved_mb: int = DEFAULT_RESERVED_MB):
+        """
+        Set the memory budget for resident models.
+
+        Args:
+            budget_mb: Budget in MB; AUTO_BUDGET (-1) derives it from the memory
+                       limit minus reserved_mb; 0 keeps no model resident
+            reserved_mb: RAM left for everything else when auto-detecting
+        """
+        if budget_mb is None or budget_mb < 0:
+            limit = detect_memory_limit_bytes()
+            budget_bytes = max(0, limit - reserved_mb * 1024 * 1024) if limit else 0
+        else:
+            budget_bytes = budget_mb * 1024 * 1024
+
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            evicted = self._enforce_budget()
+        self._release(evicted)
+        logger.info(f"Model registry budget: {budget_bytes / (1024*1024):.0f} MB")
+
+    @contextmanager
+    def use(self, model_path: Path, loader: Optional[Callable[[Path], Any]] = None,
+            key: Optional[str] = None) -> Iterator[Any]:
+        """
+        Borrow a loaded model, loading it on a miss.
+
+        The model is pinned while the context is active, so it is never evicted
+        in the middle of an inference.
+
+        Args:
+            model_path: Local path to the model weights
+            loader: Callable building the model from its path (defaults to YOLO)
+            key: Registry key (defaults to the weights filename)
+
+        Yields:
+            The loaded model
+        """
+        key = key or model_path.name
+        entry = self._acquire(key)
+
+        if entry is None:
+            with self._load_lock(key):
+                entry = self._acquire(key, count=False)
+                if entry is None:
+                    entry = self._load(key, model_path, loader or _load_yolo)
+
+        try:
+            yield entry.model
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.time()
+                evicted = self._enforce_budget()
+                if not entry.resident and entry.in_use == 0:
+                    evicted.append((key, entry))
+            self._release(evicted)
+
+    def evict(self, key: str) -> bool:
+        """Evict an idle model by registry key. Returns True if it was evicted."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.in_use > 0:
+                return False
+            del self._entries[key]
+            self._evictions += 1
+        self._release([(key, entry)])
+        return True
+
+    def clear(self):
+        """Evict every idle model"""
+        with self._lock:
+            idle = [(k, e) for k, e in self._entries.items() if e.in_use == 0]
+            for key, _ in idle:
+                del self._entries[key]
+            self._evictions += len(idle)
+        self._release(idle)
+
+    def stats(self) -> Dict:
+        """Registry statistics for monitoring"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "budget_mb": round(self.budget_bytes / (1024*1024), 1),
+                "used_mb": round(self._used_bytes() / (1024*1024), 1),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "total_load_seconds": round(self._load_seconds, 2),
+                "resident": [
+                    {
+                        "model": key,
+                        "size_mb": round(e.size_bytes / (1024*1024), 1),
+                        "in_use": e.in_use,
+                        "idle_seconds": round(time.time() - e.last_used, 1)
+                    }
+                    for key, e in self._entries.items()
+                ]
+            }
+
+    def _acquire(self, key: str, count: bool = True) -> Optional[_Entry]:
+        """Pin a resident entry, recording a hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.in_use += 1
+                self._entries.move_to_end(key)
+                if count:
+                    self._hits += 1
+            elif count:
+                self._misses += 1
+            return entry
+
+    def _load(self, key: str, model_path: Path, loader: Callable[[Path], Any]) -> _Entry:
+        """Load a model and admit it if it fits in the budget"""
+        logger.info(f"Loading {key} into RAM...")
+        load_start = time.time()
+        model = loader(model_path)
+        load_time = time.time() - load_start
+        logger.info(f"{key} loaded in {load_time:.2f}s")
+
+        # Backends that know their footprint report it (e.g. quantized ONNX models)
+        size_bytes = getattr(model, "memory_bytes", None) or estimate_model_bytes(model_path)
+        with self._lock:
+            self._load_seconds += load_time
+            resident = size_bytes <= self.budget_bytes
+            entry = _Entry(model, size_bytes, resident)
+            entry.in_use = 1
+            evicted = []
+            if resident:
+                evicted = self._make_room(size_bytes)
+                self._entries[key] = entry
+        self._release(evicted)
+
+        if not resident:
+            logger.info(f"{key} exceeds model budget, will unload after use")
+        return entry
+
+    def _load_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(key, threading.Lock())
+
+    def _used_bytes(self) -> int:
+        return sum(e.size_bytes for e in self._entries.values())
+
+    def _make_room(self, size_bytes: int) -> list:
+        """Evict idle LRU entries until size_bytes fits (caller holds the lock)"""
+        evicted = []
+        for key in list(self._entries.keys()):
+            if self._used_bytes() + size_bytes <= self.budget_bytes:
+                break
+            entry = self._entries[key]
+            if entry.in_use == 0:
+                del self._entries[key]
+                self._evictions += 1
+                evicted.append((key, entry))
+        return evicted
+
+    def _enforce_budget(self) -> list:
+        """Evict idle LRU entries while over budget (caller holds the lock)"""
+        return self._make_room(0)
+
+    def _release(self, evicted: list):
+        """Drop evicted models outside the lock and return their memory"""
+        if not evicted:
+            return
+        for key, entry in evicted:
+            logger.info(f"Unloading {key} from RAM...")
+            entry.model = None
+        evicted.clear()
+        gc.collect()
+
+
+# Singleton instance
+model_registry = ModelRegistry()
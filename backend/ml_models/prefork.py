@@ -0,0 +1,177 @@
+"""
+Pre-fork Model Sharing
+Loads the view models in the gunicorn master before it forks its workers,
+so every worker shares the weight pages copy-on-write instead of holding
+its own copy, and measures how much memory each worker really adds.
+"""
+import gc
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from .model_downloader import VIEW_MODELS, download_models
+from .inference import backend_for, use_backend
+from .backends import BACKEND_ULTRALYTICS
+from .lazy_imports import load
+from .scheduler import inference_scheduler
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# smaps_rollup fields reported per process (kB)
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def preload_for_fork(views: Optional[List[str]] = None) -> Dict[str, float]:
+    """
+    Load view models into the resident registry of the master process (blocking).
+
+    Only ultralytics (PyTorch) models are loaded: ONNX Runtime sessions own
+    thread pools that do not survive a fork, so ONNX views load in each worker.
+    Models are fused here, because fusing on the first predict would give
+    every worker private copies of the fused weights.
+
+    Args:
+        views: Views to load (None = all)
+
+    Returns:
+        Load seconds per loaded view
+    """
+    # One torch thread while loading: an OpenMP pool started before fork() is
+    # not usable in the children; workers set their own thread count
+    torch = load("torch")
+    torch.set_num_threads(1)
+
+    views = [view for view in (views or list(VIEW_MODELS)) if view in VIEW_MODELS]
+    paths = download_models(VIEW_MODELS[view] for view in views)
+
+    loaded = {}
+    for view in views:
+        model_filename = VIEW_MODELS[view]
+        if backend_for(model_filename) != BACKEND_ULTRALYTICS:
+            logger.info(f"Pre-fork: {view} view uses {backend_for(model_filename)}, loaded per worker")
+            continue
+        model_path = paths[model_filename]
+        if model_path is None:
+            logger.warning(f"Pre-fork: weights for the {view} view are unavailable")
+            continue
+
+        start = time.time()
+        with use_backend(Path(model_path)) as backend:
+            backend.model.fuse()
+        loaded[view] = round(time.time() - start, 2)
+        logger.info(f"Pre-fork: {view} view loaded in {loaded[view]:.1f}s")
+
+    freeze_heap()
+    return loaded
+
+
+def freeze_heap():
+    """
+    Move every live object to the permanent GC generation.
+
+    The cyclic garbage collector writes to the header of each object it
+    visits, which would copy the shared pages into every worker; frozen
+    objects are never visited.
+    """
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Pre-fork: {gc.get_freeze_count()} objects frozen before fork")
+
+
+def after_fork(slot: int, workers: int, pin_cores: bool = False):
+    """
+    Per-worker setup right after fork: the worker's share of the cores.
+
+    Args:
+        slot: Index of this worker (0 .. workers - 1)
+        workers: Number of workers
+        pin_cores: Pin the worker to its own cores instead of only limiting threads
+    """
+    if pin_cores and inference_scheduler.pin_process(slot, workers):
+        cores = len(inference_scheduler.pinned_cores)
+    else:
+        cores = max(1, inference_scheduler.cores // max(1, workers))
+    inference_scheduler.configure(
+        inference_scheduler.policy, inference_scheduler.fixed_threads,
+        inference_scheduler.max_jobs, cores=cores
+    )
+
+
+def process_memory(pid: int) -> Optional[Dict[str, float]]:
+    """
+    Memory of one process in MB from /proc/<pid>/smaps_rollup.
+
+    USS (Private_Clean + Private_Dirty) is what the process adds on its own;
+    shared weight pages appear in Shared_* and are split across processes in Pss.
+
+    Returns:
+        MB per field plus "Uss", or None if unavailable (not Linux, process gone)
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    values = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(":") in SMAPS_FIELDS:
+            values[parts[0].rstrip(":")] = round(int(parts[1]) / 1024, 1)
+    values["Uss"] = round(values.get("Private_Clean", 0) + values.get("Private_Dirty", 0), 1)
+    return values
+
+
+def _children(pid: int) -> List[int]:
+    """Child process ids of a process (Linux)"""
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def _is_gunicorn(pid: int) -> bool:
+    """Whether a process is a gunicorn master"""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            argv = f.read().split(b"\0")[:2]
+    except OSError:
+        return False
+    # "gunicorn ..." or "python .../gunicorn ..."
+    return any(os.path.basename(arg).startswith(b"gunicorn") for arg in argv)
+
+
+def memory_report() -> Dict:
+    """
+    Memory of the serving processes: this process and, under gunicorn, the
+    master and all sibling workers.
+
+    Returns:
+        Per-process smaps figures and totals; total_pss_mb is the real
+        footprint of the whole server, each worker's Uss what it adds on its own
+    """
+    pid = os.getpid()
+    master = os.getppid() if _is_gunicorn(os.getppid()) else None
+    workers = _children(master) if master else [pid]
+    processes = {str(p): process_memory(p) for p in workers}
+    processes = {p: m for p, m in processes.items() if m is not None}
+    master_memory = process_memory(master) if master else None
+
+    return {
+        "pid": pid,
+        "master_pid": master,
+        "master": master_memory,
+        "workers": processes,
+        "worker_count": len(processes),
+        "total_pss_mb": round(sum(m.get("Pss", 0) for m in processes.values())
+                              + (master_memory or {}).get("Pss", 0), 1),
+        "worker_uss_mb": round(sum(m["Uss"] for m in processes.values()) / len(processes), 1)
+                         if processes else 0.0,
+        "frozen_objects": gc.get_freeze_count()
+    }
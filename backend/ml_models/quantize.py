@@ -0,0 +1,229 @@
+"""
+INT8 Quantization Tooling
+Produces INT8 post-training quantized ONNX variants of the view models and
+compares them against the FP32 models (keypoint drift, trait score agreement)
+
+Usage:
+    python -m ml_models.quantize --calibration-dir samples/ [--views rear,top] [--report report.json]
+"""
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from .backends import BACKEND_ONNX_INT8, OnnxBackend, export_onnx, int8_path_for, letterbox
+from .model_bundle import BundledPath, local_weights
+from .model_downloader import VIEW_MODELS, get_model_path
+from .view_analyzer import get_analyzer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+# Default acceptance limits for the comparison report
+MAX_DRIFT_PX = 5.0
+MIN_SCORE_AGREEMENT = 0.9
+
+
+def list_images(directory: Path) -> List[Path]:
+    """Sample images in a calibration directory"""
+    return sorted(p for p in directory.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+class LetterboxCalibrationReader:
+    """Feeds letterboxed calibration images to the ONNX Runtime quantizer"""
+
+    def __init__(self, image_paths: List[Path], input_name: str, imgsz: int = 640):
+        self.image_paths = image_paths
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self._index = 0
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        import cv2
+
+        while self._index < len(self.image_paths):
+            img = cv2.imread(str(self.image_paths[self._index]))
+            self._index += 1
+            if img is not None:
+                tensor, _, _ = letterbox(img, self.imgsz)
+                return {self.input_name: tensor[None]}
+        return None
+
+    def rewind(self):
+        self._index = 0
+
+
+def quantize_model(model_path: Path, calibration_images: List[Path], imgsz: int = 640) -> Path:
+    """
+    Quantize one model to INT8 using static (calibrated) quantization.
+
+    Weights are quantized per channel to int8 and activations to uint8 in QDQ
+    format, which ONNX Runtime executes with integer kernels on CPU.
+
+    Returns:
+        Path to the <model>.int8.onnx file (int8_path_for); an INT8 member of
+        the model bundle is kept, as only a rebuilt bundle can replace it
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    int8_path = int8_path_for(model_path)
+    if isinstance(int8_path, BundledPath):
+        logger.info(f"{int8_path.name} is in the model bundle, not quantizing it again")
+        return int8_path
+    fp32_path = export_onnx(model_path, imgsz)
+
+    logger.info(f"Quantizing {fp32_path.name} with {len(calibration_images)} calibration images...")
+    start = time.time()
+    # A bundled FP32 model is quantized from a staged copy
+    with local_weights(fp32_path) as fp32_file:
+        input_name = ort.InferenceSession(str(fp32_file), providers=["CPUExecutionProvider"]).get_inputs()[0].name
+        quantize_static(
+            str(fp32_file),
+            str(int8_path),
+            LetterboxCalibrationReader(calibration_images, input_name, imgsz),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            weight_type=QuantType.QInt8,
+            activation_type=QuantType.QUInt8,
+            calibrate_method=CalibrationMethod.MinMax
+        )
+    logger.info(f"Wrote {int8_path.name} in {time.time() - start:.1f}s")
+    return int8_path
+
+
+def compare_view(view: str, model_path: Path, image_paths: List[Path], imgsz: int = 640,
+                 max_drift_px: float = MAX_DRIFT_PX, min_agreement: float = MIN_SCORE_AGREEMENT) -> Dict:
+    """
+    Compare the INT8 model of a view against its FP32 ONNX model.
+
+    Returns:
+        Report with keypoint drift, per-trait score agreement, latency and size
+    """
+    import cv2
+
+    fp32 = OnnxBackend(export_onnx(model_path, imgsz))
+    int8 = OnnxBackend(int8_path_for(model_path), BACKEND_ONNX_INT8)
+    analyzer = get_analyzer(view)
+
+    drifts = []
+    latency = {"fp32": 0.0, "int8": 0.0}
+    agreement: Dict[str, Dict[str, int]] = {}
+    evaluated = 0
+    missed = 0
+
+    for image_path in image_paths:
+        img = cv2.imread(str(image_path))
+        if img is None:
+            continue
+
+        start = time.perf_counter()
+        ref = fp32.predict([img], imgsz)[0]
+        latency["fp32"] += time.perf_counter() - start
+        start = time.perf_counter()
+        cand = int8.predict([img], imgsz)[0]
+        latency["int8"] += time.perf_counter() - start
+
+        if ref is None:
+            continue
+        evaluated += 1
+        if cand is None:
+            missed += 1
+            continue
+        drifts.append(np.linalg.norm(ref.xy - cand.xy, axis=1))
+
+        ref_scores = {t["trait"]: t["score"] for t in analyzer.compute_traits(ref.xy, img.shape)[0]}
+        cand_scores = {t["trait"]: t["score"] for t in analyzer.compute_traits(cand.xy, img.shape)[0]}
+        for trait, score in ref_scores.items():
+            counts = agreement.setdefault(trait, {"exact": 0, "within_one": 0, "total": 0})
+            counts["total"] += 1
+            other = cand_scores.get(trait)
+            if other == score:
+                counts["exact"] += 1
+                counts["within_one"] += 1
+            elif score is not None and other is not None and abs(other - score) <= 1:
+                counts["within_one"] += 1
+
+    all_drift = np.concatenate(drifts) if drifts else np.zeros(0)
+    timed = max(1, len(image_paths))
+    trait_agreement = {
+        trait: {
+            "exact": round(c["exact"] / c["total"], 3),
+            "within_one": round(c["within_one"] / c["total"], 3)
+        }
+        for trait, c in agreement.items() if c["total"]
+    }
+    worst_agreement = min((a["exact"] for a in trait_agreement.values()), default=1.0)
+    max_drift = float(all_drift.max()) if all_drift.size else 0.0
+
+    return {
+        "view": view,
+        "model": model_path.name,
+        "images": evaluated,
+        "missed_detections": missed,
+        "keypoint_drift_px": {
+            "mean": round(float(all_drift.mean()), 3) if all_drift.size else 0.0,
+            "p95": round(float(np.percentile(all_drift, 95)), 3) if all_drift.size else 0.0,
+            "max": round(max_drift, 3)
+        },
+        "trait_score_agreement": trait_agreement,
+        "latency_ms": {k: round(v / timed * 1000, 1) for k, v in latency.items()},
+        "model_size_mb": {
+            "fp32": round(fp32.model_path.stat().st_size / (1024*1024), 1),
+            "int8": round(int8.model_path.stat().st_size / (1024*1024), 1)
+        },
+        "acceptable": missed == 0 and max_drift <= max_drift_px and worst_agreement >= min_agreement
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Quantize view models to INT8 and compare against FP32")
+    parser.add_argument("--calibration-dir", required=True, type=Path, help="Directory of sample images")
+    parser.add_argument("--eval-dir", type=Path, help="Images for the comparison (defaults to calibration images)")
+    parser.add_argument("--views", default=",".join(VIEW_MODELS), help="Comma-separated views to process")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--report", type=Path, help="Write the comparison report as JSON")
+    parser.add_argument("--skip-quantize", action="store_true", help="Only compare existing INT8 models")
+    parser.add_argument("--max-drift", type=float, default=MAX_DRIFT_PX)
+    parser.add_argument("--min-agreement", type=float, default=MIN_SCORE_AGREEMENT)
+    args = parser.parse_args(argv)
+
+    calibration_images = list_images(args.calibration_dir)
+    eval_images = list_images(args.eval_dir) if args.eval_dir else calibration_images
+    if not calibration_images:
+        parser.error(f"No images found in {args.calibration_dir}")
+
+    reports = []
+    for view in [v.strip() for v in args.views.split(",") if v.strip()]:
+        if view not in VIEW_MODELS:
+            print(f"  ✗ Unknown view: {view}")
+            continue
+        model_path = get_model_path(VIEW_MODELS[view])
+        if model_path is None:
+            print(f"  ✗ {view}: model unavailable")
+            continue
+        if not args.skip_quantize:
+            quantize_model(model_path, calibration_images, args.imgsz)
+        report = compare_view(view, model_path, eval_images, args.imgsz, args.max_drift, args.min_agreement)
+        reports.append(report)
+
+        drift = report["keypoint_drift_px"]
+        print(f"\n{view} ({report['model']}): {'✓ acceptable' if report['acceptable'] else '⚠ review'}")
+        print(f"  Keypoint drift: mean {drift['mean']} px, p95 {drift['p95']} px, max {drift['max']} px")
+        print(f"  Latency: {report['latency_ms']['fp32']} ms -> {report['latency_ms']['int8']} ms")
+        print(f"  Size: {report['model_size_mb']['fp32']} MB -> {report['model_size_mb']['int8']} MB")
+        for trait, a in report["trait_score_agreement"].items():
+            print(f"    - {trait}: exact {a['exact']:.0%}, within ±1 {a['within_one']:.0%}")
+
+    if args.report:
+        args.report.write_text(json.dumps(reports, indent=2))
+        print(f"\n✓ Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
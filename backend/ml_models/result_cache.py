@@ -0,0 +1,253 @@
+"""
+Keypoint Result Cache
+Persistent cache of raw view model keypoints keyed by image content, so a
+resubmitted photo skips inference entirely
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from .backends import PoseResult
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / "cache" / "keypoints.sqlite3"
+DEFAULT_MAX_MB = 64
+
+# Evict down to this fraction of the limit so evictions happen in batches
+EVICT_TO_FRACTION = 0.9
+
+
+def image_digest(data: bytes) -> str:
+    """SHA-256 of the raw image bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def model_identity(model_path: Path, backend: str) -> str:
+    """
+    Identity of the model that produced a result.
+
+    The weights file name, size and modification time change whenever the
+    model is replaced, and the backend changes the keypoints (e.g. INT8), so
+    results from a different model version never match.
+    """
+    try:
+        stat = model_path.stat()
+        return f"{model_path.name}:{backend}:{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        return f"{model_path.name}:{backend}"
+
+
+class CachedPose:
+    """A cache hit: the stored pose (None = nothing detected) and image shape"""
+
+    __slots__ = ("pose", "image_shape")
+
+    def __init__(self, pose: Optional[PoseResult], image_shape: Tuple[int, ...]):
+        self.pose = pose
+        self.image_shape = image_shape
+
+
+class KeypointCache:
+    """
+    SQLite-backed cache of pose results.
+
+    Entries are keyed by (image SHA-256, model identity, imgsz) and bounded by
+    total stored size; the least recently used entries are evicted first.
+    The database is opened on first use and shared by all worker threads.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_mb: int = DEFAULT_MAX_MB):
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._saved_seconds = 0.0
+        self.path = DEFAULT_CACHE_PATH
+        self.max_bytes = 0
+        self.configure(path, max_mb)
+
+    def configure(self, path: Optional[Path] = None, max_mb: int = DEFAULT_MAX_MB):
+        """
+        Set the cache location and size limit.
+
+        Args:
+            path: SQLite database file (defaults to ml_models/cache/keypoints.sqlite3)
+            max_mb: Size limit in MB; 0 disables the cache
+        """
+        with self._lock:
+            new_path = Path(path) if path else DEFAULT_CACHE_PATH
+            if self._conn is not None and new_path != self.path:
+                self._conn.close()
+                self._conn = None
+            self.path = new_path
+            self.max_bytes = max(0, max_mb) * 1024 * 1024
+        if self.enabled:
+            logger.info(f"Keypoint cache: {self.path} (max {max_mb} MB)")
+        else:
+            logger.info("Keypoint cache disabled")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, image_hash: str, model_key: str, imgsz: int) -> Optional[CachedPose]:
+        """
+        Look up a stored result.
+
+        Returns:
+            CachedPose on a hit (its pose is None if the model detected nothing),
+            None on a miss
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT xy, conf, box_conf, num_kpts, height, width, infer_seconds FROM keypoints "
+                    "WHERE image_hash = ? AND model_key = ? AND imgsz = ?",
+                    (image_hash, model_key, imgsz)
+                ).fetchone()
+                if row is None:
+                    self._misses += 1
+                    return None
+                conn.execute(
+                    "UPDATE keypoints SET last_used = ? WHERE image_hash = ? AND model_key = ? AND imgsz = ?",
+                    (time.time(), image_hash, model_key, imgsz)
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Keypoint cache lookup failed: {e}")
+                return None
+            self._hits += 1
+            self._saved_seconds += row[6]
+
+        import numpy as np
+
+        xy, conf, box_conf, num_kpts, height, width, _ = row
+        pose = None
+        if xy is not None:
+            pose = PoseResult(
+                np.frombuffer(xy, dtype=np.float32).reshape(num_kpts, 2).copy(),
+                np.frombuffer(conf, dtype=np.float32).copy() if conf is not None else None,
+                box_conf
+            )
+        return CachedPose(pose, (height, width))
+
+    def put(self, image_hash: str, model_key: str, imgsz: int, pose: Optional[PoseResult],
+            image_shape: Tuple[int, ...], infer_seconds: float):
+        """Store the result of one inference (pose None = nothing detected)"""
+        if not self.enabled:
+            return
+        import numpy as np
+
+        xy = conf = None
+        num_kpts = 0
+        if pose is not None:
+            xy = np.ascontiguousarray(pose.xy, dtype=np.float32).tobytes()
+            num_kpts = int(pose.xy.shape[0])
+            if pose.conf is not None:
+                conf = np.ascontiguousarray(pose.conf, dtype=np.float32).tobytes()
+        now = time.time()
+
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO keypoints (image_hash, model_key, imgsz, xy, conf, box_conf, "
+                    "num_kpts, height, width, infer_seconds, size_bytes, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (image_hash, model_key, imgsz, xy, conf, pose.box_conf if pose else None,
+                     num_kpts, int(image_shape[0]), int(image_shape[1]), infer_seconds,
+                     _entry_size(image_hash, model_key, xy, conf), now, now)
+                )
+                self._enforce_limit(conn)
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Keypoint cache store failed: {e}")
+
+    def clear(self):
+        """Remove every cached result"""
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("DELETE FROM keypoints")
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Keypoint cache clear failed: {e}")
+
+    def stats(self) -> Dict:
+        """Cache statistics for monitoring"""
+        with self._lock:
+            entries, size_bytes = 0, 0
+            if self.enabled:
+                try:
+                    entries, size_bytes = self._connect().execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM keypoints"
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"Keypoint cache stats failed: {e}")
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "path": str(self.path),
+                "max_mb": round(self.max_bytes / (1024*1024), 1),
+                "size_mb": round(size_bytes / (1024*1024), 2),
+                "entries": entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "saved_inference_seconds": round(self._saved_seconds, 2)
+            }
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use (caller holds the lock)"""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False)
+            # WAL lets several API worker processes share one cache file
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS keypoints ("
+                "image_hash TEXT NOT NULL, model_key TEXT NOT NULL, imgsz INTEGER NOT NULL, "
+                "xy BLOB, conf BLOB, box_conf REAL, num_kpts INTEGER NOT NULL, "
+                "height INTEGER NOT NULL, width INTEGER NOT NULL, infer_seconds REAL NOT NULL, "
+                "size_bytes INTEGER NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL, "
+                "PRIMARY KEY (image_hash, model_key, imgsz))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_keypoints_last_used ON keypoints (last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _enforce_limit(self, conn: sqlite3.Connection):
+        """Evict least recently used entries while over the size limit (caller holds the lock)"""
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM keypoints").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * EVICT_TO_FRACTION
+        victims = []
+        for rowid, size_bytes in conn.execute("SELECT rowid, size_bytes FROM keypoints ORDER BY last_used"):
+            if total <= target:
+                break
+            victims.append((rowid,))
+            total -= size_bytes
+        conn.executemany("DELETE FROM keypoints WHERE rowid = ?", victims)
+        self._evictions += len(victims)
+
+
+def _entry_size(image_hash: str, model_key: str, xy: Optional[bytes], conf: Optional[bytes]) -> int:
+    """Approximate stored size of an entry (blobs, keys and fixed columns)"""
+    return len(image_hash) + len(model_key) + len(xy or b"") + len(conf or b"") + 64
+
+
+# Singleton instance
+result_cache = KeypointCache()
@@ -0,0 +1,197 @@
+"""
+Inference Thread Scheduler
+Decides the intra-op thread count of every model invocation from the
+number of invocations running at once, so concurrent views and requests
+split the cores instead of oversubscribing them, and optionally pins
+worker processes to disjoint cores
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Thread policies
+POLICY_AUTO = "auto"                # a lone job gets all cores, concurrent jobs split them
+POLICY_LATENCY = "latency"          # every job gets all cores (torch's default behavior)
+POLICY_THROUGHPUT = "throughput"    # one thread per job, for many concurrent jobs
+POLICIES = (POLICY_AUTO, POLICY_LATENCY, POLICY_THROUGHPUT)
+
+
+def available_cores() -> List[int]:
+    """CPU cores this process may run on (its affinity mask where supported)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class InferenceScheduler:
+    """
+    Per-invocation intra-op thread decisions plus throughput bookkeeping.
+
+    torch.set_num_threads() is applied by the invoking thread right before its
+    predict; with torch's OpenMP builds the setting holds for parallel regions
+    started by that thread, so concurrent invocations each run with their own
+    thread count. ONNX Runtime fixes threads per session, so ONNX sessions get
+    the share of one job at the configured maximum concurrency.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.policy = POLICY_AUTO
+        self.fixed_threads = 0
+        self.max_jobs = 1
+        self.cores = len(available_cores())
+        self.pinned_cores: Optional[List[int]] = None
+        self._active = 0
+        self._busy_since: Optional[float] = None
+        self._busy_seconds = 0.0
+        self._images = 0
+        self._invocations = 0
+        # (concurrent jobs, threads) -> [invocations, images, seconds]
+        self._buckets: Dict[Tuple[int, int], List[float]] = {}
+
+    def configure(self, policy: str = POLICY_AUTO, threads: int = 0, max_jobs: int = 1,
+                  cores: Optional[int] = None):
+        """
+        Set the thread policy.
+
+        Args:
+            policy: POLICY_AUTO, POLICY_LATENCY or POLICY_THROUGHPUT
+            threads: Fixed threads per invocation (0 = decided by the policy)
+            max_jobs: Most invocations expected at once (sizes ONNX Runtime sessions)
+            cores: Cores available to this process (default: its affinity mask)
+        """
+        if policy not in POLICIES:
+            logger.warning(f"Unknown thread policy '{policy}', using {POLICY_AUTO}")
+            policy = POLICY_AUTO
+        with self._lock:
+            self.policy = policy
+            self.fixed_threads = max(0, threads)
+            self.max_jobs = max(1, max_jobs)
+            self.cores = max(1, cores or len(available_cores()))
+        logger.info(f"Inference threads: policy {policy}, {self.cores} cores, "
+                    f"{self.fixed_threads or 'policy-decided'} threads per invocation")
+
+    def threads_for(self, concurrent_jobs: int) -> int:
+        """Intra-op threads for an invocation running alongside concurrent_jobs - 1 others"""
+        if self.fixed_threads:
+            return self.fixed_threads
+        if self.policy == POLICY_LATENCY:
+            return self.cores
+        if self.policy == POLICY_THROUGHPUT:
+            return 1
+        return max(1, self.cores // max(1, concurrent_jobs))
+
+    def session_threads(self) -> int:
+        """Intra-op threads for an ONNX Runtime session (fixed for its lifetime)"""
+        return self.threads_for(self.max_jobs)
+
+    @contextmanager
+    def slot(self, images: int = 1) -> Iterator[int]:
+        """
+        Run one model invocation under the scheduler.
+
+        Args:
+            images: Images in the invocation (for throughput)
+
+        Yields:
+            The intra-op thread count applied to this invocation
+        """
+        with self._lock:
+            self._active += 1
+            if self._active == 1:
+                self._busy_since = time.perf_counter()
+            concurrent_jobs = self._active
+            threads = self.threads_for(concurrent_jobs)
+        _apply_threads(threads)
+
+        start = time.perf_counter()
+        try:
+            yield threads
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._active -= 1
+                if self._active == 0 and self._busy_since is not None:
+                    self._busy_seconds += time.perf_counter() - self._busy_since
+                    self._busy_since = None
+                self._invocations += 1
+                self._images += images
+                bucket = self._buckets.setdefault((concurrent_jobs, threads), [0, 0, 0.0])
+                bucket[0] += 1
+                bucket[1] += images
+                bucket[2] += elapsed
+
+    def stats(self) -> Dict:
+        """Policy, decisions and measured throughput for monitoring"""
+        with self._lock:
+            busy = self._busy_seconds
+            if self._busy_since is not None:
+                busy += time.perf_counter() - self._busy_since
+            return {
+                "policy": self.policy,
+                "fixed_threads": self.fixed_threads,
+                "cores": self.cores,
+                "pinned_cores": self.pinned_cores,
+                "max_jobs": self.max_jobs,
+                "onnx_session_threads": self.session_threads(),
+                "active": self._active,
+                "invocations": self._invocations,
+                "images": self._images,
+                # Images per second of wall time with at least one invocation running
+                "images_per_second": round(self._images / busy, 2) if busy else 0.0,
+                "decisions": [
+                    {
+                        "concurrent_jobs": jobs,
+                        "threads": threads,
+                        "invocations": int(count),
+                        "avg_seconds": round(seconds / count, 3),
+                        "images_per_second_per_job": round(images / seconds, 2) if seconds else 0.0
+                    }
+                    for (jobs, threads), (count, images, seconds) in sorted(self._buckets.items())
+                ]
+            }
+
+    def pin_process(self, slot: int, slots: int) -> Optional[List[int]]:
+        """
+        Pin this process to its share of the cores (Linux).
+
+        Call from the main thread before any thread pool starts, so every
+        later thread inherits the mask.
+
+        Args:
+            slot: Index of this process among the pinned processes
+            slots: Number of processes splitting the cores
+
+        Returns:
+            Cores pinned to, or None if pinning is unsupported
+        """
+        if not hasattr(os, "sched_setaffinity"):
+            return None
+        cores = available_cores()
+        share = max(1, len(cores) // max(1, slots))
+        start = (slot % max(1, slots)) * share
+        mine = cores[start:start + share] or cores
+        os.sched_setaffinity(0, mine)
+        with self._lock:
+            self.pinned_cores = mine
+            self.cores = len(mine)
+        logger.info(f"Pinned process {os.getpid()} to cores {mine}")
+        return mine
+
+
+def _apply_threads(threads: int):
+    """Set torch intra-op threads for the calling thread (if torch is in use)"""
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+
+
+# Singleton instance
+inference_scheduler = InferenceScheduler()
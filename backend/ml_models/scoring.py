@@ -0,0 +1,231 @@
+"""
+Trait Scoring Engine
+Scores trait measurements on the 1-9 scale from threshold tables stored as
+JSON (ml_models/scoring_tables), with per breed / animal type overrides.
+Single values are scored by bisection, arrays of archived measurements in
+one np.searchsorted pass.
+"""
+import json
+import logging
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_TABLES_DIR = Path(__file__).parent / "scoring_tables"
+DEFAULT_PROFILE = "default"
+
+# Table kinds
+HIGHER = "higher"   # larger is better: score steps up at each threshold (value >= threshold)
+LOWER = "lower"     # smaller is better: score steps down past each threshold (value > threshold)
+BAND = "band"       # ideal band: nested inclusive [low, high] ranges, innermost first
+
+TRANSFORMS = {"abs": abs}
+
+# Score returned by score_array for measurements that could not be scored
+UNSCORED = 0
+
+
+class ScoringTableError(ValueError):
+    """A scoring table file is malformed"""
+
+
+class TraitTable:
+    """Thresholds of one trait"""
+
+    def __init__(self, trait: str, spec: Dict):
+        self.trait = trait
+        self.kind = spec.get("kind")
+        self.transform = spec.get("transform")
+        if self.transform is not None and self.transform not in TRANSFORMS:
+            raise ScoringTableError(f"{trait}: unknown transform '{self.transform}'")
+
+        if self.kind in (HIGHER, LOWER):
+            self.thresholds = [float(t) for t in spec["thresholds"]]
+            self.scores = [int(s) for s in spec["scores"]]
+            if len(self.scores) != len(self.thresholds) + 1:
+                raise ScoringTableError(f"{trait}: needs one more score than thresholds")
+            if any(a >= b for a, b in zip(self.thresholds, self.thresholds[1:])):
+                raise ScoringTableError(f"{trait}: thresholds must be strictly ascending")
+        elif self.kind == BAND:
+            bands = [(float(lo), float(hi), int(score)) for lo, hi, score in spec["bands"]]
+            for (lo, hi, _), (outer_lo, outer_hi, _) in zip(bands, bands[1:]):
+                if outer_lo > lo or outer_hi < hi:
+                    raise ScoringTableError(f"{trait}: bands must be nested, innermost first")
+            # Lows descend and highs ascend outwards, so both are searchable
+            self.lows_ascending = [lo for lo, _, _ in reversed(bands)]
+            self.highs = [hi for _, hi, _ in bands]
+            self.scores = [score for _, _, score in bands] + [int(spec["default"])]
+        else:
+            raise ScoringTableError(f"{trait}: unknown kind '{self.kind}'")
+
+    def score(self, value: Optional[float]) -> Optional[int]:
+        """Score one measurement (None if it is missing)"""
+        if value is None or value != value:
+            return None
+        if self.transform:
+            value = TRANSFORMS[self.transform](value)
+
+        if self.kind == HIGHER:
+            return self.scores[bisect_right(self.thresholds, value)]
+        if self.kind == LOWER:
+            return self.scores[bisect_left(self.thresholds, value)]
+        # Innermost band containing the value: skip bands whose low is above it
+        # and bands whose high is below it
+        outside_low = len(self.lows_ascending) - bisect_right(self.lows_ascending, value)
+        outside_high = bisect_left(self.highs, value)
+        return self.scores[max(outside_low, outside_high)]
+
+    def score_array(self, values: Sequence[float]):
+        """
+        Score many measurements at once.
+
+        Returns:
+            Integer array of scores (UNSCORED where the measurement is NaN)
+        """
+        import numpy as np
+
+        values = np.asarray(values, dtype=np.float64)
+        if self.transform == "abs":
+            values = np.abs(values)
+        scores = np.asarray(self.scores)
+        missing = np.isnan(values)
+
+        if self.kind == HIGHER:
+            index = np.searchsorted(self.thresholds, values, side="right")
+        elif self.kind == LOWER:
+            index = np.searchsorted(self.thresholds, values, side="left")
+        else:
+            outside_low = len(self.lows_ascending) - np.searchsorted(self.lows_ascending, values, side="right")
+            outside_high = np.searchsorted(self.highs, values, side="left")
+            index = np.maximum(outside_low, outside_high)
+
+        result = scores[np.minimum(index, len(scores) - 1)]
+        result[missing] = UNSCORED
+        return result
+
+
+class ScoringTables:
+    """Trait tables of one scoring profile (after applying what it extends)"""
+
+    def __init__(self, profile: str, tables: Dict[str, TraitTable]):
+        self.profile = profile
+        self.tables = tables
+
+    def score(self, trait: str, value: Optional[float]) -> Optional[int]:
+        """Score a measurement (None for traits without a table, e.g. Angularity)"""
+        table = self.tables.get(trait)
+        return table.score(value) if table else None
+
+    def score_array(self, trait: str, values: Sequence[float]):
+        """Score an array of measurements of one trait (None for traits without a table)"""
+        table = self.tables.get(trait)
+        return table.score_array(values) if table else None
+
+    def score_columns(self, columns: Dict[str, Sequence[float]]) -> Dict:
+        """Score several traits at once: {trait: measurements} -> {trait: scores}"""
+        return {
+            trait: self.score_array(trait, values)
+            for trait, values in columns.items() if trait in self.tables
+        }
+
+
+_tables_dir = DEFAULT_TABLES_DIR
+_cache: Dict[str, ScoringTables] = {}
+_cache_lock = threading.Lock()
+
+
+def configure_scoring(tables_dir: Optional[Path] = None):
+    """
+    Set the directory holding the scoring table files.
+
+    Args:
+        tables_dir: Directory of <profile>.json files (defaults to ml_models/scoring_tables)
+    """
+    global _tables_dir
+    with _cache_lock:
+        _tables_dir = Path(tables_dir) if tables_dir else DEFAULT_TABLES_DIR
+        _cache.clear()
+    logger.info(f"Scoring tables: {_tables_dir} (profiles: {', '.join(available_profiles())})")
+
+
+def available_profiles() -> List[str]:
+    """Profiles with a table file"""
+    return sorted(p.stem for p in _tables_dir.glob("*.json"))
+
+
+def profile_slug(name: str) -> str:
+    """File name form of a breed or animal type ("Red Sindhi" -> "red_sindhi")"""
+    return re.sub(r"[^a-z0-9]+", "_", (name or "").lower()).strip("_")
+
+
+def resolve_profile(animal_type: Optional[str] = None, breed: Optional[str] = None) -> str:
+    """
+    Most specific profile with a table file: the breed, then the animal type, then default.
+
+    Args:
+        animal_type: e.g. "cattle" or "buffalo"
+        breed: e.g. "Murrah"
+    """
+    profiles = set(available_profiles())
+    for candidate in (profile_slug(breed), profile_slug(animal_type)):
+        if candidate and candidate in profiles:
+            return candidate
+    return DEFAULT_PROFILE
+
+
+def get_tables(profile: str = DEFAULT_PROFILE) -> ScoringTables:
+    """Tables of a profile, loaded once and cached"""
+    with _cache_lock:
+        tables = _cache.get(profile)
+        if tables is None:
+            tables = ScoringTables(profile, _load_profile(profile, []))
+            _cache[profile] = tables
+        return tables
+
+
+def reload_tables():
+    """Drop cached tables so edited files are read again"""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _load_profile(profile: str, chain: List[str]) -> Dict[str, TraitTable]:
+    """Load a profile file, applying its traits over the profile it extends"""
+    if profile in chain:
+        raise ScoringTableError(f"Circular 'extends': {' -> '.join(chain + [profile])}")
+    path = _tables_dir / f"{profile}.json"
+    if not path.exists():
+        raise ScoringTableError(f"No scoring table for profile '{profile}' in {_tables_dir}")
+
+    data = json.loads(path.read_text())
+    base = data.get("extends", DEFAULT_PROFILE if profile != DEFAULT_PROFILE else None)
+    tables = _load_profile(base, chain + [profile]) if base else {}
+    for trait, spec in data.get("traits", {}).items():
+        tables[trait] = TraitTable(trait, spec)
+    return tables
+
+
+def score_traits(traits: Iterable[Dict], profile: str = DEFAULT_PROFILE) -> List[Dict]:
+    """
+    Re-score trait dictionaries in place from their measurements.
+
+    Args:
+        traits: Trait dictionaries with "trait" and value_deg/value_px measurements
+        profile: Scoring profile
+
+    Returns:
+        The same trait dictionaries with updated scores
+    """
+    tables = get_tables(profile)
+    traits = list(traits)
+    for trait in traits:
+        value = trait.get("value_deg")
+        if value is None:
+            value = trait.get("value_px")
+        trait["score"] = tables.score(trait["trait"], value)
+    return traits
@@ -3,200 +3,76 @@ Top View Model Integration
 Processes top view images for chest width analysis
 """
 import json
-import os
-import math
 import logging
-import gc
-import cv2
-import numpy as np
-from pathlib import Path
 from typing import Dict, List, Optional, Tuple
-from .model_downloader import get_model_path
+import numpy as np
+from .scoring import DEFAULT_PROFILE
+from .view_analyzer import DISTANCE, TraitSpec, ViewAnalyzer, format_traits
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-ML_MODELS_DIR = Path(__file__).parent
-
 TOP_KP_NAMES = [
     "shoulder_1", "pt_2", "pt_3", "abdomen_width_1",
     "shoulder_2", "pt_6", "spine_bw_hips", "abdomen_width_2"
 ]
 
 
+TOP_VIEW = ViewAnalyzer(
+    view="top",
+    label="Top view",
+    model_filename="top_view_model.pt",
+    keypoint_names=TOP_KP_NAMES,
+    # Scores come from the trait's table in ml_models/scoring_tables
+    traits=[
+        TraitSpec("Chest Width", DISTANCE, ["shoulder_1", "shoulder_2"]),
+    ]
+)
 
 
+def compute_top_traits(xy: np.ndarray, image_shape: Tuple[int, ...],
+                       profile: str = DEFAULT_PROFILE) -> Tuple[List[Dict], Dict]:
+    """
+    Compute top view traits from model keypoints
 
+    Args:
+        xy: Keypoint coordinates [num_points, 2] in TOP_KP_NAMES order
+        image_shape: Shape of the source image (height, width, ...)
+        profile: Scoring profile (breed / animal type tables)
 
-def dist_pixels(a: Tuple[float, float], b: Tuple[float, float]) -> float:
-    """Calculate Euclidean distance between two points"""
-    return math.hypot(a[0] - b[0], a[1] - b[1])
+    Returns:
+        (list of trait dictionaries, keypoint map by name)
+    """
+    return TOP_VIEW.compute_traits(xy, image_shape, profile)
 
 
-def process_top_view(image_path: str) -> Optional[Dict]:
+def process_top_view(image_path: str, profile: str = DEFAULT_PROFILE) -> Optional[Dict]:
     """
-    Process a top view image using the top view model.
-    Loads model, runs inference, then explicitly unloads to free RAM.
-    
+    Process a top view image using the top_view_model.pt model.
+    Runs inference on the resident model, batched with concurrent requests when enabled.
+
     Args:
         image_path: Path to the top view image
-        
+        profile: Scoring profile (breed / animal type tables)
+
     Returns:
-        Dictionary with traits, scores, and measurements
+        Dictionary with traits, keypoints and meta
         Returns None if processing fails
     """
-    logger.info(f"Processing top view: {image_path}")
-    
-    if not os.path.exists(image_path):
-        logger.error(f"Top view image not found: {image_path}")
-        return None
-    
-    # Get model path (downloads if needed)
-    model_path = get_model_path("top_view_model.pt")
-    if model_path is None:
-        logger.error("Failed to get top view model path")
-        return None
-    
-    model = None
-    try:
-        # LOAD: Load model into RAM
-        logger.info("Loading top_view_model.pt into RAM...")
-        from ultralytics import YOLO
-        import time
-        
-        load_start = time.time()
-        model = YOLO(str(model_path))
-        load_time = time.time() - load_start
-        logger.info(f"Top view model loaded in {load_time:.2f}s")
-        
-        # Load image
-        img = cv2.imread(image_path)
-        if img is None:
-            logger.error(f"Failed to load image: {image_path}")
-            return None
-        
-        # INFER: Run inference
-        logger.info("Running top view inference...")
-        infer_start = time.time()
-        results = model.predict(img, imgsz=640, verbose=False)
-        infer_time = time.time() - infer_start
-        logger.info(f"Top view inference completed in {infer_time:.2f}s")
-        
-        if not results or len(results) == 0:
-            print("No results from top view model")
-            return None
-        
-        r = results[0]
-        if not hasattr(r, 'keypoints') or r.keypoints is None:
-            print("No keypoints detected in top view")
-            return None
-        
-        # Extract keypoints
-        xy = r.keypoints.xy[0].cpu().numpy()  # [num_points, 2]
-        kp_map = {}
-        for i, name in enumerate(TOP_KP_NAMES):
-            if i < xy.shape[0]:
-                kp_map[name] = (float(xy[i, 0]), float(xy[i, 1]))
-            else:
-                kp_map[name] = None
-        
-        # Calculate traits
-        traits = []
-        
-        # Chest Width (shoulder_1 to shoulder_2)
-        chest_width_px = None
-        if kp_map.get("shoulder_1") and kp_map.get("shoulder_2"):
-            chest_width_px = dist_pixels(kp_map["shoulder_1"], kp_map["shoulder_2"])
-            traits.append({
-                "trait": "Chest Width",
-                "features": ["shoulder_1", "shoulder_2"],
-                "value_px": round(chest_width_px, 2),
-                "value_cm": None,  # No scale calibration
-                "score": _score_chest_width(chest_width_px)
-            })
-        
-        print(f"✓ Top view model processed successfully")
-        print(f"  Extracted {len(traits)} traits")
-        
-        return {
-            "traits": traits,
-            "meta": {
-                "image_used": image_path,
-                "model": "top_view_model.pt",
-                "keypoints_detected": sum(1 for v in kp_map.values() if v is not None)
-            }
-        }
-        
-    except Exception as e:
-        logger.exception(f"Error processing top view: {str(e)}")
-        return None
-        
-    finally:
-        # UNLOAD: Explicitly free model from RAM
-        if model is not None:
-            logger.info("Unloading top_view_model from RAM...")
-            del model
-            gc.collect()
-            logger.info("Top view model unloaded, memory freed")
-
-
-def _score_chest_width(width_px: Optional[float]) -> Optional[int]:
-    """
-    Score chest width on 1-9 scale
-    Wider chest = higher score (more desirable)
-    """
-    if width_px is None:
-        return None
-    
-    # Approximate scoring based on pixel width
-    if width_px >= 300:
-        return 9
-    elif width_px >= 280:
-        return 8
-    elif width_px >= 260:
-        return 7
-    elif width_px >= 240:
-        return 6
-    elif width_px >= 220:
-        return 5
-    elif width_px >= 200:
-        return 4
-    elif width_px >= 180:
-        return 3
-    elif width_px >= 160:
-        return 2
-    else:
-        return 1
+    return TOP_VIEW.analyze(image_path, profile)
 
 
 def extract_top_traits(top_data: Dict) -> List[Dict]:
     """
     Extract and format traits from top view model output
-    
+
     Args:
-        top_data: Raw output from top view model
-        
+        top_data: Raw output from process_top_view
+
     Returns:
         List of trait dictionaries
     """
-    if not top_data or 'traits' not in top_data:
-        return []
-    
-    formatted_traits = []
-    
-    for trait in top_data['traits']:
-        # Get measurement value (prefer cm, fallback to px)
-        measurement = trait.get('value_cm')
-        if measurement is None:
-            measurement = trait.get('value_px')
-        
-        formatted_traits.append({
-            'trait': trait.get('trait', 'Unknown'),
-            'score': trait.get('score'),
-            'measurement': measurement
-        })
-    
-    return formatted_traits
+    return format_traits(top_data)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,424 @@
+"""
+View Analyzer
+Shared keypoint pipeline for the view models: every view declares its
+keypoints and traits, and all distances and angles of a view are computed
+in one vectorized NumPy pass
+"""
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .model_downloader import get_model_path
+from .inference import backend_for, predict_pose
+from .lazy_imports import load
+from .scoring import DEFAULT_PROFILE, get_tables
+from .result_cache import image_digest, model_identity, result_cache
+from .cascade import pose_confidence, resolution_cascade
+from .cancellation import checkpoint
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Trait operations over keypoint segments
+DISTANCE = "distance"                   # length of a-b
+VERTICAL_DROP = "vertical_drop"         # |y_a - y_b|
+ANGLE_AT = "angle_at"                   # angle at b formed by a-b-c (degrees)
+ANGLE_HORIZONTAL = "angle_horizontal"   # angle of a-b with the horizontal axis (degrees)
+ANGLE_VERTICAL = "angle_vertical"       # angle of a-b with the vertical axis (degrees)
+DISTANCE_DELTA = "distance_delta"       # length of c-d minus length of a-b
+MEAN_DISTANCE = "mean_distance"         # mean length over (a-b, c-d, ...) pairs present
+HEIGHT_ABOVE_BOTTOM = "height_above_bottom"  # image height minus mean y of the points
+DERIVED = "derived"                     # another trait's value times a factor
+
+ANGLE_OPS = {ANGLE_AT, ANGLE_HORIZONTAL, ANGLE_VERTICAL}
+
+class TraitSpec:
+    """Declaration of one trait: keypoints and operation (scored by its table in scoring_tables)"""
+
+    def __init__(self, name: str, op: str, points: Sequence[str] = (),
+                 scale: float = 1.0, source: Optional[str] = None,
+                 features: Optional[List[str]] = None):
+        """
+        Args:
+            name: Official trait name (also its scoring table key)
+            op: Operation applied to the keypoints (DISTANCE, ANGLE_AT, ...)
+            points: Keypoint names the operation reads, in operation order
+            scale: Multiplier applied to the measurement
+            source: Trait the value is derived from (op=DERIVED)
+            features: Features reported with the trait (defaults to points)
+        """
+        self.name = name
+        self.op = op
+        self.points = list(points)
+        self.scale = scale
+        self.source = source
+        self.features = features if features is not None else list(points)
+
+
+class ViewAnalyzer:
+    """
+    Runs one view model and turns its keypoints into traits scored from tables.
+
+    Keypoints stay a NumPy array end to end. At construction every trait is
+    compiled into index arrays over a shared table of keypoint segments, so
+    measuring a view is one vectorized computation of all segment vectors
+    followed by cheap per-operation reductions.
+    """
+
+    def __init__(self, view: str, label: str, model_filename: str,
+                 keypoint_names: List[str], traits: List[TraitSpec], imgsz: int = 640):
+        self.view = view
+        self.label = label
+        self.model_filename = model_filename
+        self.keypoint_names = keypoint_names
+        self.traits = traits
+        self.imgsz = imgsz
+        self._compile()
+
+    def _compile(self):
+        """Build the segment table and per-trait segment indices"""
+        index = {name: i for i, name in enumerate(self.keypoint_names)}
+        segments: List[Tuple[int, int]] = []
+
+        def segment(a: str, b: str) -> int:
+            pair = (index[a], index[b])
+            if pair not in segments:
+                segments.append(pair)
+            return segments.index(pair)
+
+        self._plan = []
+        for spec in self.traits:
+            p = spec.points
+            if spec.op in (DISTANCE, VERTICAL_DROP, ANGLE_HORIZONTAL, ANGLE_VERTICAL):
+                segs = [segment(p[0], p[1])]
+            elif spec.op == ANGLE_AT:
+                segs = [segment(p[1], p[0]), segment(p[1], p[2])]
+            elif spec.op in (DISTANCE_DELTA, MEAN_DISTANCE):
+                segs = [segment(p[i], p[i + 1]) for i in range(0, len(p), 2)]
+            elif spec.op in (HEIGHT_ABOVE_BOTTOM, DERIVED):
+                segs = []
+            else:
+                raise ValueError(f"Unknown trait operation: {spec.op}")
+            self._plan.append((spec, segs, [index[name] for name in p]))
+
+        self._seg_start = np.array([s[0] for s in segments], dtype=np.intp)
+        self._seg_end = np.array([s[1] for s in segments], dtype=np.intp)
+
+    def measure(self, xy: np.ndarray, image_shape: Tuple[int, ...]) -> Dict[str, Optional[float]]:
+        """
+        Compute every trait measurement of the view.
+
+        Args:
+            xy: Keypoint coordinates [num_points, 2] in keypoint_names order
+            image_shape: Shape of the source image (height, width, ...)
+
+        Returns:
+            Measurement per trait name (None if its keypoints are unavailable)
+        """
+        num_points = len(self.keypoint_names)
+        detected = min(xy.shape[0], num_points)
+        points = np.full((num_points, 2), np.nan)
+        points[:detected] = xy[:detected]
+
+        # One pass over all segments of the view
+        vectors = points[self._seg_end] - points[self._seg_start]
+        lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+
+        values: Dict[str, Optional[float]] = {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for spec, segs, idx in self._plan:
+                if spec.op == DISTANCE:
+                    value = lengths[segs[0]]
+                elif spec.op == VERTICAL_DROP:
+                    value = abs(vectors[segs[0], 1])
+                elif spec.op == ANGLE_HORIZONTAL:
+                    value = _acos_degrees(vectors[segs[0], 0] / lengths[segs[0]])
+                elif spec.op == ANGLE_VERTICAL:
+                    value = _acos_degrees(-vectors[segs[0], 1] / lengths[segs[0]])
+                elif spec.op == ANGLE_AT:
+                    dot = vectors[segs[0]] @ vectors[segs[1]]
+                    value = _acos_degrees(dot / (lengths[segs[0]] * lengths[segs[1]]))
+                elif spec.op == DISTANCE_DELTA:
+                    value = lengths[segs[1]] - lengths[segs[0]]
+                elif spec.op == MEAN_DISTANCE:
+                    present = lengths[segs][~np.isnan(lengths[segs])]
+                    value = present.mean() if present.size else np.nan
+                elif spec.op == HEIGHT_ABOVE_BOTTOM:
+                    value = image_shape[0] - points[idx, 1].mean()
+                else:  # DERIVED
+                    source = values.get(spec.source)
+                    value = source if source is not None else np.nan
+
+                values[spec.name] = None if np.isnan(value) else float(value) * spec.scale
+        return values
+
+    def compute_traits(self, xy: np.ndarray, image_shape: Tuple[int, ...],
+                       profile: str = DEFAULT_PROFILE) -> Tuple[List[Dict], Dict]:
+        """
+        Compute and score the view's traits from model keypoints
+
+        Args:
+            xy: Keypoint coordinates [num_points, 2] in keypoint_names order
+            image_shape: Shape of the source image (height, width, ...)
+            profile: Scoring profile (breed / animal type tables)
+
+        Returns:
+            (list of trait dictionaries, keypoint map by name)
+        """
+        values = self.measure(xy, image_shape)
+        tables = get_tables(profile)
+
+        traits = []
+        for spec in self.traits:
+            value = values[spec.name]
+            if value is None:
+                continue
+            score = tables.score(spec.name, value)
+            if spec.op in ANGLE_OPS:
+                traits.append({
+                    "trait": spec.name,
+                    "features": spec.features,
+                    "value_deg": round(value, 2),
+                    "value_px": None,
+                    "value_cm": None,
+                    "score": score
+                })
+            else:
+                traits.append({
+                    "trait": spec.name,
+                    "features": spec.features,
+                    "value_px": round(value, 2),
+                    "value_cm": None,
+                    "score": score
+                })
+
+        return traits, self.keypoint_map(xy)
+
+    def keypoint_map(self, xy: np.ndarray) -> Dict[str, Optional[Tuple[float, float]]]:
+        """Keypoints by name (None for keypoints the model did not return)"""
+        return {
+            name: (float(xy[i, 0]), float(xy[i, 1])) if i < xy.shape[0] else None
+            for i, name in enumerate(self.keypoint_names)
+        }
+
+    def pose_record(self, pose, image_shape: Tuple[int, ...], model_key: str) -> Dict:
+        """
+        Compact, JSON-safe form of a detected pose, persisted with the results
+        so traits can be re-scored later without running the model again.
+
+        Args:
+            pose: PoseResult of the view model
+            image_shape: Shape of the source image (height, width, ...)
+            model_key: Identity of the model that produced the pose
+
+        Returns:
+            {"xy": [[x, y], ...], "conf": [...], "boxConf", "imageShape": [h, w], "model"}
+        """
+        return {
+            # Exact model coordinates (a BSON double costs the same rounded or not),
+            # so re-scoring reproduces the original measurements
+            "xy": np.asarray(pose.xy, dtype=np.float32).tolist(),
+            "conf": np.round(np.asarray(pose.conf, dtype=np.float64), 3).tolist() if pose.conf is not None else None,
+            "boxConf": round(float(pose.box_conf), 3) if pose.box_conf is not None else None,
+            "imageShape": [int(image_shape[0]), int(image_shape[1])],
+            "model": model_key
+        }
+
+    def traits_from_record(self, record: Dict, profile: str = DEFAULT_PROFILE) -> List[Dict]:
+        """
+        Recompute and score the view's traits from a stored pose record
+
+        Args:
+            record: Output of pose_record
+            profile: Scoring profile (breed / animal type tables)
+
+        Returns:
+            List of trait dictionaries
+        """
+        xy = np.asarray(record["xy"], dtype=np.float64).reshape(-1, 2)
+        traits, _ = self.compute_traits(xy, tuple(record["imageShape"]), profile)
+        return traits
+
+    def analyze(self, image_path: str, profile: str = DEFAULT_PROFILE) -> Optional[Dict]:
+        """
+        Process a view image: load, infer on the resident model, compute traits.
+        Keypoints of an image already seen by the same model come from the result cache.
+        With the resolution cascade enabled, a low-resolution pass runs first and is
+        re-run at full resolution only below the view's confidence threshold.
+
+        Args:
+            image_path: Path to the view image
+            profile: Scoring profile (breed / animal type tables)
+
+        Returns:
+            Dictionary with traits, keypoints, pose record and meta, or None if processing fails
+        """
+        logger.info(f"Processing {self.label.lower()}: {image_path}")
+
+        if not os.path.exists(image_path):
+            logger.error(f"{self.label} image not found: {image_path}")
+            return None
+
+        # Get model path (downloads if needed)
+        model_path = get_model_path(self.model_filename)
+        if model_path is None:
+            logger.error(f"Failed to get {self.label.lower()} model path")
+            return None
+        # A first-time weight download can outlast the job's budget
+        checkpoint()
+
+        try:
+            # Load image bytes once: they key the result cache and are decoded on a miss
+            with open(image_path, "rb") as f:
+                data = f.read()
+            image_hash = image_digest(data)
+            model_key = model_identity(model_path, backend_for(model_path.name))
+            decoded: List[np.ndarray] = []
+
+            low_imgsz = resolution_cascade.low_imgsz
+            high_imgsz = resolution_cascade.high_imgsz(self.view, self.imgsz)
+            if resolution_cascade.enabled and low_imgsz < high_imgsz:
+                # Cheap pass first; re-run at full resolution only when the model is unsure
+                stage = self._infer(model_path, model_key, image_hash, data, decoded, low_imgsz)
+                if stage is None:
+                    logger.error(f"Failed to load image: {image_path}")
+                    return None
+                confidence = pose_confidence(stage[0])
+                threshold = resolution_cascade.threshold(self.view)
+                escalated = confidence < threshold
+                seconds = stage[3]
+                if escalated:
+                    logger.info(f"{self.label} confidence {confidence:.2f} < {threshold:.2f}, "
+                                f"re-running at {high_imgsz}")
+                    stage = self._infer(model_path, model_key, image_hash, data, decoded, high_imgsz)
+                    seconds += stage[3]
+                resolution_cascade.record(self.view, escalated, confidence, seconds)
+                imgsz = high_imgsz if escalated else low_imgsz
+            else:
+                stage = self._infer(model_path, model_key, image_hash, data, decoded, self.imgsz)
+                if stage is None:
+                    logger.error(f"Failed to load image: {image_path}")
+                    return None
+                imgsz, escalated = self.imgsz, None
+            pose, image_shape, cached, _ = stage
+
+            if pose is None:
+                logger.warning(f"No keypoints detected in {self.label.lower()}")
+                return None
+
+            # Extract keypoints and calculate traits
+            traits, kp_map = self.compute_traits(pose.xy, image_shape, profile)
+            logger.info(f"{self.label} processed: {len(traits)} traits extracted")
+
+            return {
+                "traits": traits,
+                "keypoints": kp_map,
+                "pose": self.pose_record(pose, image_shape, model_key),
+                "meta": {
+                    "image_used": image_path,
+                    "model": self.model_filename,
+                    "keypoints_detected": sum(1 for v in kp_map.values() if v is not None),
+                    "cached": cached,
+                    "imgsz": imgsz,
+                    "escalated": escalated,
+                    "scoring_profile": profile
+                }
+            }
+
+        except Exception as e:
+            logger.exception(f"Error processing {self.label.lower()}: {str(e)}")
+            return None
+
+    def _infer(self, model_path: Path, model_key: str, image_hash: str, data: bytes,
+               decoded: List[np.ndarray], imgsz: int) -> Optional[Tuple]:
+        """
+        Keypoints of the image at one inference size, from the result cache or the model.
+
+        Args:
+            decoded: Holds the decoded image once a stage needed it, for later stages
+
+        Returns:
+            (pose, image_shape, cached, inference seconds), or None if the image cannot be decoded
+        """
+        cached = result_cache.get(image_hash, model_key, imgsz)
+        if cached is not None:
+            logger.info(f"{self.label} keypoints served from cache (imgsz {imgsz})")
+            return cached.pose, cached.image_shape, True, 0.0
+
+        checkpoint()
+        if not decoded:
+            cv2 = load("cv2")
+            img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                return None
+            decoded.append(img)
+        img = decoded[0]
+        checkpoint()
+
+        # INFER: Run inference on the resident model (loaded on first use)
+        logger.info(f"Running {self.label.lower()} inference (imgsz {imgsz})...")
+        infer_start = time.time()
+        pose = predict_pose(model_path, img, imgsz=imgsz)
+        infer_time = time.time() - infer_start
+        logger.info(f"{self.label} inference completed in {infer_time:.2f}s")
+        result_cache.put(image_hash, model_key, imgsz, pose, img.shape, infer_time)
+        return pose, img.shape, False, infer_time
+
+
+def _acos_degrees(cos_angle: float) -> float:
+    """Angle in degrees from its cosine (NaN for zero-length segments)"""
+    return float(np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0))))
+
+
+def format_traits(view_data: Dict) -> List[Dict]:
+    """
+    Extract and format traits from a view analyzer output
+
+    Args:
+        view_data: Raw output from ViewAnalyzer.analyze
+
+    Returns:
+        List of trait dictionaries with a single measurement value
+    """
+    if not view_data or 'traits' not in view_data:
+        return []
+
+    formatted_traits = []
+
+    for trait in view_data['traits']:
+        # Get measurement value (prefer cm, fallback to degrees or px)
+        measurement = trait.get('value_cm')
+        if measurement is None:
+            measurement = trait.get('value_deg')
+        if measurement is None:
+            measurement = trait.get('value_px')
+
+        formatted_traits.append({
+            'trait': trait.get('trait', 'Unknown'),
+            'score': trait.get('score'),
+            'measurement': measurement
+        })
+
+    return formatted_traits
+
+
+def get_analyzer(view: str) -> ViewAnalyzer:
+    """Analyzer declared for a view ("rear", "side", "top", "udder", "side_udder")"""
+    if view == "rear":
+        from .rear_view_integration import REAR_VIEW
+        return REAR_VIEW
+    if view == "side":
+        from .side_view_integration import SIDE_VIEW
+        return SIDE_VIEW
+    if view == "top":
+        from .top_view_integration import TOP_VIEW
+        return TOP_VIEW
+    if view == "udder":
+        from .udder_view_integration import UDDER_VIEW
+        return UDDER_VIEW
+    if view == "side_udder":
+        from .side_udder_integration import SIDE_UDDER_VIEW
+        return SIDE_UDDER_VIEW
+    raise ValueError(f"Unknown view: {view}")
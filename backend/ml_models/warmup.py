@@ -0,0 +1,152 @@
+"""
+Model Warm-up
+Optional background warm-up at application startup: resolves the model
+weights, loads views into the resident registry and runs a dummy inference
+so the first real request does not pay for downloads, loading and first-run costs
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from .model_downloader import VIEW_MODELS, download_models
+from .inference import predict_pose, use_backend
+from .backends import LETTERBOX_COLOR
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Warm-up modes, each including the previous one
+WARMUP_OFF = "off"              # nothing at startup, models load on the first request
+WARMUP_DOWNLOAD = "download"    # resolve (download) all weights
+WARMUP_PRELOAD = "preload"      # ... and load the chosen views into the registry
+WARMUP_FULL = "full"            # ... and run a dummy inference on each of them
+WARMUP_MODES = (WARMUP_OFF, WARMUP_DOWNLOAD, WARMUP_PRELOAD, WARMUP_FULL)
+
+
+class WarmupState:
+    """Progress of the startup warm-up, reported by the readiness endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.mode = WARMUP_OFF
+        self.status = "off"     # off | running | ready
+        self.views: List[str] = []
+        self.steps: Dict[str, Dict] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status != "running"
+
+    def start(self, mode: str, views: List[str]):
+        with self._lock:
+            self.mode = mode
+            self.status = "running"
+            self.views = views
+            self.steps = {}
+            self.started_at = time.time()
+            self.finished_at = None
+
+    def record(self, view: str, **step):
+        with self._lock:
+            self.steps.setdefault(view, {}).update(step)
+
+    def finish(self):
+        with self._lock:
+            self.status = "ready"
+            self.finished_at = time.time()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "ready": self.ready,
+                "status": self.status,
+                "mode": self.mode,
+                "views": self.views,
+                "seconds": round(end - self.started_at, 2) if self.started_at else 0.0,
+                "steps": {view: dict(step) for view, step in self.steps.items()},
+                "errors": [
+                    f"{view}: {step['error']}" for view, step in self.steps.items() if step.get("error")
+                ]
+            }
+
+
+def warm_up(mode: str = WARMUP_FULL, views: Optional[List[str]] = None, imgsz: int = 640):
+    """
+    Warm up the view models (blocking).
+
+    Args:
+        mode: WARMUP_DOWNLOAD, WARMUP_PRELOAD or WARMUP_FULL
+        views: Views to load and infer on (None = all); weights of every view are resolved
+        imgsz: Inference size for the dummy inference
+    """
+    views = [v for v in (views or list(VIEW_MODELS)) if v in VIEW_MODELS]
+    warmup_state.start(mode, views)
+    logger.info(f"Warm-up started (mode: {mode}, views: {', '.join(views)})")
+
+    try:
+        # Resolve every weights file (missing ones download in parallel),
+        # so later requests never wait for a download
+        step_start = time.time()
+        resolved = download_models(VIEW_MODELS.values())
+        paths = {view: resolved[model_filename] for view, model_filename in VIEW_MODELS.items()}
+        for view in VIEW_MODELS:
+            if view in views or paths[view] is None:
+                warmup_state.record(
+                    view,
+                    downloaded=paths[view] is not None,
+                    download_seconds=round(time.time() - step_start, 2),
+                    **({"error": "weights unavailable"} if paths[view] is None else {})
+                )
+
+        if mode in (WARMUP_PRELOAD, WARMUP_FULL):
+            import numpy as np
+
+            # A blank letterbox-colored frame exercises the full pipeline without real data
+            dummy = np.full((imgsz, imgsz, 3), LETTERBOX_COLOR, dtype=np.uint8)
+            for view in views:
+                if paths[view] is None:
+                    continue
+                try:
+                    step_start = time.time()
+                    with use_backend(paths[view]):
+                        pass
+                    warmup_state.record(view, loaded=True, load_seconds=round(time.time() - step_start, 2))
+
+                    if mode == WARMUP_FULL:
+                        step_start = time.time()
+                        predict_pose(paths[view], dummy, imgsz=imgsz)
+                        warmup_state.record(view, inferred=True,
+                                            inference_seconds=round(time.time() - step_start, 2))
+                except Exception as e:
+                    logger.exception(f"Warm-up failed for {view} view: {e}")
+                    warmup_state.record(view, error=str(e))
+    finally:
+        warmup_state.finish()
+
+    logger.info(f"Warm-up complete in {warmup_state.snapshot()['seconds']:.1f}s")
+
+
+def start_warmup(mode: str = WARMUP_OFF, views: Optional[List[str]] = None, imgsz: int = 640) -> bool:
+    """
+    Start the warm-up in a background thread, so startup and /health are not delayed.
+
+    Returns:
+        True if a warm-up was started (False for mode "off")
+    """
+    if mode not in WARMUP_MODES:
+        logger.warning(f"Unknown warm-up mode '{mode}', skipping warm-up")
+        return False
+    if mode == WARMUP_OFF:
+        return False
+
+    # Mark running before the thread starts, so readiness never reports a premature "ready"
+    warmup_state.start(mode, views or list(VIEW_MODELS))
+    threading.Thread(target=warm_up, args=(mode, views, imgsz), name="warmup", daemon=True).start()
+    return True
+
+
+# Singleton instance
+warmup_state = WarmupState()
@@ -0,0 +1,141 @@
+"""
+In-process stand-in for a Motor collection: the subset of the API used by the
+processing queue (filters with $or/$in/$nin/$lt/$lte/$gt/$gte, updates with
+$set/$inc/$unset, upserts, find_one_and_update with sort). Documents live in
+a dict, or in a multiprocessing.Manager dict with a manager lock so worker
+processes can share one collection.
+"""
+import copy
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+_COMPARISONS = {
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+}
+
+
+def matches(doc: Dict, query: Dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            if not all(_COMPARISONS[op](value, arg) for op, arg in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def apply_update(doc: Dict, update: Dict):
+    for key, value in update.get("$set", {}).items():
+        doc[key] = copy.deepcopy(value)
+    for key, value in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + value
+    for key in update.get("$unset", {}):
+        doc.pop(key, None)
+
+
+class _Cursor:
+    def __init__(self, docs: List[Dict]):
+        self._docs = docs
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: Optional[int] = None):
+        return self._docs[:length] if length else list(self._docs)
+
+
+class FakeCollection:
+    def __init__(self, docs=None, lock=None):
+        self.docs = docs if docs is not None else {}
+        self.lock = lock if lock is not None else threading.Lock()
+
+    def _select(self, query: Dict, sort=None) -> List[Dict]:
+        selected = [copy.deepcopy(doc) for doc in self.docs.values() if matches(doc, query)]
+        for field, direction in reversed(sort or []):
+            selected.sort(key=lambda doc: doc.get(field), reverse=direction < 0)
+        return selected
+
+    async def create_index(self, *args, **kwargs):
+        return None
+
+    async def count_documents(self, query: Dict) -> int:
+        with self.lock:
+            return len(self._select(query))
+
+    async def find_one(self, query: Dict) -> Optional[Dict]:
+        with self.lock:
+            found = self._select(query)
+        return found[0] if found else None
+
+    def find(self, query: Dict) -> _Cursor:
+        with self.lock:
+            return _Cursor(self._select(query))
+
+    async def insert_one(self, doc: Dict):
+        with self.lock:
+            if doc["_id"] in self.docs:
+                raise DuplicateKeyError(f"duplicate _id {doc['_id']}")
+            self.docs[doc["_id"]] = copy.deepcopy(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def update_one(self, query: Dict, update: Dict, upsert: bool = False):
+        with self.lock:
+            found = self._select(query)
+            if found:
+                doc = found[0]
+                apply_update(doc, update)
+                self.docs[doc["_id"]] = doc
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+            if not upsert:
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+            if query["_id"] in self.docs:
+                raise DuplicateKeyError(f"duplicate _id {query['_id']}")
+            doc = {"_id": query["_id"]}
+            apply_update(doc, update)
+            self.docs[doc["_id"]] = doc
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+
+    async def find_one_and_update(self, query: Dict, update: Dict, sort=None, return_document=False):
+        with self.lock:
+            found = self._select(query, sort)
+            if not found:
+                return None
+            doc = found[0]
+            before = copy.deepcopy(doc)
+            apply_update(doc, update)
+            self.docs[doc["_id"]] = doc
+            return copy.deepcopy(doc) if return_document else before
+
+    async def delete_one(self, query: Dict):
+        with self.lock:
+            found = self._select(query)
+            if found:
+                del self.docs[found[0]["_id"]]
+            return SimpleNamespace(deleted_count=len(found[:1]))
+
+    async def delete_many(self, query: Dict):
+        with self.lock:
+            found = self._select(query)
+            for doc in found:
+                del self.docs[doc["_id"]]
+            return SimpleNamespace(deleted_count=len(found))
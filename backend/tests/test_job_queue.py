@@ -0,0 +1,230 @@
+"""
+ProcessingQueue against an in-process stand-in for the processing_jobs
+collection: submissions, crash reclaims, retries, give-up and shutdown.
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from app.services.job_queue import (
+    CANCELLED, COMPLETED, FAILED, QUEUED, RUNNING, JobPending, ProcessingQueue, QueueFull, _now
+)
+from ml_models.cancellation import OperationCancelled, cancellation_registry
+from tests.fake_mongo import FakeCollection
+
+
+async def _start(queue: ProcessingQueue, collection, handler, owner: str, workers: int = 1,
+                 on_exhausted=None, **options):
+    async def exhausted(classification_id, error):
+        pass
+
+    options.setdefault("max_depth", 0)
+    options.setdefault("retry_delay", 0)
+    options.setdefault("poll_seconds", 0.05)
+    await queue.start(collection, handler, on_exhausted or exhausted, workers=workers, **options)
+    # Workers of one test share a process: give each queue its own lease owner
+    queue._owner_prefix = owner
+    return queue
+
+
+async def _wait_for(predicate, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not reached in time")
+        await asyncio.sleep(0.02)
+
+
+async def _status(collection, job_id):
+    job = await collection.find_one({"_id": job_id})
+    return job and job["status"]
+
+
+def test_submit_rejects_pending_jobs_and_a_full_queue():
+    async def scenario():
+        collection = FakeCollection()
+        queue = await _start(ProcessingQueue(), collection, None, "api", workers=0, max_depth=2)
+
+        assert await queue.submit("a") == 1
+        with pytest.raises(JobPending):
+            await queue.submit("a")
+        assert await queue.submit("b") == 2
+        with pytest.raises(QueueFull):
+            await queue.submit("c")
+
+        # A finished job can be submitted again
+        await collection.update_one({"_id": "a"}, {"$set": {"status": COMPLETED}})
+        assert await queue.submit("a") == 2
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_crashed_worker_job_is_reclaimed_by_another_worker():
+    async def scenario():
+        collection = FakeCollection()
+        started = asyncio.Event()
+        finished = []
+
+        async def hangs(classification_id, attempt, final):
+            started.set()
+            await asyncio.Event().wait()
+
+        async def completes(classification_id, attempt, final):
+            finished.append((classification_id, attempt))
+            return {"done": True}
+
+        crashing = await _start(ProcessingQueue(), collection, hangs, "node-a")
+        await crashing.submit("job")
+        await asyncio.wait_for(started.wait(), 5)
+
+        # The worker dies mid-job: no outcome is recorded and its lease stays
+        for task in crashing._workers:
+            task.cancel()
+        await asyncio.gather(*crashing._workers, return_exceptions=True)
+        job = await collection.find_one({"_id": "job"})
+        assert job["status"] == RUNNING and job["leaseOwner"] == "node-a:0"
+
+        survivor = await _start(ProcessingQueue(), collection, completes, "node-b")
+        await asyncio.sleep(0.2)
+        assert finished == []    # the lease has not expired yet
+
+        await collection.update_one({"_id": "job"}, {"$set": {"leaseExpiresAt": _now() - timedelta(seconds=1)}})
+        await _wait_for(lambda: _done(collection, "job"))
+
+        job = await collection.find_one({"_id": "job"})
+        assert finished == [("job", 2)]
+        assert job["status"] == COMPLETED and job["result"] == {"done": True}
+        assert job["leaseOwner"] is None
+        assert survivor.reclaimed == 1
+        await survivor.stop()
+
+    asyncio.run(scenario())
+
+
+async def _done(collection, job_id):
+    return await _status(collection, job_id) in (COMPLETED, FAILED, CANCELLED)
+
+
+def test_job_is_given_up_after_its_last_attempt_was_lost():
+    async def scenario():
+        collection = FakeCollection()
+        exhausted = []
+        calls = []
+
+        async def handler(classification_id, attempt, final):
+            calls.append(attempt)
+
+        async def on_exhausted(classification_id, error):
+            exhausted.append((classification_id, error))
+
+        # Its worker died during the second and last attempt
+        await collection.insert_one({
+            "_id": "job", "status": RUNNING, "attempts": 2, "maxAttempts": 2,
+            "enqueuedAt": _now(), "availableAt": _now(), "leaseOwner": "node-a:0",
+            "leaseExpiresAt": _now() - timedelta(seconds=1), "lastError": None
+        })
+        queue = await _start(ProcessingQueue(), collection, handler, "node-b",
+                             on_exhausted=on_exhausted, max_attempts=2)
+        await _wait_for(lambda: _done(collection, "job"))
+
+        job = await collection.find_one({"_id": "job"})
+        assert job["status"] == FAILED and "worker lost" in job["lastError"]
+        assert calls == []
+        assert exhausted and exhausted[0][0] == "job"
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_attempt_is_retried_until_it_succeeds():
+    async def scenario():
+        collection = FakeCollection()
+        attempts = []
+
+        async def flaky(classification_id, attempt, final):
+            attempts.append((attempt, final))
+            if attempt == 1:
+                raise RuntimeError("model crashed")
+
+        queue = await _start(ProcessingQueue(), collection, flaky, "node-a", max_attempts=2)
+        await queue.submit("job")
+        await _wait_for(lambda: _done(collection, "job"))
+
+        job = await collection.find_one({"_id": "job"})
+        assert attempts == [(1, False), (2, True)]
+        assert job["status"] == COMPLETED and job["attempts"] == 2 and job["lastError"] is None
+        assert queue.retried == 1
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_shutdown_hands_running_jobs_back_without_using_an_attempt():
+    async def scenario():
+        collection = FakeCollection()
+        started = asyncio.Event()
+
+        async def cooperative(classification_id, attempt, final):
+            token = cancellation_registry.register(classification_id)
+            try:
+                started.set()
+                while True:
+                    token.check()
+                    await asyncio.sleep(0.01)
+            finally:
+                cancellation_registry.release(classification_id, token)
+
+        queue = await _start(ProcessingQueue(), collection, cooperative, "node-a")
+        await queue.submit("job")
+        await asyncio.wait_for(started.wait(), 5)
+        await queue.stop()
+
+        job = await collection.find_one({"_id": "job"})
+        assert job["status"] == QUEUED and job["attempts"] == 0
+        assert job["leaseOwner"] is None
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_job_keeps_its_lease_until_the_handler_stops():
+    async def scenario():
+        collection = FakeCollection()
+        started = asyncio.Event()
+        reclaimed = []
+
+        async def slow_to_stop(classification_id, attempt, final):
+            token = cancellation_registry.register(classification_id)
+            try:
+                started.set()
+                while not token.cancelled:
+                    await asyncio.sleep(0.01)
+                # A long inference runs on before the next checkpoint, past the lease
+                await asyncio.sleep(4.5)
+                raise OperationCancelled(token.reason)
+            finally:
+                cancellation_registry.release(classification_id, token)
+
+        async def must_not_run(classification_id, attempt, final):
+            reclaimed.append(classification_id)
+
+        # Lease of 3s (the minimum), renewed every second
+        owner = await _start(ProcessingQueue(), collection, slow_to_stop, "node-a", lease_seconds=3)
+        other = await _start(ProcessingQueue(), collection, must_not_run, "node-b", lease_seconds=3)
+        await owner.submit("job")
+        await asyncio.wait_for(started.wait(), 5)
+
+        # Requested from another process: only the flag in the job document is set
+        await collection.update_one({"_id": "job"}, {"$set": {"cancelRequested": "deleted"}})
+        await _wait_for(lambda: _done(collection, "job"), timeout=10)
+
+        job = await collection.find_one({"_id": "job"})
+        assert job["status"] == CANCELLED and job["lastError"] == "deleted"
+        assert reclaimed == []
+        await owner.stop()
+        await other.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,151 @@
+"""
+Resumable model downloads against a local http.server standing in for the
+mirror: resuming a cut-off download, 416 on a complete partial file, a 206
+at the wrong offset, and a server ignoring Range. Each case runs with the
+requests client and with the urllib fallback.
+"""
+import hashlib
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ml_models import model_downloader
+
+CONTENT = bytes(range(256)) * 4096    # 1 MB
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+MODEL = "test_model.pt"
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    """Serves CONTENT at any path; server.mode picks how Range requests are answered"""
+
+    def do_GET(self):
+        server = self.server
+        requested = self.headers.get("Range")
+        server.ranges.append(requested)
+        start = int(requested[len("bytes="):].split("-")[0]) if requested else None
+
+        if start is None or server.mode == "ignore":
+            self._send(200, CONTENT, cut=server.cut_next)
+        elif start >= len(CONTENT):
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{len(CONTENT)}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            # "wrong": a 206 of the whole file whatever offset was asked for
+            offset = 0 if server.mode == "wrong" else start
+            body = CONTENT[offset:]
+            self._send(206, body, {"Content-Range": f"bytes {offset}-{len(CONTENT) - 1}/{len(CONTENT)}"})
+
+    def _send(self, status, body, headers=None, cut=0):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if cut:
+            # The connection drops after `cut` bytes, once
+            self.server.cut_next = 0
+            body = body[:cut]
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def mirror():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MirrorHandler)
+    server.mode, server.cut_next, server.ranges = "range", 0, []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["requests", "urllib"])
+def client(request, monkeypatch):
+    if request.param == "requests":
+        pytest.importorskip("requests")
+    else:
+        # _fetch falls back to urllib when requests cannot be imported
+        monkeypatch.setitem(sys.modules, "requests", None)
+    return request.param
+
+
+@pytest.fixture
+def weights(tmp_path, monkeypatch, mirror, client):
+    monkeypatch.setattr(model_downloader, "ML_MODELS_DIR", tmp_path)
+    monkeypatch.setattr(model_downloader, "MIN_MODEL_SIZE", 0)
+    monkeypatch.setattr(model_downloader, "_expected", lambda model_filename: {"sha256": DIGEST})
+    monkeypatch.setattr(model_downloader.time, "sleep", lambda seconds: None)
+    model_downloader.configure_downloads(f"http://127.0.0.1:{mirror.server_address[1]}")
+    yield tmp_path
+    model_downloader.configure_downloads()
+
+
+def _url(mirror):
+    return f"http://127.0.0.1:{mirror.server_address[1]}/{MODEL}"
+
+
+def test_cut_off_download_resumes_where_it_stopped(weights, mirror):
+    mirror.cut_next = 300_000
+
+    path = model_downloader._download_model(MODEL)
+
+    assert path == weights / MODEL and path.read_bytes() == CONTENT
+    # urllib3 drops the chunk it was reading when the connection breaks: the
+    # second request resumes after the bytes that reached the file, not at the cut
+    first, resumed = mirror.ranges
+    assert first is None
+    assert 0 < int(resumed[len("bytes="):-1]) <= 300_000
+    assert not (weights / f"{MODEL}.tmp").exists()
+
+
+def test_complete_partial_file_is_kept_on_416(weights, mirror):
+    temp_path = weights / f"{MODEL}.tmp"
+    temp_path.write_bytes(CONTENT)
+
+    assert model_downloader._fetch(_url(mirror), temp_path) == DIGEST
+    assert temp_path.read_bytes() == CONTENT
+    assert mirror.ranges == [f"bytes={len(CONTENT)}-"]
+
+
+def test_partial_file_longer_than_the_remote_one_is_restarted(weights, mirror):
+    temp_path = weights / f"{MODEL}.tmp"
+    temp_path.write_bytes(CONTENT + b"stale")
+
+    with pytest.raises(RuntimeError, match="does not match"):
+        model_downloader._fetch(_url(mirror), temp_path)
+    assert not temp_path.exists()
+
+    assert model_downloader._download_model(MODEL).read_bytes() == CONTENT
+
+
+def test_206_at_the_wrong_offset_is_not_appended(weights, mirror):
+    mirror.mode = "wrong"
+    temp_path = weights / f"{MODEL}.tmp"
+    temp_path.write_bytes(CONTENT[:1000])
+
+    with pytest.raises(RuntimeError, match="instead of byte 1000"):
+        model_downloader._fetch(_url(mirror), temp_path)
+    assert not temp_path.exists()
+
+    # The next attempt starts over without a Range header
+    path = model_downloader._download_model(MODEL)
+    assert path.read_bytes() == CONTENT
+    assert mirror.ranges == ["bytes=1000-", None]
+
+
+def test_server_ignoring_range_rewrites_the_whole_file(weights, mirror):
+    mirror.mode = "ignore"
+    temp_path = weights / f"{MODEL}.tmp"
+    temp_path.write_bytes(b"x" * 1000)
+
+    assert model_downloader._fetch(_url(mirror), temp_path) == DIGEST
+    assert temp_path.read_bytes() == CONTENT
+    assert mirror.ranges == ["bytes=1000-"]
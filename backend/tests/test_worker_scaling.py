@@ -0,0 +1,128 @@
+"""
+Throughput of the processing queue against the number of worker processes.
+
+Real worker processes, each running a ProcessingQueue, drain one collection
+shared through a multiprocessing.Manager (tests/fake_mongo.py), so claims,
+leases and results go through the same cross-process contention as with
+MongoDB. The handler stands in for a classification:
+
+- a wait (sleeping, as a worker blocked on I/O or a remote model would): shows
+  the queue itself scales, on any machine;
+- a CPU-bound loop holding the GIL (as one process's inference would): only
+  scales up to the number of cores, and is skipped on a single core.
+
+Neither measures the models: `python -m app.worker_benchmark --source` does.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from app.services.job_queue import COMPLETED, ProcessingQueue
+from tests.fake_mongo import FakeCollection
+
+JOBS = 16
+SECONDS_PER_JOB = 0.25
+
+
+def _burn(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _worker_process(docs, lock, runs, ready, stop, cpu_bound: bool):
+    """One standalone worker: a single-slot queue on the shared collection"""
+    async def handler(classification_id, attempt=1, final=True):
+        started = time.monotonic()
+        if cpu_bound:
+            await asyncio.get_running_loop().run_in_executor(None, _burn, SECONDS_PER_JOB)
+        else:
+            await asyncio.sleep(SECONDS_PER_JOB)
+        runs.append((classification_id, os.getpid(), started, time.monotonic()))
+
+    async def exhausted(classification_id, error):
+        pass
+
+    async def main():
+        queue = ProcessingQueue()
+        await queue.start(FakeCollection(docs, lock), handler, exhausted, workers=1, max_depth=0,
+                          retry_delay=0, poll_seconds=0.05)
+        ready.release()
+        while not stop.is_set():
+            await asyncio.sleep(0.05)
+        await queue.stop()
+
+    asyncio.run(main())
+
+
+def _run_round(manager, workers: int, cpu_bound: bool) -> float:
+    """Drain JOBS jobs with `workers` processes; jobs per second from first start to last finish"""
+    docs, lock, runs = manager.dict(), manager.Lock(), manager.list()
+    ready, stop = manager.Semaphore(0), manager.Event()
+    processes = [
+        multiprocessing.Process(target=_worker_process, args=(docs, lock, runs, ready, stop, cpu_bound))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        # Queue only once every worker is polling, so process startup is not timed
+        for _ in processes:
+            assert ready.acquire(timeout=30)
+        submitter = ProcessingQueue()
+
+        async def submit_all():
+            await submitter.start(FakeCollection(docs, lock), None, None, workers=0, max_depth=0)
+            for index in range(JOBS):
+                await submitter.submit(f"job-{index:02d}")
+            await submitter.stop()
+
+        asyncio.run(submit_all())
+        deadline = time.monotonic() + 60
+        while len(runs) < JOBS and time.monotonic() < deadline:
+            time.sleep(0.05)
+        # Let the last result be recorded
+        while time.monotonic() < deadline and sum(doc["status"] == COMPLETED for doc in docs.values()) < JOBS:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+    jobs = list(docs.values())
+    runs = list(runs)
+    assert sorted(run[0] for run in runs) == sorted(job["_id"] for job in jobs), "a job ran twice or never"
+    assert all(job["status"] == COMPLETED and job["attempts"] == 1 for job in jobs)
+    if workers > 1:
+        assert len({run[1] for run in runs}) > 1, "one process took every job"
+    span = max(run[3] for run in runs) - min(run[2] for run in runs)
+    return JOBS / span
+
+
+def _assert_scales(cpu_bound: bool, worker_counts):
+    with multiprocessing.Manager() as manager:
+        rates = {workers: _run_round(manager, workers, cpu_bound) for workers in worker_counts}
+    base = rates[worker_counts[0]]
+    for workers in worker_counts[1:]:
+        # Well under linear: leaves room for polling and the manager's round trips
+        expected = 0.6 * workers / worker_counts[0]
+        assert rates[workers] / base >= expected, (
+            f"{workers} workers: {rates[workers]:.2f} jobs/s, "
+            f"{rates[workers] / base:.2f}x over {worker_counts[0]} (expected {expected:.2f}x)"
+        )
+
+
+def test_throughput_grows_with_worker_processes():
+    _assert_scales(cpu_bound=False, worker_counts=[1, 2, 4])
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 2, reason="one core: CPU-bound workers cannot scale")
+def test_cpu_bound_throughput_grows_up_to_the_core_count():
+    _assert_scales(cpu_bound=True, worker_counts=[1, min(4, os.cpu_count())])
@@ -101,7 +101,7 @@ const APIPage = () => {
       method: 'POST',
       path: '/classification/{id}/process',
       title: 'Process Classification',
-      description: 'Trigger AI analysis to evaluate 20 traits based on uploaded images.',
+      description: 'Queue AI analysis of the uploaded images (202 Accepted). Follow it with the status endpoint, then read the results.',
       color: 'violet',
       icon: FiCpu,
       params: [
@@ -109,11 +109,13 @@ const APIPage = () => {
       ],
       response: {
         success: true,
-        message: "Classification completed using official Type Evaluation Format",
+        message: "Classification queued for processing",
         data: {
           id: "656a1b2c3d4e5f6g7h8i9j0k",
-          status: "completed",
-          totalTraits: 20
+          status: "queued",
+          queuePosition: 1,
+          statusUrl: "/api/v1/classification/656a1b2c3d4e5f6g7h8i9j0k/status",
+          resultsUrl: "/api/v1/classification/656a1b2c3d4e5f6g7h8i9j0k/results"
         }
       }
     },
@@ -132,12 +132,23 @@ const ClassifyPage = () => {
         `${API_BASE_URL}/api/v1/classification/${classificationId}/process`
       );
 
-      if (processResponse.data.success) {
-        navigate(`/classification/${classificationId}`);
-      } else {
-        throw new Error("Processing failed");
+      if (!processResponse.data.success) throw new Error("Processing failed");
+
+      // Processing is queued (202): poll the status until it finishes
+      let status = processResponse.data.data.status;
+      while (!['completed', 'failed', 'error', 'cancelled'].includes(status)) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const statusResponse = await axios.get(
+          `${API_BASE_URL}/api/v1/classification/${classificationId}/status`
+        );
+        status = statusResponse.data.data.status;
+        if (['failed', 'error', 'cancelled'].includes(status)) {
+          throw new Error(statusResponse.data.data.error || `Processing ${status}`);
+        }
       }
 
+      navigate(`/classification/${classificationId}`);
+
     } catch (err) {
       console.error("Classification error:", err);
       let errorMessage = "An unexpected error occurred.";